@@ -0,0 +1,461 @@
+"""
+asyncio-native variant of BlockingQueueConnectionPool.
+
+Same sizing / health-check / metrics semantics as the threaded pool in
+connection_pool_queue.py, but callers are coroutines instead of threads:
+
+    async with AsyncConnectionPool(FakeMySQLDriver(), max_size=10) as pool:
+        async with pool.acquire() as conn:
+            await pool.driver.execute(conn, "SELECT 1")
+
+The actual database access goes through a small driver object so the pool
+can run against real MySQL (aiomysql if installed, otherwise mysql.connector
+on worker threads) or against an in-process fake for benchmarks and tests.
+"""
+
+import asyncio
+import contextlib
+import time
+from collections import deque
+
+import mysql.connector
+
+from connection_pool_queue import DB_CONFIG, LatencyHistogram, PoolTimeoutError
+
+try:
+    import aiomysql
+except ImportError:  # optional: fall back to mysql.connector on threads
+    aiomysql = None
+
+
+# --------------------------
+# Drivers
+# --------------------------
+class ThreadedMySQLDriver:
+    """mysql.connector, with every blocking call pushed to a worker thread."""
+
+    def __init__(self, config=None):
+        self.config = config or DB_CONFIG
+
+    async def connect(self):
+        return await asyncio.to_thread(mysql.connector.connect, **self.config)
+
+    async def ping(self, conn):
+        await asyncio.to_thread(conn.ping, reconnect=False)
+
+    async def execute(self, conn, sql, params=()):
+        def run():
+            cur = conn.cursor()
+            try:
+                cur.execute(sql, params)
+                return cur.fetchall() if cur.with_rows else []
+            finally:
+                cur.close()
+        return await asyncio.to_thread(run)
+
+    async def commit(self, conn):
+        await asyncio.to_thread(conn.commit)
+
+    async def close(self, conn):
+        await asyncio.to_thread(conn.close)
+
+
+class AioMySQLDriver:
+    """Native non-blocking MySQL protocol via aiomysql."""
+
+    def __init__(self, config=None):
+        if aiomysql is None:
+            raise RuntimeError("aiomysql is not installed (pip install aiomysql)")
+        config = dict(config or DB_CONFIG)
+        config["db"] = config.pop("database", None)
+        self.config = config
+
+    async def connect(self):
+        return await aiomysql.connect(**self.config)
+
+    async def ping(self, conn):
+        await conn.ping(reconnect=False)
+
+    async def execute(self, conn, sql, params=()):
+        async with conn.cursor() as cur:
+            await cur.execute(sql, params)
+            return await cur.fetchall()
+
+    async def commit(self, conn):
+        await conn.commit()
+
+    async def close(self, conn):
+        conn.close()
+
+
+class _FakeConnection:
+    __slots__ = ("alive",)
+
+    def __init__(self):
+        self.alive = True
+
+
+class FakeMySQLDriver:
+    """
+    In-process MySQL stand-in: no sockets, just simulated costs.
+    `connect_cost` and `query_latency` are in seconds.
+    """
+
+    def __init__(self, connect_cost=0.005, query_latency=0.001):
+        self.connect_cost = connect_cost
+        self.query_latency = query_latency
+        self.connects = 0
+        self.queries = 0
+
+    async def connect(self):
+        await asyncio.sleep(self.connect_cost)
+        self.connects += 1
+        return _FakeConnection()
+
+    async def ping(self, conn):
+        if not conn.alive:
+            raise ConnectionError("fake connection is closed")
+
+    async def execute(self, conn, sql, params=()):
+        if not conn.alive:
+            raise ConnectionError("fake connection is closed")
+        await asyncio.sleep(self.query_latency)
+        self.queries += 1
+        return [(1,)] if sql.lstrip().upper().startswith("SELECT") else []
+
+    async def commit(self, conn):
+        await self.execute(conn, "COMMIT")
+
+    async def close(self, conn):
+        conn.alive = False
+
+
+def default_driver(config=None):
+    return AioMySQLDriver(config) if aiomysql is not None else ThreadedMySQLDriver(config)
+
+
+# --------------------------
+# Async pool
+# --------------------------
+class _PooledConnection:
+    __slots__ = ("conn", "created_at", "last_used", "checked_out_at", "leaked")
+
+    def __init__(self, conn):
+        self.conn = conn
+        self.created_at = time.monotonic()
+        self.last_used = self.created_at
+        self.checked_out_at = None
+        self.leaked = False
+
+
+_RESERVED = object()  # handed to a waiter instead of a connection: "open a new one"
+
+
+class AsyncConnectionPool:
+    """
+    Elastic asyncio pool mirroring BlockingQueueConnectionPool:
+    min_size/max_size, idle_ttl, max_lifetime, pre_ping_after, FIFO waiters,
+    acquire timeout, leak detection and the same stats() shape.
+
+    Waiters are futures in a deque; `max_waiters` bounds that queue, and
+    callers beyond it fail fast with PoolTimeoutError instead of piling up.
+    Only use a pool from the event loop that opened it.
+    """
+
+    def __init__(self, driver, max_size, min_size=0, idle_ttl=60.0, max_lifetime=1800.0,
+                 pre_ping_after=5.0, reap_interval=5.0, timeout=30.0,
+                 leak_threshold=60.0, max_waiters=None):
+        if not 0 <= min_size <= max_size:
+            raise ValueError("need 0 <= min_size <= max_size")
+        self.driver = driver
+        self.max_size = max_size
+        self.min_size = min_size
+        self.idle_ttl = idle_ttl
+        self.max_lifetime = max_lifetime
+        self.pre_ping_after = pre_ping_after
+        self.reap_interval = reap_interval
+        self.timeout = timeout
+        self.leak_threshold = leak_threshold
+        self.max_waiters = max_waiters
+
+        self._idle = deque()
+        self._waiters = deque()  # futures, left end = oldest
+        self._in_use = {}        # id(conn) -> _PooledConnection
+        self._size = 0
+        self._closed = False
+        self._reaper = None
+        self._closing = set()    # background closes of connections dropped on cancel
+
+        self._wait_hist = LatencyHistogram()
+        self._hold_hist = LatencyHistogram()
+        self._counters = {"acquired": 0, "timeouts": 0, "connects": 0,
+                          "connect_errors": 0, "discarded": 0, "leaks": 0}
+
+    async def open(self):
+        for _ in range(self.min_size):
+            self._size += 1
+            self._idle.append(await self._open())
+        self._reaper = asyncio.create_task(self._reap_loop())
+        return self
+
+    async def __aenter__(self):
+        return await self.open()
+
+    async def __aexit__(self, *exc):
+        await self.close()
+
+    # -- public interface --------------------------------------------------
+    @contextlib.asynccontextmanager
+    async def acquire(self, timeout=None):
+        conn = await self.get_connection(timeout)
+        try:
+            yield conn
+        finally:
+            await self.release_connection(conn)
+
+    async def get_connection(self, timeout=None):
+        timeout = self.timeout if timeout is None else timeout
+        start = time.monotonic()
+        deadline = start + timeout
+        while True:
+            rec = await self._take_idle_or_reserve(deadline, timeout)
+            if rec is None:
+                rec = await self._open()
+            else:
+                try:
+                    usable = await self._is_usable(rec)
+                except BaseException:
+                    self._drop(rec)  # cancelled mid-ping: don't lose the slot
+                    raise
+                if not usable:
+                    await self._discard(rec)
+                    continue
+            now = time.monotonic()
+            rec.checked_out_at = now
+            rec.leaked = False
+            self._in_use[id(rec.conn)] = rec
+            self._counters["acquired"] += 1
+            self._wait_hist.record(now - start)
+            return rec.conn
+
+    async def release_connection(self, conn):
+        now = time.monotonic()
+        rec = self._in_use.pop(id(conn), None)
+        if rec is None:
+            raise ValueError("connection does not belong to this pool")
+        self._hold_hist.record(now - rec.checked_out_at)
+        rec.last_used = now
+        rec.checked_out_at = None
+        if self._closed or self._expired(rec, now):
+            await self._discard(rec)
+        elif not self._hand_to_waiter(rec):
+            self._idle.append(rec)
+
+    def stats(self):
+        now = time.monotonic()
+        return {
+            "size": self._size,
+            "max_size": self.max_size,
+            "min_size": self.min_size,
+            "in_use": len(self._in_use),
+            "idle": len(self._idle),
+            "waiting": len(self._waiters),
+            "held_past_leak_threshold": sum(
+                1 for r in self._in_use.values()
+                if now - r.checked_out_at > self.leak_threshold
+            ),
+            "acquire_wait": self._wait_hist.snapshot(),
+            "hold_time": self._hold_hist.snapshot(),
+            **self._counters,
+        }
+
+    async def close(self):
+        self._closed = True
+        if self._reaper:
+            self._reaper.cancel()
+        while self._waiters:
+            fut = self._waiters.popleft()
+            if not fut.done():
+                fut.set_exception(RuntimeError("pool is closed"))
+        idle, self._idle = list(self._idle), deque()
+        for rec in idle:
+            await self._discard(rec)
+
+    # -- internals ---------------------------------------------------------
+    async def _take_idle_or_reserve(self, deadline, timeout):
+        if self._closed:
+            raise RuntimeError("pool is closed")
+        if self._idle:
+            return self._idle.pop()
+        if self._size < self.max_size:
+            self._size += 1
+            return None
+        if self.max_waiters is not None and len(self._waiters) >= self.max_waiters:
+            self._counters["timeouts"] += 1
+            raise PoolTimeoutError(f"wait queue full ({self.max_waiters} waiters)")
+
+        fut = asyncio.get_running_loop().create_future()
+        self._waiters.append(fut)
+        try:
+            got = await asyncio.wait_for(asyncio.shield(fut), max(0.0, deadline - time.monotonic()))
+        except asyncio.CancelledError:
+            if fut.done() and not fut.cancelled() and fut.exception() is None:
+                self._give_back(fut.result())
+            else:
+                self._forget_waiter(fut)
+            raise
+        except asyncio.TimeoutError:
+            if fut.done() and not fut.cancelled() and fut.exception() is None:
+                got = fut.result()  # handed over in the same tick as the timeout
+            else:
+                self._forget_waiter(fut)
+                self._counters["timeouts"] += 1
+                raise PoolTimeoutError(
+                    f"no connection available within {timeout:.1f}s "
+                    f"(size={self._size}, in_use={len(self._in_use)}, waiting={len(self._waiters)})"
+                ) from None
+        return None if got is _RESERVED else got
+
+    def _forget_waiter(self, fut):
+        # close() may already have popped it
+        try:
+            self._waiters.remove(fut)
+        except ValueError:
+            pass
+
+    def _give_back(self, item):
+        """Return something handed to a waiter that went away (cancelled)."""
+        if item is _RESERVED:
+            self._release_slot()
+        elif not self._hand_to_waiter(item):
+            self._idle.append(item)
+
+    def _hand_to_waiter(self, item):
+        while self._waiters:
+            fut = self._waiters.popleft()
+            if not fut.done():
+                fut.set_result(item)
+                return True
+        return False
+
+    async def _open(self):
+        try:
+            rec = _PooledConnection(await self.driver.connect())
+        except BaseException as e:
+            # Cancellation too: the slot reserved for this connect must come back
+            if isinstance(e, Exception):
+                self._counters["connect_errors"] += 1
+            self._release_slot()
+            raise
+        self._counters["connects"] += 1
+        return rec
+
+    async def _discard(self, rec):
+        self._counters["discarded"] += 1
+        self._release_slot()
+        await self._close_quietly(rec)
+
+    def _drop(self, rec):
+        """_discard for a caller that is being cancelled: close in the background."""
+        self._counters["discarded"] += 1
+        self._release_slot()
+        task = asyncio.get_running_loop().create_task(self._close_quietly(rec))
+        self._closing.add(task)
+        task.add_done_callback(self._closing.discard)
+
+    async def _close_quietly(self, rec):
+        try:
+            await self.driver.close(rec.conn)
+        except Exception:
+            pass
+
+    def _release_slot(self):
+        if self._closed or not self._hand_to_waiter(_RESERVED):
+            self._size -= 1
+
+    def _expired(self, rec, now):
+        return now - rec.created_at > self.max_lifetime
+
+    async def _is_usable(self, rec):
+        now = time.monotonic()
+        if self._expired(rec, now):
+            return False
+        if now - rec.last_used < self.pre_ping_after:
+            return True
+        try:
+            await self.driver.ping(rec.conn)
+            return True
+        except Exception:
+            return False
+
+    async def _reap_loop(self):
+        while not self._closed:
+            await asyncio.sleep(self.reap_interval)
+            now = time.monotonic()
+            for rec in self._in_use.values():
+                if not rec.leaked and now - rec.checked_out_at > self.leak_threshold:
+                    rec.leaked = True
+                    self._counters["leaks"] += 1
+            victims = []
+            while (self._idle and self._size - len(victims) > self.min_size
+                   and now - self._idle[0].last_used > self.idle_ttl):
+                victims.append(self._idle.popleft())
+            victims.extend(r for r in self._idle if self._expired(r, now))
+            for r in victims:
+                if r in self._idle:
+                    self._idle.remove(r)
+            for i, rec in enumerate(victims):
+                try:
+                    await self._discard(rec)
+                except BaseException:
+                    for rest in victims[i + 1:]:
+                        self._drop(rest)  # cancelled by close(): still free their slots
+                    raise
+            while not self._closed and self._size < self.min_size:
+                self._size += 1
+                try:
+                    self._idle.appendleft(await self._open())
+                except Exception:
+                    break
+
+
+# --------------------------
+# Simulated DB operation (async twin of db_task)
+# --------------------------
+async def async_db_task(pool, task_id, type):
+    try:
+        async with pool.acquire() as conn:
+            await pool.driver.execute(
+                conn,
+                "INSERT INTO test (value, type) VALUES (%s, %s)",
+                (f"Task {task_id}", f"{type}")
+            )
+            await pool.driver.commit(conn)
+            await asyncio.sleep(0.2)  # Simulate slow query
+    except PoolTimeoutError as e:
+        print(f"[task-{task_id}] Gave up: {e}")
+
+
+async def async_run_with_pool(num_tasks, pool_size, driver=None):
+    print("\n--- Running WITH asyncio Connection Pool ---")
+    driver = driver or default_driver()
+    start = time.time()
+    async with AsyncConnectionPool(driver, max_size=pool_size, min_size=pool_size // 10) as pool:
+        await asyncio.gather(*(async_db_task(pool, i, "async") for i in range(num_tasks)))
+        elapsed = time.time() - start
+        stats = pool.stats()
+    wait, hold = stats["acquire_wait"], stats["hold_time"]
+    print(f"Time taken with async pool (size={pool_size}, tasks={num_tasks}): {elapsed:.2f} seconds")
+    print(f"Acquire wait p50/p95/p99: {wait['p50']:.3f}/{wait['p95']:.3f}/{wait['p99']:.3f}s, "
+          f"hold p50: {hold['p50']:.3f}s, timeouts: {stats['timeouts']}, connects: {stats['connects']}")
+
+
+# --------------------------
+# Main execution
+# --------------------------
+if __name__ == "__main__":
+    NUM_TASKS = 10_000
+    POOL_SIZE = 150
+
+    # Swap in default_driver() to hit the real MySQL from DB_CONFIG
+    asyncio.run(async_run_with_pool(NUM_TASKS, POOL_SIZE, driver=FakeMySQLDriver()))
@@ -1,7 +1,9 @@
 import mysql.connector
+import itertools
 import threading
 import time
-from queue import Queue
+from collections import OrderedDict, deque
+from concurrent.futures import Future
 
 # --- DB Config ---
 DB_CONFIG = {
@@ -29,51 +31,609 @@ def init_db():
 # 1. No Connection Pool Class
 # ---------------------------
 class NoConnectionPool:
+    stmt_cache_size = 0  # nothing outlives a connection, so no statement cache
+
+    def __init__(self, connect=None):
+        self._connect = connect or (lambda: mysql.connector.connect(**DB_CONFIG))
+
     def get_connection(self):
         # Creates a new TCP connection each time
-        return mysql.connector.connect(**DB_CONFIG)
+        return self._connect()
 
     def release_connection(self, conn):
         conn.close()
 
+    def execute_prepared(self, conn, sql, params=()):
+        """Same interface as the pooled version; always the text protocol."""
+        cur = conn.cursor()
+        cur.execute(sql, params)
+        return cur
+
 # ------------------------------
 # 2. Blocking Queue Connection Pool
 # ------------------------------
+class PoolTimeoutError(Exception):
+    """Raised when no connection could be acquired within the timeout."""
+
+
+class LatencyHistogram:
+    """
+    Fixed-memory latency histogram with log2 buckets (10us .. ~170s).
+    Percentiles are reported as the upper bound of the matching bucket,
+    which is plenty for pool sizing. Not thread-safe on its own.
+    """
+    BASE = 10e-6
+    NUM_BUCKETS = 25
+
+    def __init__(self):
+        self.counts = [0] * (self.NUM_BUCKETS + 1)  # last bucket = overflow
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def record(self, seconds):
+        idx = 0
+        bound = self.BASE
+        while seconds > bound and idx < self.NUM_BUCKETS:
+            bound *= 2
+            idx += 1
+        self.counts[idx] += 1
+        self.count += 1
+        self.total += seconds
+        self.max = max(self.max, seconds)
+
+    def percentile(self, p):
+        if not self.count:
+            return 0.0
+        rank = p / 100 * self.count
+        seen = 0
+        for idx, c in enumerate(self.counts):
+            seen += c
+            if seen >= rank:
+                return min(self.BASE * 2 ** idx, self.max)
+        return self.max
+
+    def snapshot(self):
+        return {
+            "count": self.count,
+            "avg": self.total / self.count if self.count else 0.0,
+            "p50": self.percentile(50),
+            "p95": self.percentile(95),
+            "p99": self.percentile(99),
+            "max": self.max,
+        }
+
+
+class _PooledConnection:
+    """Bookkeeping for one physical connection owned by the pool."""
+    __slots__ = ("conn", "created_at", "last_used", "checked_out_at", "leaked", "stmt_cache")
+
+    def __init__(self, conn):
+        self.conn = conn
+        self.created_at = time.monotonic()
+        self.last_used = self.created_at
+        self.checked_out_at = None
+        self.leaked = False
+        self.stmt_cache = None  # PreparedStatementCache, created on first use
+
+
+class _Waiter:
+    """A thread parked in get_connection, served strictly in arrival order."""
+    __slots__ = ("event", "rec", "reserved")
+
+    def __init__(self):
+        self.event = threading.Event()
+        self.rec = None         # handed-off idle connection
+        self.reserved = False   # or: permission to open a new one
+
+
 class BlockingQueueConnectionPool:
-    def __init__(self, maxsize):
-        self.pool = Queue(maxsize=maxsize)
-        for _ in range(maxsize):
-            self.pool.put(mysql.connector.connect(**DB_CONFIG))
+    """
+    Elastic blocking pool.
 
-    def get_connection(self):
-        thread_name = threading.current_thread().name
-        # if self.pool.empty():
-        #     print(f"[{thread_name}] Waiting for connection...")
-        conn = self.pool.get()  # Blocks if empty
-        # print(f"[{thread_name}] Acquired connection")
-        return conn
+    - Opens `min_size` connections up front and grows lazily up to `max_size`.
+    - Connections idle longer than `idle_ttl` are closed by a reaper thread
+      (never dropping below `min_size`).
+    - Connections older than `max_lifetime` are recycled on release/checkout.
+    - On checkout, a connection idle longer than `pre_ping_after` is pinged;
+      a dead one is discarded and replaced instead of failing the caller.
+    - Waiters are served FIFO: a released connection is handed directly to
+      the oldest waiting thread, so late arrivals cannot barge in.
+    - `get_connection` gives up after `timeout` seconds with PoolTimeoutError.
+    - Connections checked out longer than `leak_threshold` are counted as leaks.
+    - `stats()` returns wait/hold percentiles, gauges and counters.
+    - With `stmt_cache_size > 0`, `execute_prepared(conn, sql, params)` reuses
+      server-side prepared statements cached on that physical connection;
+      the cache goes away when the connection is recycled.
+    """
+
+    def __init__(self, max_size, min_size=0, idle_ttl=60.0, max_lifetime=1800.0,
+                 pre_ping_after=5.0, reap_interval=5.0, timeout=30.0,
+                 leak_threshold=60.0, connect=None, stmt_cache_size=0):
+        if not 0 <= min_size <= max_size:
+            raise ValueError("need 0 <= min_size <= max_size")
+        self.max_size = max_size
+        self.min_size = min_size
+        self.idle_ttl = idle_ttl
+        self.max_lifetime = max_lifetime
+        self.pre_ping_after = pre_ping_after
+        self.timeout = timeout
+        self.leak_threshold = leak_threshold
+        self.stmt_cache_size = stmt_cache_size
+        self._connect = connect or (lambda: mysql.connector.connect(**DB_CONFIG))
+
+        self._lock = threading.Lock()
+        self._idle = deque()     # right end = most recently used (LIFO keeps the hot set small)
+        self._waiters = deque()  # left end = oldest waiter
+        self._in_use = {}        # id(conn) -> _PooledConnection
+        self._size = 0           # idle + in use + currently being opened
+        self._closed = False
+
+        # Metrics (guarded by self._lock)
+        self._wait_hist = LatencyHistogram()
+        self._hold_hist = LatencyHistogram()
+        self._counters = {"acquired": 0, "timeouts": 0, "connects": 0,
+                          "connect_errors": 0, "discarded": 0, "leaks": 0}
+        self._retired_stmt_stats = {"hits": 0, "misses": 0, "evictions": 0}
+
+        for _ in range(min_size):
+            self._size += 1
+            self._idle.append(self._open())
+
+        self._reaper = threading.Thread(
+            target=self._reap_loop, args=(reap_interval,), name="pool-reaper", daemon=True
+        )
+        self._reaper.start()
+
+    # -- public interface --------------------------------------------------
+    def get_connection(self, timeout=None):
+        timeout = self.timeout if timeout is None else timeout
+        start = time.monotonic()
+        deadline = start + timeout
+        while True:
+            rec = self._take_idle_or_reserve(deadline, timeout)  # Blocks if pool is at max_size and empty
+            if rec is None:
+                # We reserved a slot: open a brand-new connection outside the lock
+                rec = self._open()
+            elif not self._is_usable(rec):
+                self._discard(rec)
+                continue
+            now = time.monotonic()
+            with self._lock:
+                rec.checked_out_at = now
+                rec.leaked = False
+                self._in_use[id(rec.conn)] = rec
+                self._counters["acquired"] += 1
+                self._wait_hist.record(now - start)
+            return rec.conn
 
     def release_connection(self, conn):
-        self.pool.put(conn)
-        thread_name = threading.current_thread().name
-        # print(f"[{thread_name}] Released connection")
+        now = time.monotonic()
+        with self._lock:
+            rec = self._in_use.pop(id(conn), None)
+            if rec is None:
+                raise ValueError("connection does not belong to this pool")
+            self._hold_hist.record(now - rec.checked_out_at)
+            rec.last_used = now
+            rec.checked_out_at = None
+            if not self._closed and not self._expired(rec, now):
+                if self._waiters:
+                    # Direct handoff to the oldest waiter (FIFO fairness)
+                    waiter = self._waiters.popleft()
+                    waiter.rec = rec
+                    waiter.event.set()
+                else:
+                    self._idle.append(rec)
+                return
+        self._discard(rec)
+
+    def execute_prepared(self, conn, sql, params=()):
+        """
+        Run `sql` on a checked-out `conn` as a cached server-side prepared
+        statement and return the cursor (fetch its rows before reusing `sql`).
+        Falls back to a plain text-protocol cursor when the cache is disabled.
+        """
+        if not self.stmt_cache_size:
+            cur = conn.cursor()
+            cur.execute(sql, params)
+            return cur
+        with self._lock:
+            rec = self._in_use.get(id(conn))
+            if rec is None:
+                raise ValueError("connection is not checked out from this pool")
+            if rec.stmt_cache is None:
+                rec.stmt_cache = PreparedStatementCache(conn, self.stmt_cache_size)
+        # Only the thread holding `conn` touches its cache: no lock needed here
+        return rec.stmt_cache.execute(sql, params)
+
+    def stats(self):
+        """Point-in-time snapshot of pool metrics (times in seconds)."""
+        now = time.monotonic()
+        with self._lock:
+            stmt_stats = dict(self._retired_stmt_stats)
+            for rec in itertools.chain(self._idle, self._in_use.values()):
+                if rec.stmt_cache is not None:
+                    for key, value in rec.stmt_cache.stats().items():
+                        stmt_stats[key] += value
+            return {
+                "size": self._size,
+                "max_size": self.max_size,
+                "min_size": self.min_size,
+                "in_use": len(self._in_use),
+                "idle": len(self._idle),
+                "waiting": len(self._waiters),
+                "held_past_leak_threshold": sum(
+                    1 for r in self._in_use.values()
+                    if now - r.checked_out_at > self.leak_threshold
+                ),
+                "acquire_wait": self._wait_hist.snapshot(),
+                "hold_time": self._hold_hist.snapshot(),
+                "stmt_cache": stmt_stats,
+                **self._counters,
+            }
+
+    def close(self):
+        """Close idle connections; in-use ones are closed when released."""
+        with self._lock:
+            self._closed = True
+            idle, self._idle = list(self._idle), deque()
+            waiters, self._waiters = list(self._waiters), deque()
+        for waiter in waiters:
+            waiter.event.set()  # wakes up with neither rec nor reservation -> closed
+        for rec in idle:
+            self._discard(rec)
+
+    # -- internals ---------------------------------------------------------
+    def _take_idle_or_reserve(self, deadline, timeout):
+        with self._lock:
+            if self._closed:
+                raise RuntimeError("pool is closed")
+            if self._idle:
+                return self._idle.pop()
+            if self._size < self.max_size:
+                self._size += 1
+                return None
+            waiter = _Waiter()
+            self._waiters.append(waiter)
+
+        waiter.event.wait(max(0.0, deadline - time.monotonic()))
+
+        with self._lock:
+            if not waiter.event.is_set():
+                self._waiters.remove(waiter)
+                self._counters["timeouts"] += 1
+                raise PoolTimeoutError(
+                    f"no connection available within {timeout:.1f}s "
+                    f"(size={self._size}, in_use={len(self._in_use)}, waiting={len(self._waiters)})"
+                )
+        if waiter.rec is not None:
+            return waiter.rec
+        if waiter.reserved:
+            return None
+        raise RuntimeError("pool is closed")
+
+    def _open(self):
+        try:
+            rec = _PooledConnection(self._connect())
+        except Exception:
+            with self._lock:
+                self._counters["connect_errors"] += 1
+            self._release_slot()
+            raise
+        with self._lock:
+            self._counters["connects"] += 1
+        return rec
+
+    def _discard(self, rec):
+        # Server-side statements die with the connection; just keep the counts
+        try:
+            rec.conn.close()
+        except Exception:
+            pass
+        with self._lock:
+            self._counters["discarded"] += 1
+            if rec.stmt_cache is not None:
+                for key, value in rec.stmt_cache.stats().items():
+                    self._retired_stmt_stats[key] += value
+                rec.stmt_cache = None
+        self._release_slot()
+
+    def _release_slot(self):
+        """Give a freed slot to the oldest waiter, or shrink the pool."""
+        with self._lock:
+            if self._waiters and not self._closed:
+                waiter = self._waiters.popleft()
+                waiter.reserved = True  # slot is transferred, size unchanged
+                waiter.event.set()
+            else:
+                self._size -= 1
+
+    def _expired(self, rec, now):
+        return now - rec.created_at > self.max_lifetime
+
+    def _is_usable(self, rec):
+        now = time.monotonic()
+        if self._expired(rec, now):
+            return False
+        if now - rec.last_used < self.pre_ping_after:
+            return True  # recently used: skip the round-trip
+        try:
+            rec.conn.ping(reconnect=False)
+            return True
+        except Exception:
+            return False
+
+    def _reap_loop(self, interval):
+        while True:
+            time.sleep(interval)
+            with self._lock:
+                if self._closed:
+                    return
+                now = time.monotonic()
+                for rec in self._in_use.values():
+                    if not rec.leaked and now - rec.checked_out_at > self.leak_threshold:
+                        rec.leaked = True
+                        self._counters["leaks"] += 1
+                victims = []
+                # Oldest-idle records sit at the left end
+                while (self._idle and self._size - len(victims) > self.min_size
+                       and now - self._idle[0].last_used > self.idle_ttl):
+                    victims.append(self._idle.popleft())
+                victims.extend(r for r in self._idle if self._expired(r, now))
+                for r in victims:
+                    if r in self._idle:
+                        self._idle.remove(r)
+            for rec in victims:
+                self._discard(rec)
+            while True:
+                with self._lock:
+                    if self._closed or self._size >= self.min_size:
+                        break
+                    self._size += 1
+                try:
+                    rec = self._open()
+                except Exception:
+                    break
+                with self._lock:
+                    # Below min_size nobody can be waiting (freed slots go to waiters first)
+                    self._idle.appendleft(rec)
+
+# ------------------------------
+# 3. Group-commit batching writer
+# ------------------------------
+class BatchingWriter:
+    """
+    Coalesces single-row INSERTs from many threads into multi-row INSERTs
+    with one COMMIT per batch, in front of any pool with
+    get_connection/release_connection.
+
+    - `submit(row)` returns a concurrent.futures.Future (None on success).
+    - A flusher thread takes up to `max_batch` rows, waiting at most
+      `max_linger` seconds for a batch to fill once the first row arrives.
+    - If the multi-row INSERT fails, the batch is replayed row by row in one
+      transaction so only the offending rows' futures get the exception.
+    - `submit` blocks while more than `max_pending` rows are queued.
+    """
+
+    def __init__(self, pool, table, columns, max_batch=200, max_linger=0.005,
+                 max_pending=10_000, flushers=1):
+        self.pool = pool
+        self.max_batch = max_batch
+        self.max_linger = max_linger
+        self.max_pending = max_pending
+        self._insert_prefix = f"INSERT INTO {table} ({', '.join(columns)}) VALUES "
+        self._row_placeholders = "(" + ", ".join(["%s"] * len(columns)) + ")"
+
+        self._cond = threading.Condition()
+        self._pending = deque()  # (row, future)
+        self._closed = False
+        self._counters = {"rows": 0, "batches": 0, "row_errors": 0, "fallbacks": 0}
+
+        self._threads = [
+            threading.Thread(target=self._flush_loop, name=f"batch-flusher-{i}", daemon=True)
+            for i in range(flushers)
+        ]
+        for t in self._threads:
+            t.start()
+
+    def submit(self, row):
+        fut = Future()
+        with self._cond:
+            while len(self._pending) >= self.max_pending and not self._closed:
+                self._cond.wait()
+            if self._closed:
+                raise RuntimeError("writer is closed")
+            self._pending.append((tuple(row), fut))
+            self._cond.notify_all()
+        return fut
+
+    def write(self, row, timeout=None):
+        """Submit and wait; raises the row's own error, if any."""
+        return self.submit(row).result(timeout)
+
+    def stats(self):
+        with self._cond:
+            stats = dict(self._counters, pending=len(self._pending))
+        stats["avg_batch"] = stats["rows"] / stats["batches"] if stats["batches"] else 0.0
+        return stats
+
+    def close(self):
+        """Flush everything still queued, then stop the flusher threads."""
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+        for t in self._threads:
+            t.join()
+
+    # -- internals ---------------------------------------------------------
+    def _next_batch(self):
+        with self._cond:
+            while not self._pending and not self._closed:
+                self._cond.wait()
+            if not self._pending:
+                return None  # closed and drained
+            deadline = time.monotonic() + self.max_linger
+            while len(self._pending) < self.max_batch and not self._closed:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                self._cond.wait(remaining)
+            batch = [self._pending.popleft() for _ in range(min(self.max_batch, len(self._pending)))]
+            self._cond.notify_all()  # wake submitters blocked on max_pending
+            return batch
+
+    def _flush_loop(self):
+        while True:
+            batch = self._next_batch()
+            if batch is None:
+                return
+            self._flush(batch)
+
+    def _flush(self, batch):
+        try:
+            conn = self.pool.get_connection()
+        except Exception as e:
+            for _, fut in batch:
+                fut.set_exception(e)
+            return
+        fallback = False
+        errors = [None] * len(batch)
+        try:
+            cur = conn.cursor()
+            try:
+                cur.execute(
+                    self._insert_prefix + ", ".join([self._row_placeholders] * len(batch)),
+                    [value for row, _ in batch for value in row],
+                )
+            except mysql.connector.Error:
+                # Replay row by row: InnoDB rolls back only the failing statement
+                fallback = True
+                conn.rollback()
+                single = self._insert_prefix + self._row_placeholders
+                for i, (row, _) in enumerate(batch):
+                    try:
+                        cur.execute(single, row)
+                    except mysql.connector.Error as e:
+                        errors[i] = e
+            conn.commit()
+            cur.close()
+        except Exception as e:
+            for _, fut in batch:
+                fut.set_exception(e)
+            return
+        finally:
+            self.pool.release_connection(conn)
+
+        for (_, fut), err in zip(batch, errors):
+            if err is None:
+                fut.set_result(None)
+            else:
+                fut.set_exception(err)
+        with self._cond:
+            self._counters["batches"] += 1
+            self._counters["rows"] += len(batch)
+            self._counters["row_errors"] += sum(e is not None for e in errors)
+            self._counters["fallbacks"] += fallback
+
+# ------------------------------
+# 4. Per-connection prepared statement cache
+# ------------------------------
+class PreparedStatementCache:
+    """
+    LRU of server-side prepared statements for ONE connection, keyed by SQL text.
+
+    Each entry is a `cursor(prepared=True)` that has already prepared its
+    statement; re-executing the same SQL object on it skips COM_STMT_PREPARE
+    (mysql.connector only reuses the statement when it is passed the very same
+    string object, so we always hand it the cached key). Evicted entries are
+    closed, which sends COM_STMT_CLOSE. Not thread-safe: a connection is only
+    used by the thread that checked it out.
+    """
+
+    def __init__(self, conn, max_size=64):
+        self.conn = conn
+        self.max_size = max_size
+        self._entries = OrderedDict()  # sql -> (canonical sql object, cursor)
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def execute(self, sql, params=()):
+        entry = self._entries.get(sql)
+        if entry is not None:
+            self._entries.move_to_end(sql)
+            self.hits += 1
+        else:
+            self.misses += 1
+            entry = (sql, self.conn.cursor(prepared=True))
+            self._entries[sql] = entry
+            if len(self._entries) > self.max_size:
+                _, (_, old) = self._entries.popitem(last=False)
+                self.evictions += 1
+                try:
+                    old.close()
+                except Exception:
+                    pass
+        canonical, cur = entry
+        try:
+            cur.execute(canonical, params)
+        except (mysql.connector.IntegrityError, mysql.connector.DataError):
+            raise  # bad row, statement is still fine
+        except Exception:
+            # Don't keep a cursor in an unknown state around
+            self._entries.pop(sql, None)
+            try:
+                cur.close()
+            except Exception:
+                pass
+            raise
+        return cur
+
+    def clear(self):
+        for _, cur in self._entries.values():
+            try:
+                cur.close()
+            except Exception:
+                pass
+        self._entries.clear()
+
+    def stats(self):
+        return {"hits": self.hits, "misses": self.misses, "evictions": self.evictions}
 
 # --------------------------
 # Simulated DB operation
 # --------------------------
 def db_task(pool, task_id, type):
     thread_name = threading.current_thread().name
-    conn = pool.get_connection()
-    cur = conn.cursor()
-    cur.execute(
-        "INSERT INTO test (value, type) VALUES (%s, %s)",
-        (f"Task {task_id}", f"{type}")
-    )
-    conn.commit()
-    time.sleep(0.2)  # Simulate slow query
-    pool.release_connection(conn)
+    try:
+        conn = pool.get_connection()
+    except PoolTimeoutError as e:
+        print(f"[{thread_name}] Gave up on task {task_id}: {e}")
+        return
+    try:
+        # Server-side prepared statement cached on this connection when the
+        # pool has a statement cache; plain text protocol otherwise
+        cur = pool.execute_prepared(
+            conn,
+            "INSERT INTO test (value, type) VALUES (%s, %s)",
+            (f"Task {task_id}", f"{type}")
+        )
+        if not pool.stmt_cache_size:
+            cur.close()  # cached prepared cursors stay open on purpose
+        conn.commit()
+        time.sleep(0.2)  # Simulate slow query
+    finally:
+        pool.release_connection(conn)
     # print(f"[{thread_name}] Finished task {task_id}")
 
+def db_task_batched(writer, task_id, type):
+    # Same row as db_task, but coalesced with other threads' rows into one commit
+    thread_name = threading.current_thread().name
+    try:
+        writer.write((f"Task {task_id}", f"{type}"))
+    except Exception as e:
+        print(f"[{thread_name}] Task {task_id} failed: {e}")
+
 # --------------------------
 # Test functions
 # --------------------------
@@ -90,18 +650,38 @@ def run_without_pool(num_tasks):
         t.join()
     print(f"Time taken without pool: {time.time() - start:.2f} seconds")
 
-def run_with_pool(num_tasks, pool_size):
-    print("\n--- Running WITH Blocking Queue Connection Pool ---")
-    pool = BlockingQueueConnectionPool(maxsize=pool_size)
+def run_with_pool(num_tasks, pool_size, batch=False, stmt_cache_size=0):
+    mode = "Group-Commit Batching Writer" if batch else "Blocking Queue Connection Pool"
+    print(f"\n--- Running WITH {mode} ---")
+    pool = BlockingQueueConnectionPool(max_size=pool_size, min_size=pool_size // 10,
+                                       stmt_cache_size=stmt_cache_size)
+    writer = BatchingWriter(pool, "test", ("value", "type")) if batch else None
     threads = []
     start = time.time()
     for i in range(num_tasks):
-        t = threading.Thread(target=db_task, args=(pool, i, "pool"), name=f"Thread-{i}")
+        if batch:
+            t = threading.Thread(target=db_task_batched, args=(writer, i, "batch"), name=f"Thread-{i}")
+        else:
+            t = threading.Thread(target=db_task, args=(pool, i, "pool"), name=f"Thread-{i}")
         t.start()
         threads.append(t)
     for t in threads:
         t.join()
-    print(f"Time taken with pool (size={pool_size}): {time.time() - start:.2f} seconds")
+    elapsed = time.time() - start
+    print(f"Time taken with pool (size={pool_size}): {elapsed:.2f} seconds "
+          f"({num_tasks / elapsed:.0f} rows/sec)")
+    if writer:
+        writer.close()
+        ws = writer.stats()
+        print(f"Batches: {ws['batches']}, avg batch: {ws['avg_batch']:.1f} rows, row errors: {ws['row_errors']}")
+    stats = pool.stats()
+    wait, hold = stats["acquire_wait"], stats["hold_time"]
+    print(f"Acquire wait p50/p95/p99: {wait['p50']:.3f}/{wait['p95']:.3f}/{wait['p99']:.3f}s, "
+          f"hold p50: {hold['p50']:.3f}s, timeouts: {stats['timeouts']}, connects: {stats['connects']}")
+    if stmt_cache_size:
+        sc = stats["stmt_cache"]
+        print(f"Prepared statements: {sc['hits']} cache hits, {sc['misses']} prepares")
+    pool.close()
 
 # --------------------------
 # Main execution
@@ -114,3 +694,5 @@ if __name__ == "__main__":
 
     # run_without_pool(NUM_TASKS)
     run_with_pool(NUM_TASKS, POOL_SIZE)
+    # run_with_pool(NUM_TASKS, POOL_SIZE, stmt_cache_size=32)  # prepared INSERT
+    # run_with_pool(NUM_TASKS, POOL_SIZE, batch=True)
@@ -0,0 +1,281 @@
+"""
+Tiny protocol-level MySQL stand-in for local benchmarks.
+
+It speaks just enough of the MySQL client/server protocol for
+mysql.connector (pure Python or C extension) to connect, run queries,
+ping and commit — without a real database behind it:
+
+- Handshake v10 + mysql_native_password; any user/password is accepted.
+- COM_QUERY: SELECTs return a single row `(1,)` (`@@variables` read as ''),
+  everything else returns an OK packet with affected_rows = number of VALUES tuples.
+- COM_STMT_PREPARE / EXECUTE / RESET / CLOSE (binary protocol, same results).
+- COM_PING / COM_INIT_DB / COM_RESET_CONNECTION (mysql.connector.pooling) / COM_QUIT.
+
+Costs are simulated with sleeps so pool strategies can be compared:
+`connect_cost` (handshake), `query_latency` (per statement),
+`parse_latency` (per text query and per PREPARE, skipped when executing an
+already prepared statement) and `commit_latency` (per COMMIT).
+One thread per client connection.
+
+    server = FakeMySQLServer(connect_cost=0.02, query_latency=0.002).start()
+    mysql.connector.connect(host="127.0.0.1", port=server.port, user="root", password="")
+"""
+
+import os
+import socket
+import socketserver
+import struct
+import threading
+import time
+
+# Capability flags we advertise (no SSL, no DEPRECATE_EOF -> classic EOF packets)
+CLIENT_LONG_PASSWORD = 0x00000001
+CLIENT_FOUND_ROWS = 0x00000002
+CLIENT_LONG_FLAG = 0x00000004
+CLIENT_CONNECT_WITH_DB = 0x00000008
+CLIENT_PROTOCOL_41 = 0x00000200
+CLIENT_TRANSACTIONS = 0x00002000
+CLIENT_SECURE_CONNECTION = 0x00008000
+CLIENT_MULTI_RESULTS = 0x00020000
+CLIENT_PLUGIN_AUTH = 0x00080000
+CLIENT_PLUGIN_AUTH_LENENC_DATA = 0x00200000
+
+SERVER_CAPABILITIES = (
+    CLIENT_LONG_PASSWORD | CLIENT_FOUND_ROWS | CLIENT_LONG_FLAG | CLIENT_CONNECT_WITH_DB
+    | CLIENT_PROTOCOL_41 | CLIENT_TRANSACTIONS | CLIENT_SECURE_CONNECTION
+    | CLIENT_MULTI_RESULTS | CLIENT_PLUGIN_AUTH | CLIENT_PLUGIN_AUTH_LENENC_DATA
+)
+SERVER_STATUS_AUTOCOMMIT = 0x0002
+CHARSET_UTF8MB4 = 45
+
+COM_QUIT = 0x01
+COM_INIT_DB = 0x02
+COM_QUERY = 0x03
+COM_PING = 0x0E
+COM_STMT_PREPARE = 0x16
+COM_STMT_EXECUTE = 0x17
+COM_STMT_CLOSE = 0x19
+COM_STMT_RESET = 0x1A
+COM_RESET_CONNECTION = 0x1F
+
+
+def lenenc_int(n):
+    if n < 251:
+        return bytes([n])
+    if n < 2 ** 16:
+        return b"\xfc" + struct.pack("<H", n)
+    if n < 2 ** 24:
+        return b"\xfd" + struct.pack("<I", n)[:3]
+    return b"\xfe" + struct.pack("<Q", n)
+
+
+def lenenc_str(s):
+    if isinstance(s, str):
+        s = s.encode()
+    return lenenc_int(len(s)) + s
+
+
+class _Session(socketserver.BaseRequestHandler):
+    """One client connection."""
+
+    def setup(self):
+        self.request.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        self.seq = 0
+        self.statements = {}  # stmt_id -> statement verb
+
+    # -- packet framing ----------------------------------------------------
+    def _recv_exact(self, n):
+        buf = b""
+        while len(buf) < n:
+            chunk = self.request.recv(n - len(buf))
+            if not chunk:
+                raise ConnectionError("client went away")
+            buf += chunk
+        return buf
+
+    def read_packet(self):
+        header = self._recv_exact(4)
+        length = header[0] | header[1] << 8 | header[2] << 16
+        self.seq = (header[3] + 1) & 0xFF
+        return self._recv_exact(length)
+
+    def write_packets(self, *payloads):
+        out = []
+        for payload in payloads:
+            out.append(struct.pack("<I", len(payload))[:3] + bytes([self.seq]) + payload)
+            self.seq = (self.seq + 1) & 0xFF
+        self.request.sendall(b"".join(out))
+
+    def ok(self, affected_rows=0, last_insert_id=0):
+        return (b"\x00" + lenenc_int(affected_rows) + lenenc_int(last_insert_id)
+                + struct.pack("<HH", SERVER_STATUS_AUTOCOMMIT, 0))
+
+    def eof(self):
+        return b"\xfe" + struct.pack("<HH", 0, SERVER_STATUS_AUTOCOMMIT)
+
+    def err(self, code, message):
+        return b"\xff" + struct.pack("<H", code) + b"#HY000" + message.encode()
+
+    def column_def(self, name, type_code=0x08):  # 0x08 = LONGLONG
+        return (lenenc_str("def") + lenenc_str("") + lenenc_str("") + lenenc_str("")
+                + lenenc_str(name) + lenenc_str(name) + b"\x0c"
+                + struct.pack("<HIBHB", 63, 21, type_code, 0, 0) + b"\x00\x00")
+
+    def single_row_result(self, columns=("1",), values=("1",), type_code=0x08):
+        return (lenenc_int(len(columns)), *(self.column_def(c, type_code) for c in columns),
+                self.eof(), b"".join(lenenc_str(v) for v in values), self.eof())
+
+    # -- protocol ----------------------------------------------------------
+    def handshake(self):
+        server = self.server
+        time.sleep(server.connect_cost)
+        scramble = os.urandom(20)
+        with server.lock:
+            server.connects += 1
+            conn_id = server.connects
+        caps = SERVER_CAPABILITIES
+        greeting = (
+            b"\x0a" + b"8.0.0-fake\x00" + struct.pack("<I", conn_id)
+            + scramble[:8] + b"\x00"
+            + struct.pack("<H", caps & 0xFFFF) + bytes([CHARSET_UTF8MB4])
+            + struct.pack("<H", SERVER_STATUS_AUTOCOMMIT) + struct.pack("<H", caps >> 16)
+            + bytes([21]) + b"\x00" * 10 + scramble[8:] + b"\x00"
+            + b"mysql_native_password\x00"
+        )
+        self.write_packets(greeting)
+        self.read_packet()  # handshake response: accept whatever credentials
+        self.write_packets(self.ok())
+
+    def handle(self):
+        try:
+            self.handshake()
+            while True:
+                packet = self.read_packet()
+                command, body = packet[0], packet[1:]
+                if command == COM_QUIT:
+                    return
+                if command in (COM_PING, COM_INIT_DB, COM_RESET_CONNECTION):
+                    self.write_packets(self.ok())
+                elif command == COM_QUERY:
+                    self.write_packets(*self.handle_query(body.decode(errors="replace")))
+                elif command == COM_STMT_PREPARE:
+                    self.write_packets(*self.handle_prepare(body.decode(errors="replace")))
+                elif command == COM_STMT_EXECUTE:
+                    self.write_packets(*self.handle_execute(struct.unpack("<I", body[:4])[0]))
+                elif command == COM_STMT_RESET:
+                    self.write_packets(self.ok())
+                elif command == COM_STMT_CLOSE:
+                    self.statements.pop(struct.unpack("<I", body[:4])[0], None)  # no response
+                else:
+                    self.write_packets(self.err(1047, f"unsupported command 0x{command:02x}"))
+        except (ConnectionError, OSError):
+            pass
+
+    def handle_query(self, sql):
+        server = self.server
+        verb = sql.lstrip().split(None, 1)[0].upper() if sql.strip() else ""
+        if verb in ("SET", "SHOW", "USE", "START", "BEGIN", "ROLLBACK"):
+            return (self.ok(),)
+        if verb == "SELECT" and "@@" in sql:
+            # Session variable probes from the driver (e.g. @@session.sql_mode): empty strings
+            names = [part.strip() for part in sql.split(None, 1)[1].split(",")]
+            return self.single_row_result(names, [""] * len(names), type_code=0xFD)
+        with server.lock:
+            server.queries += 1
+        time.sleep(server.parse_latency)
+        return self.run_statement(verb, sql)
+
+    def run_statement(self, verb, sql="", binary=False):
+        server = self.server
+        if verb == "COMMIT":
+            time.sleep(server.commit_latency)
+            with server.lock:
+                server.commits += 1
+            return (self.ok(),)
+        time.sleep(server.query_latency)
+        if verb == "SELECT":
+            if binary:
+                # Binary row: header, NULL bitmap (1 column + 2 offset bits), LONGLONG value
+                return (lenenc_int(1), self.column_def("1"), self.eof(),
+                        b"\x00\x00" + struct.pack("<q", 1), self.eof())
+            return self.single_row_result()
+        rows = max(1, sql.count("),") + 1) if verb == "INSERT" else 0
+        return (self.ok(affected_rows=rows),)
+
+    def handle_prepare(self, sql):
+        server = self.server
+        verb = sql.lstrip().split(None, 1)[0].upper() if sql.strip() else ""
+        with server.lock:
+            server.prepares += 1
+            stmt_id = server.prepares
+        time.sleep(server.parse_latency)
+        self.statements[stmt_id] = (verb, sql)
+        num_params = sql.count("?")
+        num_columns = 1 if verb == "SELECT" else 0
+        packets = [b"\x00" + struct.pack("<IHHBH", stmt_id, num_columns, num_params, 0, 0)]
+        if num_params:
+            packets += [self.column_def("?", 0xFD) for _ in range(num_params)] + [self.eof()]
+        if num_columns:
+            packets += [self.column_def("1"), self.eof()]
+        return packets
+
+    def handle_execute(self, stmt_id):
+        if stmt_id not in self.statements:
+            return (self.err(1243, f"Unknown prepared statement handler ({stmt_id})"),)
+        verb, sql = self.statements[stmt_id]
+        with self.server.lock:
+            self.server.queries += 1
+        return self.run_statement(verb, sql, binary=True)
+
+
+class FakeMySQLServer(socketserver.ThreadingTCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+    request_queue_size = 1024
+
+    def __init__(self, host="127.0.0.1", port=0, connect_cost=0.0,
+                 query_latency=0.0, commit_latency=0.0, parse_latency=0.0):
+        super().__init__((host, port), _Session)
+        self.connect_cost = connect_cost
+        self.query_latency = query_latency
+        self.commit_latency = commit_latency
+        self.parse_latency = parse_latency
+        self.lock = threading.Lock()
+        self.connects = 0
+        self.queries = 0
+        self.commits = 0
+        self.prepares = 0
+        self._thread = None
+
+    @property
+    def port(self):
+        return self.server_address[1]
+
+    def config(self, database="local"):
+        """Connection kwargs for mysql.connector.connect()."""
+        return {"host": self.server_address[0], "port": self.port, "user": "root",
+                "password": "", "database": database}
+
+    def counters(self):
+        with self.lock:
+            return {"connects": self.connects, "queries": self.queries,
+                    "commits": self.commits, "prepares": self.prepares}
+
+    def reset_counters(self):
+        with self.lock:
+            self.connects = self.queries = self.commits = self.prepares = 0
+
+    def start(self):
+        self._thread = threading.Thread(target=self.serve_forever, name="fake-mysql", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.shutdown()
+        self.server_close()
+
+
+if __name__ == "__main__":
+    server = FakeMySQLServer(port=int(os.getenv("FAKE_MYSQL_PORT", "3307")))
+    print(f"Fake MySQL listening on {server.server_address[0]}:{server.port}")
+    server.serve_forever()
@@ -0,0 +1,295 @@
+"""
+Reproducible connection-pool benchmark.
+
+Sweeps task count x pool size x worker concurrency x simulated query
+latency for each pool strategy and reports throughput, p50/p99 task
+latency and how many physical connections were opened. The "batched"
+strategy puts a group-commit BatchingWriter in front of the blocking pool,
+so its throughput is rows/sec with one COMMIT per batch. The "prepared"
+strategy is "blocking" with the per-connection prepared-statement cache
+(binary protocol) instead of text-protocol queries.
+
+By default every run talks to an in-process FakeMySQLServer (real MySQL
+wire protocol, simulated costs), so no database is needed. Pass
+--mysql-host to run against a real server instead (query latency is then
+whatever the server gives you; --latencies is ignored).
+
+Tasks run on a ThreadPoolExecutor with `workers` threads (or a semaphore
+of the same size for the asyncio strategy) instead of one thread per task.
+
+Examples:
+    python pool_benchmark.py
+    python pool_benchmark.py --tasks 1500 --pool-sizes 10,50,150 --workers 50,300 \\
+        --latencies 0.001,0.01 --connect-cost 0.02 --csv results.csv --json results.json
+"""
+
+import argparse
+import asyncio
+import csv
+import itertools
+import json
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import mysql.connector
+
+from async_connection_pool import AsyncConnectionPool, ThreadedMySQLDriver
+from connection_pool_queue import BatchingWriter, BlockingQueueConnectionPool, NoConnectionPool
+from fake_mysql_server import FakeMySQLServer
+
+INSERT_SQL = "INSERT INTO test (value, type) VALUES (%s, %s)"
+
+
+def percentile(sorted_values, p):
+    if not sorted_values:
+        return 0.0
+    idx = min(len(sorted_values) - 1, max(0, round(p / 100 * len(sorted_values)) - 1))
+    return sorted_values[idx]
+
+
+class CountingConnect:
+    """connect() factory that counts how many physical connections were opened."""
+
+    def __init__(self, config):
+        self.config = config
+        self.count = 0
+        self._lock = threading.Lock()
+
+    def __call__(self):
+        conn = mysql.connector.connect(**self.config)
+        with self._lock:
+            self.count += 1
+        return conn
+
+
+# --------------------------
+# Strategies
+# --------------------------
+def _threaded_run(pool, tasks, workers, hold, prepared=False):
+    latencies = [0.0] * tasks
+    errors = 0
+
+    def task(i):
+        t0 = time.perf_counter()
+        conn = pool.get_connection()
+        try:
+            if prepared:
+                cur = pool.execute_prepared(conn, INSERT_SQL, (f"Task {i}", "bench"))
+            else:
+                cur = conn.cursor()
+                cur.execute(INSERT_SQL, (f"Task {i}", "bench"))
+            conn.commit()
+            if not prepared:
+                cur.close()  # cached prepared cursors stay open on purpose
+            if hold:
+                time.sleep(hold)
+        finally:
+            pool.release_connection(conn)
+        latencies[i] = time.perf_counter() - t0
+
+    with ThreadPoolExecutor(max_workers=workers) as ex:
+        for fut in [ex.submit(task, i) for i in range(tasks)]:
+            if fut.exception() is not None:
+                errors += 1
+    return latencies, errors
+
+
+def run_nopool(config, tasks, pool_size, workers, hold):
+    connect = CountingConnect(config)
+    latencies, errors = _threaded_run(NoConnectionPool(connect=connect), tasks, workers, hold)
+    return latencies, errors, connect.count
+
+
+def run_blocking(config, tasks, pool_size, workers, hold):
+    connect = CountingConnect(config)
+    pool = BlockingQueueConnectionPool(max_size=pool_size, min_size=0, connect=connect)
+    try:
+        latencies, errors = _threaded_run(pool, tasks, workers, hold)
+    finally:
+        pool.close()
+    return latencies, errors, connect.count
+
+
+def run_prepared(config, tasks, pool_size, workers, hold):
+    connect = CountingConnect(config)
+    pool = BlockingQueueConnectionPool(max_size=pool_size, min_size=0, connect=connect,
+                                       stmt_cache_size=32)
+    try:
+        latencies, errors = _threaded_run(pool, tasks, workers, hold, prepared=True)
+    finally:
+        pool.close()
+    return latencies, errors, connect.count
+
+
+def run_batched(config, tasks, pool_size, workers, hold):
+    # Each task waits for its row to be group-committed; `hold` does not apply (no checkout)
+    connect = CountingConnect(config)
+    pool = BlockingQueueConnectionPool(max_size=pool_size, min_size=0, connect=connect)
+    writer = BatchingWriter(pool, "test", ("value", "type"), flushers=min(pool_size, 4))
+    latencies = [0.0] * tasks
+    errors = 0
+
+    def task(i):
+        t0 = time.perf_counter()
+        writer.write((f"Task {i}", "bench"))
+        latencies[i] = time.perf_counter() - t0
+
+    try:
+        with ThreadPoolExecutor(max_workers=workers) as ex:
+            for fut in [ex.submit(task, i) for i in range(tasks)]:
+                if fut.exception() is not None:
+                    errors += 1
+    finally:
+        writer.close()
+        pool.close()
+    return latencies, errors, connect.count
+
+
+def run_async(config, tasks, pool_size, workers, hold):
+    async def main():
+        # ThreadedMySQLDriver runs on the default executor: size it like the other strategies
+        asyncio.get_running_loop().set_default_executor(ThreadPoolExecutor(max_workers=workers))
+        driver = ThreadedMySQLDriver(config)
+        latencies = [0.0] * tasks
+        errors = 0
+        sem = asyncio.Semaphore(workers)
+
+        async def task(i):
+            nonlocal errors
+            async with sem:
+                t0 = time.perf_counter()
+                try:
+                    async with pool.acquire() as conn:
+                        await driver.execute(conn, INSERT_SQL, (f"Task {i}", "bench"))
+                        await driver.commit(conn)
+                        if hold:
+                            await asyncio.sleep(hold)
+                except Exception:
+                    errors += 1
+                latencies[i] = time.perf_counter() - t0
+
+        async with AsyncConnectionPool(driver, max_size=pool_size) as pool:
+            await asyncio.gather(*(task(i) for i in range(tasks)))
+            connects = pool.stats()["connects"]
+        return latencies, errors, connects
+
+    return asyncio.run(main())
+
+
+STRATEGIES = {
+    "nopool": run_nopool,
+    "blocking": run_blocking,
+    "prepared": run_prepared,
+    "batched": run_batched,
+    "async": run_async,
+}
+
+
+# --------------------------
+# Runner
+# --------------------------
+def run_case(strategy, config, tasks, pool_size, workers, hold):
+    start = time.perf_counter()
+    latencies, errors, connects = STRATEGIES[strategy](config, tasks, pool_size, workers, hold)
+    elapsed = time.perf_counter() - start
+    latencies.sort()
+    return {
+        "elapsed_s": round(elapsed, 4),
+        "throughput_tps": round(tasks / elapsed, 1),
+        "p50_ms": round(percentile(latencies, 50) * 1000, 3),
+        "p99_ms": round(percentile(latencies, 99) * 1000, 3),
+        "connects": connects,
+        "errors": errors,
+    }
+
+
+def int_list(s):
+    return [int(x) for x in s.split(",")]
+
+
+def float_list(s):
+    return [float(x) for x in s.split(",")]
+
+
+def main(argv=None):
+    p = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    p.add_argument("--strategies", default=",".join(STRATEGIES))
+    p.add_argument("--tasks", type=int_list, default=[1500])
+    p.add_argument("--pool-sizes", type=int_list, default=[10, 50, 150])
+    p.add_argument("--workers", type=int_list, default=[50, 300])
+    p.add_argument("--latencies", type=float_list, default=[0.001, 0.01],
+                   help="simulated per-query latency in seconds (fake server only)")
+    p.add_argument("--connect-cost", type=float, default=0.02,
+                   help="simulated handshake cost in seconds (fake server only)")
+    p.add_argument("--commit-latency", type=float, default=0.002,
+                   help="simulated COMMIT cost in seconds (fake server only)")
+    p.add_argument("--parse-latency", type=float, default=0.0005,
+                   help="simulated SQL parse cost in seconds, paid by text queries and "
+                        "PREPARE but not by cached prepared executes (fake server only)")
+    p.add_argument("--hold", type=float, default=0.0,
+                   help="extra seconds each task keeps its connection after commit")
+    p.add_argument("--mysql-host", help="benchmark a real MySQL server instead of the fake one")
+    p.add_argument("--mysql-port", type=int, default=3306)
+    p.add_argument("--mysql-user", default="root")
+    p.add_argument("--mysql-password", default="")
+    p.add_argument("--mysql-database", default="local")
+    p.add_argument("--csv", help="write results as CSV to this path")
+    p.add_argument("--json", help="write results as JSON to this path")
+    args = p.parse_args(argv)
+
+    strategies = args.strategies.split(",")
+    unknown = set(strategies) - set(STRATEGIES)
+    if unknown:
+        p.error(f"unknown strategies: {', '.join(sorted(unknown))}")
+
+    results = []
+    latencies = [None] if args.mysql_host else args.latencies
+    for query_latency in latencies:
+        server = None
+        if args.mysql_host:
+            config = {"host": args.mysql_host, "port": args.mysql_port, "user": args.mysql_user,
+                      "password": args.mysql_password, "database": args.mysql_database}
+        else:
+            server = FakeMySQLServer(connect_cost=args.connect_cost, query_latency=query_latency,
+                                     commit_latency=args.commit_latency,
+                                     parse_latency=args.parse_latency).start()
+            config = server.config(args.mysql_database)
+        try:
+            seen = set()
+            for strategy, tasks, pool_size, workers in itertools.product(
+                    strategies, args.tasks, args.pool_sizes, args.workers):
+                if strategy == "nopool":
+                    pool_size = 0  # pool size is meaningless without a pool; run once
+                key = (strategy, tasks, pool_size, workers)
+                if key in seen:
+                    continue
+                seen.add(key)
+                row = {
+                    "strategy": strategy, "tasks": tasks, "pool_size": pool_size,
+                    "workers": workers, "query_latency": query_latency,
+                    "connect_cost": None if args.mysql_host else args.connect_cost,
+                    "commit_latency": None if args.mysql_host else args.commit_latency,
+                    "parse_latency": None if args.mysql_host else args.parse_latency,
+                    **run_case(strategy, config, tasks, pool_size, workers, args.hold),
+                }
+                results.append(row)
+                print(", ".join(f"{k}={v}" for k, v in row.items()), flush=True)
+        finally:
+            if server:
+                server.stop()
+
+    if args.csv:
+        with open(args.csv, "w", newline="") as f:
+            writer = csv.DictWriter(f, fieldnames=list(results[0]))
+            writer.writeheader()
+            writer.writerows(results)
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=2)
+    return results
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
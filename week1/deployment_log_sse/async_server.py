@@ -0,0 +1,247 @@
+"""
+Asyncio mode of the deployment log server: same `/`, `/events` and
+`/deploy` routes, but every open stream is a coroutine instead of an OS
+thread, so one process can hold tens of thousands of them.
+
+    python server.py --async          # or: python async_server.py
+
+- Every log line gets a monotonically increasing event id (`id:` field).
+- The last SSE_RING lines (default 10000) stay in a ring buffer, already
+  encoded. A stream is just a cursor into it: a publish wakes all streams
+  once and each writes what it has not sent yet, so there is no per-client
+  queue to fill up.
+- A reconnecting EventSource sends `Last-Event-ID`; the stream resumes
+  right after that id (or `?lastEventId=`). Without it a stream starts
+  with live lines only.
+- A client whose cursor fell out of the ring (too slow, or away too long)
+  gets a "[N log lines missed]" line and continues from the oldest kept
+  line. A stream that cannot take any data for SSE_STALL seconds (default
+  30) is closed.
+- Idle streams get a comment every SSE_HEARTBEAT seconds (default 15).
+"""
+
+import argparse
+import asyncio
+import json
+import logging
+import os
+import resource
+import time
+from collections import deque
+from itertools import islice
+from urllib.parse import parse_qs, urlsplit
+
+from deploy_steps import STEPS
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+RING_SIZE = int(os.getenv("SSE_RING", "10000"))
+HEARTBEAT = float(os.getenv("SSE_HEARTBEAT", "15"))
+STALL_TIMEOUT = float(os.getenv("SSE_STALL", "30"))
+MAX_HEAD = 16 * 1024
+
+logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(message)s")
+
+
+# -----------------------------------------------------------------------------
+# Event log: ids + ring buffer of encoded events
+# -----------------------------------------------------------------------------
+class LogRing:
+    def __init__(self, size: int = RING_SIZE):
+        self.ring = deque(maxlen=size)  # (id, encoded event)
+        self.last_id = 0
+        self._changed = asyncio.Event()
+
+    def publish(self, line: str) -> int:
+        self.last_id += 1
+        data = "".join(f"data: {part}\n" for part in line.split("\n"))
+        self.ring.append((self.last_id, f"id: {self.last_id}\n{data}\n".encode()))
+        # Wake everyone waiting on the current event, then start a fresh one
+        self.wake()
+        return self.last_id
+
+    def since(self, after_id: int):
+        """(lines missed, encoded events with id > after_id still in the ring)."""
+        if after_id >= self.last_id or not self.ring:
+            return 0, []
+        first = self.ring[0][0]
+        missed = max(0, first - 1 - after_id)
+        n = self.last_id - max(after_id, first - 1)
+        # Walk from the newest end: O(new events), not O(ring)
+        return missed, [event for _, event in islice(reversed(self.ring), n)][::-1]
+
+    def wake(self):
+        """Wake every waiting stream without publishing (heartbeat tick)."""
+        changed, self._changed = self._changed, asyncio.Event()
+        changed.set()
+
+    async def wait(self):
+        await self._changed.wait()
+
+
+# -----------------------------------------------------------------------------
+# HTTP server
+# -----------------------------------------------------------------------------
+class SSEServer:
+    def __init__(self, ring_size: int = RING_SIZE):
+        self.log = LogRing(ring_size)
+        self.streams = 0
+        self.resumed = 0
+        self.missed = 0      # lines clients skipped because they fell out of the ring
+        self.stalled = 0
+        self.heartbeats = 0  # ticks so far; a stream keeps the last one it answered
+        self._heartbeat = None
+        self._deploys = set()
+        with open(os.path.join(HERE, "index.html"), "rb") as f:
+            self.index_html = f.read()
+
+    async def start(self, host: str = "0.0.0.0", port: int = 8000):
+        self._heartbeat = asyncio.create_task(self._heartbeats())
+        # Deep accept backlog: thousands of EventSources reconnect at once
+        return await asyncio.start_server(self._serve, host, port, limit=MAX_HEAD, backlog=4096)
+
+    async def _heartbeats(self):
+        # One timer for all streams instead of a timeout per stream
+        while True:
+            await asyncio.sleep(HEARTBEAT)
+            self.heartbeats += 1
+            self.log.wake()
+
+    async def _serve(self, reader, writer):
+        try:
+            head = await asyncio.wait_for(reader.readuntil(b"\r\n\r\n"), 10)
+            request_line, *header_lines = head.decode("latin-1").split("\r\n")
+            method, target, _ = request_line.split(" ")
+            headers = {}
+            for line in header_lines:
+                if line:
+                    name, _, value = line.partition(":")
+                    headers[name.strip().lower()] = value.strip()
+        except (asyncio.IncompleteReadError, asyncio.LimitOverrunError, asyncio.TimeoutError,
+                ConnectionError, ValueError):
+            writer.close()
+            return
+
+        url = urlsplit(target)
+        query = {k: v[-1] for k, v in parse_qs(url.query).items()}
+        try:
+            if method != "GET":
+                self._respond(writer, 405, b"Method not allowed\n", "text/plain")
+            elif url.path == "/":
+                self._respond(writer, 200, self.index_html, "text/html; charset=utf-8")
+            elif url.path == "/events":
+                await self._events(writer, headers.get("last-event-id") or query.get("lastEventId"))
+            elif url.path == "/deploy":
+                delay = float(query.get("delay", 1.0))
+                task = asyncio.create_task(self._push_logs(delay))
+                self._deploys.add(task)
+                task.add_done_callback(self._deploys.discard)
+                self._json(writer, {"status": "Deployment started"})
+            elif url.path == "/stats":
+                self._json(writer, self.stats())
+            else:
+                self._respond(writer, 404, b"Not found\n", "text/plain")
+            await writer.drain()
+        except (ConnectionError, asyncio.TimeoutError, ValueError):
+            pass
+        finally:
+            writer.close()
+
+    def _respond(self, writer, status: int, body: bytes, content_type: str):
+        reason = {200: "OK", 404: "Not Found", 405: "Method Not Allowed"}[status]
+        writer.write(
+            f"HTTP/1.1 {status} {reason}\r\nContent-Type: {content_type}\r\n"
+            f"Content-Length: {len(body)}\r\nConnection: close\r\n\r\n".encode() + body
+        )
+
+    def _json(self, writer, obj):
+        self._respond(writer, 200, json.dumps(obj).encode(), "application/json")
+
+    async def _push_logs(self, delay: float):
+        for step in STEPS:
+            self.log.publish(f"[{time.strftime('%H:%M:%S')}] {step}")
+            await asyncio.sleep(delay)  # simulate delay between steps
+
+    async def _events(self, writer, last_event_id):
+        log = self.log
+        cursor = log.last_id
+        if last_event_id is not None:
+            try:
+                cursor = int(last_event_id)
+                self.resumed += 1
+            except ValueError:
+                pass
+            if cursor > log.last_id:
+                cursor = 0  # id from before a server restart: replay what we have
+
+        writer.write(b"HTTP/1.1 200 OK\r\nContent-Type: text/event-stream\r\n"
+                     b"Cache-Control: no-cache\r\nConnection: keep-alive\r\n"
+                     b"X-Accel-Buffering: no\r\n\r\nretry: 3000\n\n")
+        self.streams += 1
+        beat = self.heartbeats
+        high_water = writer.transport.get_write_buffer_limits()[1]
+        try:
+            while True:
+                missed, events = log.since(cursor)
+                if events:
+                    if missed:
+                        self.missed += missed
+                        writer.write(f"data: [{missed} log lines missed]\n\n".encode())
+                    writer.writelines(events)
+                    cursor = log.last_id
+                elif beat != self.heartbeats:
+                    beat = self.heartbeats
+                    writer.write(b": keep-alive\n\n")
+                else:
+                    await log.wait()
+                    continue
+                if writer.transport.get_write_buffer_size() <= high_water:
+                    await writer.drain()  # returns at once; raises if the client is gone
+                    continue
+                # Client's socket buffer is full: wait, but not forever
+                try:
+                    await asyncio.wait_for(writer.drain(), STALL_TIMEOUT)
+                except asyncio.TimeoutError:
+                    self.stalled += 1
+                    return
+        finally:
+            self.streams -= 1
+
+    def stats(self) -> dict:
+        ring = self.log.ring
+        return {
+            "streams": self.streams,
+            "last_id": self.log.last_id,
+            "ring": [ring[0][0], ring[-1][0]] if ring else None,
+            "resumed": self.resumed,
+            "missed": self.missed,
+            "stalled": self.stalled,
+        }
+
+
+def raise_fd_limit():
+    soft, hard = resource.getrlimit(resource.RLIMIT_NOFILE)
+    if soft < hard:
+        resource.setrlimit(resource.RLIMIT_NOFILE, (hard, hard))
+
+
+async def main(host: str = "0.0.0.0", port: int = 8000):
+    raise_fd_limit()
+    server = await SSEServer().start(host, port)
+    logging.info("SSE server (asyncio) running at http://localhost:%d", port)
+    async with server:
+        await server.serve_forever()
+
+
+def run(host: str = "0.0.0.0", port: int = 8000):
+    try:
+        asyncio.run(main(host, port))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Deployment log over SSE (asyncio)")
+    parser.add_argument("--host", default="0.0.0.0")
+    parser.add_argument("--port", type=int, default=8000)
+    args = parser.parse_args()
+    run(args.host, args.port)
@@ -0,0 +1,124 @@
+"""
+Thread-safe fan-out of log lines to SSE subscribers.
+
+    hub = Broadcaster(max_queue=1000, overflow="drop_oldest")
+    sub = hub.subscribe()
+    hub.publish("line")          # from any thread
+    sub.get(timeout=15)          # -> ["line"], [] on timeout, None once closed
+    hub.unsubscribe(sub)
+
+Each subscriber has its own bounded deque and condition variable, so a
+publish wakes exactly the streams that have something new (no polling) and
+a subscriber that stops reading only fills its own queue. When the queue is
+full the overflow policy decides:
+
+- "drop_oldest": discard the oldest line; the subscriber is told how many
+  lines it missed (`Subscription.take_dropped`).
+- "disconnect": close the subscription; the stream ends and EventSource
+  reconnects on its own.
+"""
+
+import threading
+from collections import deque
+
+OVERFLOW_POLICIES = ("drop_oldest", "disconnect")
+
+
+class Subscription:
+    def __init__(self, max_queue: int, overflow: str):
+        self.queue = deque()
+        self.max_queue = max_queue
+        self.overflow = overflow
+        self.dropped = 0          # lines lost to overflow, not yet reported
+        self.dropped_total = 0
+        self.closed = False
+        self._cond = threading.Condition(threading.Lock())
+
+    def put(self, data: str) -> bool:
+        """Queue one line; returns False if this subscriber is (now) closed."""
+        with self._cond:
+            if self.closed:
+                return False
+            if len(self.queue) >= self.max_queue:
+                if self.overflow == "disconnect":
+                    self.closed = True
+                    self._cond.notify()
+                    return False
+                self.queue.popleft()
+                self.dropped += 1
+                self.dropped_total += 1
+            self.queue.append(data)
+            self._cond.notify()
+            return True
+
+    def get(self, timeout: float):
+        """
+        Everything queued so far (oldest first), waiting up to `timeout`
+        seconds for something to arrive. [] on timeout, None once closed.
+        """
+        with self._cond:
+            if not self.queue and not self.closed:
+                self._cond.wait(timeout)
+            if self.queue:
+                items = list(self.queue)
+                self.queue.clear()
+                return items
+            return None if self.closed else []
+
+    def take_dropped(self) -> int:
+        with self._cond:
+            n, self.dropped = self.dropped, 0
+            return n
+
+    def close(self):
+        with self._cond:
+            self.closed = True
+            self._cond.notify()
+
+
+class Broadcaster:
+    def __init__(self, max_queue: int = 1000, overflow: str = "drop_oldest"):
+        if overflow not in OVERFLOW_POLICIES:
+            raise ValueError(f"unknown overflow policy {overflow!r} (expected one of {OVERFLOW_POLICIES})")
+        self.max_queue = max_queue
+        self.overflow = overflow
+        self.published = 0
+        self.disconnected = 0     # subscribers closed by the "disconnect" policy
+        self._subs = set()
+        self._lock = threading.Lock()
+
+    def subscribe(self) -> Subscription:
+        sub = Subscription(self.max_queue, self.overflow)
+        with self._lock:
+            self._subs.add(sub)
+        return sub
+
+    def unsubscribe(self, sub: Subscription):
+        sub.close()
+        with self._lock:
+            self._subs.discard(sub)
+
+    def publish(self, data: str):
+        # Snapshot under the lock, deliver outside it: subscribe/unsubscribe
+        # never wait on a fan-out in progress
+        with self._lock:
+            subs = list(self._subs)
+            self.published += 1
+        for sub in subs:
+            if not sub.put(data) and sub.overflow == "disconnect":
+                with self._lock:
+                    if sub in self._subs:
+                        self._subs.discard(sub)
+                        self.disconnected += 1
+
+    def stats(self) -> dict:
+        with self._lock:
+            subs = list(self._subs)
+            published, disconnected = self.published, self.disconnected
+        return {
+            "subscribers": len(subs),
+            "published": published,
+            "disconnected": disconnected,
+            "max_depth": max((len(s.queue) for s in subs), default=0),
+            "dropped": sum(s.dropped_total for s in subs),
+        }
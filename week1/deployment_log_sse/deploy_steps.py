@@ -0,0 +1,14 @@
+# Deployment steps to simulate logs (shared by server.py and async_server.py)
+STEPS = [
+    "Checking system requirements...",
+    "Pulling source code from repository...",
+    "Installing dependencies...",
+    "Running tests...",
+    "Building application...",
+    "Creating Docker image...",
+    "Pushing Docker image to registry...",
+    "Updating Kubernetes manifests...",
+    "Deploying pods...",
+    "Waiting for pods to be ready...",
+    "Deployment finished successfully ✅"
+]
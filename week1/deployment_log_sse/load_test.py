@@ -0,0 +1,289 @@
+"""
+Local load test for the asyncio SSE server (`async_server.py`).
+
+1. Opens --streams idle `/events` streams (10k by default, spread over
+   --procs load processes) and waits until all are connected.
+2. Holds them idle for --idle seconds and measures the server's CPU and RSS.
+3. Fires --bursts bursts of --deploys concurrent `/deploy?delay=0` calls
+   (11 lines each) and measures, per burst, how long each stream takes to
+   receive the last line.
+4. During the second burst, --resume-frac of the streams drop their
+   connection and reconnect with Last-Event-ID.
+
+Every stream checks that event ids arrive without gaps, across the
+reconnects too, so "gaps: 0" means nobody missed or re-received a line.
+
+    python load_test.py                                   # starts the server itself
+    python load_test.py --streams 2000 --bursts 3 --deploys 20
+    python load_test.py --url http://127.0.0.1:8000 --server-pid 1234
+
+The load processes share the machine with the server; watch their CPU too.
+"""
+
+import argparse
+import asyncio
+import json
+import multiprocessing
+import os
+import resource
+import socket
+import subprocess
+import sys
+import time
+import urllib.request
+from urllib.parse import urlsplit
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+LINES_PER_DEPLOY = 11
+
+_shared = {}
+
+
+# -----------------------------------------------------------------------------
+# Load process: many SSE streams on one event loop
+# -----------------------------------------------------------------------------
+def _init_load_proc(shared):
+    _shared.update(shared)
+
+
+async def _stream(host, port, index, cfg, result):
+    """One EventSource-like client: reads events, checks ids, may resume once."""
+    ready, target, t0, burst, stop = (_shared[k] for k in ("ready", "target", "t0", "burst", "stop"))
+    resumer = cfg["resume_every"] and index % cfg["resume_every"] == 0
+    last_id, reached, connected_once = None, 0, False
+
+    while not stop.value:
+        try:
+            async with cfg["connect_sem"]:
+                reader, writer = await asyncio.open_connection(host, port)
+                headers = "" if last_id is None else f"Last-Event-ID: {last_id}\r\n"
+                writer.write(f"GET /events HTTP/1.1\r\nHost: {host}\r\nAccept: text/event-stream\r\n"
+                             f"{headers}\r\n".encode())
+                await reader.readuntil(b"\r\n\r\n")
+        except (OSError, asyncio.IncompleteReadError):
+            result["failed"] += 1
+            await asyncio.sleep(0.5)
+            continue
+        if not connected_once:
+            connected_once = True
+            with ready.get_lock():
+                ready.value += 1
+        else:
+            result["resumed"] += 1
+
+        buf = b""
+        try:
+            while not stop.value:
+                chunk = await reader.read(65536)
+                if not chunk:
+                    break
+                *events, buf = (buf + chunk).split(b"\n\n")
+                for event in events:
+                    if event.startswith(b"id: "):
+                        event_id = int(event[4:event.index(b"\n")])
+                        if last_id is not None and event_id != last_id + 1:
+                            result["gaps"] += 1
+                        last_id = event_id
+                        result["events"] += 1
+                    elif b"lines missed" in event:
+                        result["missed"] += 1
+                if last_id is not None and last_id >= target.value > reached:
+                    reached = target.value
+                    result["latency"].setdefault(str(reached), []).append(time.time() - t0.value)
+                if resumer and burst.value >= 1 and events and not result.get("dropped"):
+                    # Drop mid-burst, come back with Last-Event-ID
+                    result["dropped"] = True
+                    break
+        except (OSError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+        if resumer and result.get("dropped") and result["resumed"] == 0:
+            await asyncio.sleep(0.3)
+
+
+async def _run_streams(url, streams, first_index, cfg):
+    parts = urlsplit(url)
+    cfg["connect_sem"] = asyncio.Semaphore(cfg["connect_concurrency"])
+    results = [{"failed": 0, "resumed": 0, "events": 0, "gaps": 0, "missed": 0, "latency": {}}
+               for _ in range(streams)]
+    tasks = [asyncio.create_task(_stream(parts.hostname, parts.port, first_index + i, cfg, results[i]))
+             for i in range(streams)]
+    # One poller for the stop flag instead of a read timeout per stream
+    while not _shared["stop"].value:
+        await asyncio.sleep(0.2)
+    for task in tasks:
+        task.cancel()
+    await asyncio.gather(*tasks, return_exceptions=True)
+    total = {"failed": 0, "resumed": 0, "events": 0, "gaps": 0, "missed": 0, "latency": {}}
+    for r in results:
+        for key in ("failed", "resumed", "events", "gaps", "missed"):
+            total[key] += r[key]
+        for burst_target, samples in r["latency"].items():
+            total["latency"].setdefault(burst_target, []).extend(samples)
+    return total
+
+
+def _load_proc(job):
+    raise_fd_limit()
+    url, streams, first_index, cfg = job
+    return asyncio.run(_run_streams(url, streams, first_index, cfg))
+
+
+# -----------------------------------------------------------------------------
+# Server process helpers
+# -----------------------------------------------------------------------------
+def raise_fd_limit():
+    soft, hard = resource.getrlimit(resource.RLIMIT_NOFILE)
+    if soft < hard:
+        resource.setrlimit(resource.RLIMIT_NOFILE, (hard, hard))
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def start_server():
+    port = free_port()
+    proc = subprocess.Popen([sys.executable, os.path.join(HERE, "async_server.py"), "--port", str(port)],
+                            cwd=HERE, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    url = f"http://127.0.0.1:{port}"
+    for _ in range(100):
+        try:
+            get_json(url + "/stats")
+            return proc, url
+        except OSError:
+            time.sleep(0.1)
+    proc.kill()
+    raise RuntimeError("async_server.py did not start")
+
+
+def get_json(url: str) -> dict:
+    with urllib.request.urlopen(url, timeout=10) as resp:
+        return json.load(resp)
+
+
+def proc_usage(pid: int):
+    """(CPU seconds, RSS bytes) of `pid` from /proc (Linux only)."""
+    with open(f"/proc/{pid}/stat") as f:
+        fields = f.read().rsplit(")", 1)[1].split()
+    cpu = (int(fields[11]) + int(fields[12])) / os.sysconf("SC_CLK_TCK")
+    with open(f"/proc/{pid}/statm") as f:
+        rss = int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    return cpu, rss
+
+
+def percentile(sorted_samples, q):
+    return sorted_samples[min(len(sorted_samples) - 1, int(q * len(sorted_samples)))]
+
+
+# -----------------------------------------------------------------------------
+# Driver
+# -----------------------------------------------------------------------------
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url", help="test this running server instead of starting one")
+    parser.add_argument("--server-pid", type=int, help="pid of --url's server, for CPU/RSS")
+    parser.add_argument("--streams", type=int, default=10000)
+    parser.add_argument("--procs", type=int, default=max(1, (os.cpu_count() or 2) // 2))
+    parser.add_argument("--connect-concurrency", type=int, default=200, help="per load process")
+    parser.add_argument("--idle", type=float, default=10.0, help="seconds to hold the streams idle")
+    parser.add_argument("--bursts", type=int, default=3)
+    parser.add_argument("--deploys", type=int, default=10, help="concurrent deploys per burst")
+    parser.add_argument("--burst-wait", type=float, default=10.0, help="max seconds per burst")
+    parser.add_argument("--resume-frac", type=float, default=0.05)
+    args = parser.parse_args()
+
+    raise_fd_limit()
+    server = None
+    url, pid = args.url, args.server_pid
+    if url is None:
+        server, url = start_server()
+        pid = server.pid
+
+    ctx = multiprocessing.get_context("spawn")
+    shared = {
+        "ready": ctx.Value("i", 0),
+        "target": ctx.Value("q", 1 << 62, lock=False),  # burst's last id; "never" until set
+        "t0": ctx.Value("d", 0.0, lock=False),
+        "burst": ctx.Value("i", -1, lock=False),
+        "stop": ctx.Value("b", 0, lock=False),
+    }
+    cfg = {"connect_concurrency": args.connect_concurrency,
+           "resume_every": round(1 / args.resume_frac) if args.resume_frac > 0 else 0}
+    per_proc = [args.streams // args.procs + (i < args.streams % args.procs) for i in range(args.procs)]
+    jobs, first = [], 0
+    for n in per_proc:
+        jobs.append((url, n, first, cfg))
+        first += n
+
+    try:
+        with ctx.Pool(args.procs, initializer=_init_load_proc, initargs=(shared,)) as pool:
+            started = time.time()
+            pending = pool.map_async(_load_proc, jobs)
+            while shared["ready"].value < args.streams and time.time() - started < 120:
+                time.sleep(0.1)
+            connect_s = time.time() - started
+            print(f"{shared['ready'].value}/{args.streams} streams connected in {connect_s:.1f}s")
+
+            if pid:
+                cpu0, _ = proc_usage(pid)
+                time.sleep(args.idle)
+                cpu1, rss = proc_usage(pid)
+                print(f"idle {args.idle:.0f}s: server CPU {100 * (cpu1 - cpu0) / args.idle:.1f}%, "
+                      f"RSS {rss / 2**20:.0f} MB ({rss / max(1, args.streams) / 1024:.1f} KB/stream)")
+            else:
+                time.sleep(args.idle)
+
+            targets = []
+            cpu_before = proc_usage(pid)[0] if pid else None
+            for b in range(args.bursts):
+                base = get_json(url + "/stats")["last_id"]
+                target = base + args.deploys * LINES_PER_DEPLOY
+                shared["t0"].value = time.time()
+                shared["target"].value = target
+                shared["burst"].value = b
+                for _ in range(args.deploys):
+                    get_json(url + "/deploy?delay=0")
+                targets.append(target)
+                deadline = time.time() + args.burst_wait
+                while get_json(url + "/stats")["last_id"] < target and time.time() < deadline:
+                    time.sleep(0.1)
+                time.sleep(min(2.0, args.burst_wait))  # let the slowest streams catch up
+            burst_cpu = proc_usage(pid)[0] - cpu_before if pid else None
+            shared["stop"].value = 1
+            results = pending.get(timeout=60)
+    finally:
+        if server:
+            server.terminate()
+            server.wait()
+
+    total = {"failed": 0, "resumed": 0, "events": 0, "gaps": 0, "missed": 0}
+    latency = {}
+    for r in results:
+        for key in total:
+            total[key] += r[key]
+        for burst_target, samples in r["latency"].items():
+            latency.setdefault(int(burst_target), []).extend(samples)
+
+    lines = args.deploys * LINES_PER_DEPLOY
+    for b, target in enumerate(targets):
+        samples = sorted(latency.get(target, []))
+        if not samples:
+            print(f"burst {b + 1}: {lines} lines, no stream received them")
+            continue
+        print(f"burst {b + 1}: {lines} lines -> {len(samples)}/{args.streams} streams, "
+              f"last line after p50 {percentile(samples, 0.5) * 1000:.0f} ms, "
+              f"p99 {percentile(samples, 0.99) * 1000:.0f} ms, max {samples[-1] * 1000:.0f} ms")
+    if burst_cpu is not None:
+        print(f"server CPU during bursts: {burst_cpu:.2f}s "
+              f"({burst_cpu / max(1, total['events']) * 1e6:.1f} us per delivered event)")
+    print(f"events received: {total['events']}, gaps: {total['gaps']}, "
+          f"missed notices: {total['missed']}, resumes: {total['resumed']}, "
+          f"connect failures: {total['failed']}")
+
+
+if __name__ == "__main__":
+    main()
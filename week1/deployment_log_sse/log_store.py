@@ -0,0 +1,366 @@
+"""
+Append-only, per-deployment log store.
+
+    store = LogStore("deploy-logs")
+    log = store.create()                 # new deploy id, e.g. "20250101-120000-3f2a"
+    log.append("Installing dependencies...")
+    log.finish()
+
+    cursor = log.cursor(from_offset=0)   # offset = line number in this deploy
+    chunk, missed = log.read(cursor)     # bytes ready to write to an SSE stream
+
+Layout on disk (`LOG_DIR`, default ./deploy-logs):
+
+    <deploy id>/meta.json                  status, created / finished times
+    <deploy id>/00000000000000000000.log   records, already in SSE wire format
+    <deploy id>/00000000000000000000.idx   8-byte little-endian byte position per line
+
+A segment is named after the offset of its first line and is sealed once
+it grows past `segment_bytes`. Because records are stored exactly as they
+go on the wire (`id: <offset>\\ndata: ...\\n\\n`), replay is a byte copy:
+sealed segments are read through a cached mmap, the active one with
+pread. Readers then wait on the deploy's condition variable for new lines,
+so replay turns into live tailing without a gap.
+
+Retention (`compact()`, also run by a background thread): finished deploys
+older than `max_age` are deleted, then the oldest sealed segments of
+finished deploys until the store is under `max_bytes`. A reader whose
+position was deleted is moved to the oldest kept line and told how many
+lines it missed.
+"""
+
+import json
+import mmap
+import os
+import secrets
+import shutil
+import struct
+import threading
+import time
+from bisect import bisect_right
+
+_POS = struct.Struct("<Q")
+READ_CHUNK = 64 * 1024
+
+
+class Segment:
+    def __init__(self, directory: str, base: int):
+        self.base = base
+        self.log_path = os.path.join(directory, f"{base:020d}.log")
+        self.idx_path = os.path.join(directory, f"{base:020d}.idx")
+        self.size = 0       # committed bytes in the .log
+        self.count = 0      # lines in this segment
+        self.sealed = False
+        self._mmap = None
+
+    def position(self, offset: int) -> int:
+        """Byte position of line `offset` (which must be in this segment)."""
+        with open(self.idx_path, "rb") as f:
+            return _POS.unpack(os.pread(f.fileno(), _POS.size, (offset - self.base) * _POS.size))[0]
+
+    def read(self, pos: int, limit: int = READ_CHUNK) -> bytes:
+        end = min(self.size, pos + limit)
+        if pos >= end:
+            return b""
+        try:
+            if self.sealed:
+                # Sealed segments never change again: map once, slice per read
+                if self._mmap is None:
+                    with open(self.log_path, "rb") as f:
+                        self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+                return self._mmap[pos:end]
+            with open(self.log_path, "rb") as f:
+                return os.pread(f.fileno(), end - pos, pos)
+        except (ValueError, FileNotFoundError):
+            return b""  # removed by retention meanwhile; the next read() skips ahead
+
+    def bytes_on_disk(self) -> int:
+        return self.size + self.count * _POS.size
+
+    def delete(self):
+        if self._mmap is not None:
+            self._mmap.close()
+            self._mmap = None
+        for path in (self.log_path, self.idx_path):
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+
+
+class Cursor:
+    """A reader's position: next line offset, its segment and byte position."""
+    __slots__ = ("offset", "base", "pos")
+
+    def __init__(self, offset: int, base: int, pos: int):
+        self.offset = offset
+        self.base = base
+        self.pos = pos
+
+
+class DeployLog:
+    def __init__(self, directory: str, deploy_id: str, segment_bytes: int, meta: dict):
+        self.directory = directory
+        self.id = deploy_id
+        self.segment_bytes = segment_bytes
+        self.meta = meta
+        self.segments = []          # oldest first
+        self.next_offset = 0
+        self.cond = threading.Condition()
+        self._log = None            # append handles of the active segment
+        self._idx = None
+
+    # Writing
+    def append(self, line: str) -> int:
+        with self.cond:
+            if self.finished:
+                raise ValueError(f"deploy {self.id} is finished")
+            if self._log is None or self.segments[-1].size >= self.segment_bytes:
+                self._roll()
+            segment = self.segments[-1]
+            offset = self.next_offset
+            data = "".join(f"data: {part}\n" for part in line.split("\n"))
+            record = f"id: {offset}\n{data}\n".encode()
+            self._log.write(record)
+            self._log.flush()
+            self._idx.write(_POS.pack(segment.size))
+            self._idx.flush()
+            segment.size += len(record)
+            segment.count += 1
+            self.next_offset += 1
+            self.cond.notify_all()
+            return offset
+
+    def finish(self, status: str = "finished"):
+        with self.cond:
+            if self.finished:
+                return
+            self._close_active()
+            self.meta.update(status=status, finished=time.time(), lines=self.next_offset)
+            self._write_meta()
+            self.cond.notify_all()
+
+    @property
+    def finished(self) -> bool:
+        return self.meta.get("status") != "running"
+
+    def _roll(self):
+        self._close_active()
+        segment = Segment(self.directory, self.next_offset)
+        self._log = open(segment.log_path, "ab")
+        self._idx = open(segment.idx_path, "ab")
+        self.segments.append(segment)
+
+    def _close_active(self):
+        if self._log is not None:
+            self._log.close()
+            self._idx.close()
+            self._log = self._idx = None
+            self.segments[-1].sealed = True
+
+    def _write_meta(self):
+        tmp = os.path.join(self.directory, "meta.json.tmp")
+        with open(tmp, "w") as f:
+            json.dump(self.meta, f)
+        os.replace(tmp, os.path.join(self.directory, "meta.json"))
+
+    # Reading
+    @property
+    def first_offset(self) -> int:
+        return self.segments[0].base if self.segments else self.next_offset
+
+    def cursor(self, from_offset: int = 0) -> Cursor:
+        """Cursor at line `from_offset` (clamped to the lines written so far)."""
+        from_offset = max(0, from_offset)  # no lines before 0: nothing was "removed"
+        with self.cond:
+            if self.segments and from_offset < self.first_offset:
+                # Already removed by retention: read() skips ahead and reports it
+                return Cursor(from_offset, from_offset, 0)
+            offset = min(max(from_offset, self.first_offset), self.next_offset)
+            if not self.segments:
+                return Cursor(offset, offset, 0)
+            if offset == self.next_offset:
+                last = self.segments[-1]
+                return Cursor(offset, last.base, last.size)
+            segment = self.segments[bisect_right([s.base for s in self.segments], offset) - 1]
+            return Cursor(offset, segment.base, segment.position(offset))
+
+    def read(self, cursor: Cursor, limit: int = READ_CHUNK):
+        """
+        (bytes, lines missed) from `cursor` onwards, advancing it. b"" means
+        nothing new yet: wait() and try again, unless the deploy is finished.
+        """
+        missed = 0
+        with self.cond:
+            bases = [s.base for s in self.segments]
+            i = bisect_right(bases, cursor.base) - 1
+            if i < 0 or self.segments[i].base != cursor.base:
+                # Our segment was removed by retention: skip to the oldest kept line
+                if not self.segments:
+                    return b"", 0
+                missed = max(0, self.segments[0].base - cursor.offset)
+                i = 0
+                cursor.offset, cursor.base, cursor.pos = self.segments[0].base, self.segments[0].base, 0
+            segment = self.segments[i]
+            if cursor.pos >= segment.size and segment.sealed and i + 1 < len(self.segments):
+                segment = self.segments[i + 1]
+                cursor.base, cursor.pos = segment.base, 0
+        while True:
+            data = segment.read(cursor.pos, limit)  # outside the lock: appends go on
+            # Every record ends with the only blank line in it. Stop after the
+            # last complete one, so cursor.offset counts exactly what we return
+            end = data.rfind(b"\n\n")
+            if end >= 0 or len(data) < limit:
+                break
+            limit *= 2  # one record longer than the chunk: read further
+        data = data[:end + 2] if end >= 0 else b""
+        cursor.pos += len(data)
+        cursor.offset += data.count(b"\n\n")
+        return data, missed
+
+    def wait(self, cursor: Cursor, timeout: float) -> bool:
+        """Block until there is something past `cursor` or the deploy ends."""
+        with self.cond:
+            return self.cond.wait_for(lambda: self._has_more(cursor) or self.finished, timeout)
+
+    def at_end(self, cursor: Cursor) -> bool:
+        with self.cond:
+            return self.finished and not self._has_more(cursor)
+
+    def _has_more(self, cursor: Cursor) -> bool:
+        last = self.segments[-1] if self.segments else None
+        return last is not None and (cursor.base != last.base or cursor.pos < last.size)
+
+    def bytes_on_disk(self) -> int:
+        return sum(s.bytes_on_disk() for s in self.segments)
+
+    def info(self) -> dict:
+        with self.cond:
+            return dict(self.meta, id=self.id, first_offset=self.first_offset,
+                        next_offset=self.next_offset, segments=len(self.segments),
+                        bytes=self.bytes_on_disk())
+
+    # Recovery after a restart
+    @classmethod
+    def load(cls, directory: str, segment_bytes: int):
+        with open(os.path.join(directory, "meta.json")) as f:
+            meta = json.load(f)
+        log = cls(directory, os.path.basename(directory), segment_bytes, meta)
+        bases = sorted(int(name[:-4]) for name in os.listdir(directory) if name.endswith(".log"))
+        for base in bases:
+            segment = Segment(directory, base)
+            segment.count = os.path.getsize(segment.idx_path) // _POS.size
+            segment.size = cls._recover_size(segment)
+            segment.sealed = True
+            log.segments.append(segment)
+            log.next_offset = base + segment.count
+        if meta.get("status") == "running":
+            # The process writing it died mid-deploy
+            meta.update(status="interrupted", finished=time.time(), lines=log.next_offset)
+            log._write_meta()
+        return log
+
+    @staticmethod
+    def _recover_size(segment: Segment) -> int:
+        """End of the last indexed record; drops a torn write after it."""
+        size = os.path.getsize(segment.log_path)
+        if segment.count == 0:
+            end = 0
+        else:
+            last = segment.position(segment.base + segment.count - 1)
+            with open(segment.log_path, "rb") as f:
+                tail = os.pread(f.fileno(), size - last, last)
+            end = last + tail.find(b"\n\n") + 2 if b"\n\n" in tail else last
+            if end == last:
+                segment.count -= 1
+        if end < size:
+            os.truncate(segment.log_path, end)
+        os.truncate(segment.idx_path, segment.count * _POS.size)
+        return end
+
+
+class LogStore:
+    def __init__(self, root: str, segment_bytes: int = 1 << 20,
+                 max_age: float = 7 * 86400, max_bytes: int = 512 << 20):
+        self.root = os.path.abspath(root)
+        self.segment_bytes = segment_bytes
+        self.max_age = max_age
+        self.max_bytes = max_bytes
+        self.deploys = {}           # id -> DeployLog, oldest first
+        self._lock = threading.Lock()
+        os.makedirs(self.root, exist_ok=True)
+        for name in sorted(os.listdir(self.root)):
+            path = os.path.join(self.root, name)
+            if os.path.isfile(os.path.join(path, "meta.json")):
+                self.deploys[name] = DeployLog.load(path, segment_bytes)
+
+    def create(self) -> DeployLog:
+        # Sortable ids: directory order is creation order
+        deploy_id = time.strftime("%Y%m%d-%H%M%S") + "-" + secrets.token_hex(2)
+        directory = os.path.join(self.root, deploy_id)
+        os.makedirs(directory)
+        log = DeployLog(directory, deploy_id, self.segment_bytes,
+                        {"status": "running", "created": time.time()})
+        log._write_meta()
+        with self._lock:
+            self.deploys[deploy_id] = log
+        return log
+
+    def get(self, deploy_id: str):
+        with self._lock:
+            return self.deploys.get(deploy_id)
+
+    def list(self) -> list:
+        with self._lock:
+            logs = list(self.deploys.values())
+        return [log.info() for log in logs]
+
+    def compact(self, now: float = None) -> dict:
+        """Apply the retention policy; returns what was removed."""
+        now = time.time() if now is None else now
+        removed = {"deploys": 0, "segments": 0, "bytes": 0}
+        with self._lock:
+            logs = list(self.deploys.values())
+
+        for log in logs:
+            if log.finished and now - log.meta.get("finished", now) > self.max_age:
+                self._drop_deploy(log, removed)
+
+        with self._lock:
+            logs = list(self.deploys.values())
+        total = sum(log.bytes_on_disk() for log in logs)
+        for log in logs:  # oldest deploy first
+            if total <= self.max_bytes:
+                break
+            if not log.finished:
+                continue
+            with log.cond:
+                while log.segments and total > self.max_bytes:
+                    segment = log.segments.pop(0)
+                    total -= segment.bytes_on_disk()
+                    removed["segments"] += 1
+                    removed["bytes"] += segment.bytes_on_disk()
+                    segment.delete()
+            if not log.segments:
+                self._drop_deploy(log, removed)
+        return removed
+
+    def _drop_deploy(self, log: DeployLog, removed: dict):
+        with self._lock:
+            self.deploys.pop(log.id, None)
+        with log.cond:
+            removed["deploys"] += 1
+            removed["bytes"] += log.bytes_on_disk()
+            for segment in log.segments:
+                segment.delete()
+            log.segments.clear()
+            log.cond.notify_all()
+        shutil.rmtree(log.directory, ignore_errors=True)
+
+    def start_compactor(self, interval: float = 60.0):
+        def loop():
+            while True:
+                time.sleep(interval)
+                self.compact()
+
+        threading.Thread(target=loop, name="log-compactor", daemon=True).start()
@@ -1,11 +1,31 @@
 from flask import Flask, Response, send_file, jsonify, request
+import os
 import time
 import threading
 
+from broadcaster import Broadcaster
+from deploy_steps import STEPS
+from log_store import LogStore
+
 app = Flask(__name__)
 
-# Store active connections (generators) in memory
-clients = []
+# Every open /events stream is a subscriber with its own bounded queue;
+# publish() wakes it immediately (see broadcaster.py)
+logs = Broadcaster(
+    max_queue=int(os.getenv("SSE_QUEUE", "1000")),
+    overflow=os.getenv("SSE_OVERFLOW", "drop_oldest"),
+)
+HEARTBEAT = float(os.getenv("SSE_HEARTBEAT", "15"))  # seconds between keep-alive comments
+
+# Each deploy's lines also go to its own append-only log on disk, so late
+# joiners can replay it (see log_store.py)
+store = LogStore(
+    os.getenv("LOG_DIR", os.path.join(os.path.dirname(os.path.abspath(__file__)), "deploy-logs")),
+    segment_bytes=int(os.getenv("LOG_SEGMENT_BYTES", str(1 << 20))),
+    max_age=float(os.getenv("LOG_RETENTION_HOURS", "168")) * 3600,
+    max_bytes=int(os.getenv("LOG_RETENTION_MB", "512")) << 20,
+)
+store.start_compactor()
 
 @app.route("/")
 def index():
@@ -15,55 +35,111 @@ def index():
 
 @app.route("/events")
 def events():
-    def stream():
-        # Keep the connection open forever
-        messages = []
-        clients.append(messages)
+    sub = logs.subscribe()
 
+    def stream():
         try:
+            # Flush the headers right away and set the reconnect delay
+            yield "retry: 3000\n: connected\n\n"
             while True:
-                # If new messages exist, yield them
-                if messages:
-                    data = messages.pop(0)
-                    yield f"data: {data}\n\n"
-                time.sleep(0.5)
-        except GeneratorExit:
-            # Client disconnected
-            clients.remove(messages)
+                # Sleeps until a line is published (or the heartbeat is due)
+                items = sub.get(timeout=HEARTBEAT)
+                if items is None:
+                    # Closed by the slow-consumer policy: end the stream,
+                    # EventSource reconnects by itself
+                    return
+                if not items:
+                    # Idle: a comment keeps proxies from timing the stream out
+                    # and lets us notice clients that went away
+                    yield ": keep-alive\n\n"
+                    continue
+                dropped = sub.take_dropped()
+                chunk = "".join(f"data: {data}\n\n" for data in items)
+                if dropped:
+                    chunk = f"data: [{dropped} log lines dropped: client too slow]\n\n" + chunk
+                yield chunk
+        finally:
+            # Runs on client disconnect (GeneratorExit) as well
+            logs.unsubscribe(sub)
 
     # Return streaming response
-    return Response(stream(), mimetype="text/event-stream")
+    return Response(stream(), mimetype="text/event-stream",
+                    headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
+
+@app.route("/events/<deploy_id>")
+def deploy_events(deploy_id):
+    log = store.get(deploy_id)
+    if log is None:
+        return jsonify({"error": f"unknown deploy {deploy_id}"}), 404
+    # A reconnecting EventSource resumes after its last id; otherwise ?from=offset
+    if request.headers.get("Last-Event-ID", "").isdigit():
+        start = int(request.headers["Last-Event-ID"]) + 1
+    else:
+        start = request.args.get("from", 0, type=int)
+    cursor = log.cursor(start)
+
+    def stream():
+        yield "retry: 3000\n: connected\n\n"
+        while True:
+            # History first (straight from the segment files), then live lines
+            data, missed = log.read(cursor)
+            if missed:
+                yield f"data: [{missed} log lines removed by retention]\n\n"
+            if data:
+                yield data
+                continue
+            if log.at_end(cursor):
+                # Tell the client to stop instead of reconnecting
+                yield f"event: end\ndata: {log.meta['status']}\n\n"
+                return
+            if not log.wait(cursor, HEARTBEAT):
+                yield ": keep-alive\n\n"
+
+    return Response(stream(), mimetype="text/event-stream",
+                    headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
+
+@app.route("/deploys")
+def deploys():
+    return jsonify(store.list())
+
+
+@app.route("/stats")
+def stats():
+    return jsonify(logs.stats())
 
 
 @app.route("/deploy")
 def deploy():
-    # Deployment steps to simulate logs
-    steps = [
-        "Checking system requirements...",
-        "Pulling source code from repository...",
-        "Installing dependencies...",
-        "Running tests...",
-        "Building application...",
-        "Creating Docker image...",
-        "Pushing Docker image to registry...",
-        "Updating Kubernetes manifests...",
-        "Deploying pods...",
-        "Waiting for pods to be ready...",
-        "Deployment finished successfully ✅"
-    ]
+    log = store.create()
 
     # Background thread to push logs asynchronously
     def push_logs():
-        for step in steps:
-            log = f"[{time.strftime('%H:%M:%S')}] {step}"
-            for client in clients:
-                client.append(log)
-            time.sleep(1)  # simulate delay between steps
+        try:
+            for step in STEPS:
+                line = f"[{time.strftime('%H:%M:%S')}] {step}"
+                log.append(line)
+                logs.publish(line)
+                time.sleep(1)  # simulate delay between steps
+        finally:
+            log.finish()
 
-    threading.Thread(target=push_logs).start()
+    threading.Thread(target=push_logs, name=f"deploy-{log.id}", daemon=True).start()
 
-    return jsonify({"status": "Deployment started"})
+    return jsonify({"status": "Deployment started", "deploy_id": log.id, "events": f"/events/{log.id}"})
 
 
 if __name__ == "__main__":
-    app.run(port=8000, debug=True, threaded=True)
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Deployment log over SSE")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--async", dest="use_async", action="store_true",
+                        help="asyncio server (one coroutine per stream, Last-Event-ID resume)")
+    args = parser.parse_args()
+    if args.use_async:
+        import async_server
+        async_server.run(port=args.port)
+    else:
+        app.run(port=args.port, debug=True, threaded=True)
@@ -1,29 +1,61 @@
+import logging
+
 from flask import Flask, request, jsonify
-from db import get_connection
+from db import get_connection, router, run, session_token
+from router import NoHealthyNode
+
+logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(name)s %(message)s")
+logging.getLogger("mysql.connector").setLevel(logging.WARNING)
 
 app = Flask(__name__)
 
+SESSION_COOKIE = "db_session"
+
+
+@app.errorhandler(NoHealthyNode)
+def no_healthy_node(e):
+    return jsonify({"error": str(e)}), 503
+
+
+@app.route("/metrics", methods=["GET"])
+def metrics():
+    # Routing decisions, fallbacks, breaker state and pool usage per node
+    return jsonify(router.metrics())
+
+
+def request_token():
+    # Read-your-writes: the token from this client's last write, if any
+    return request.headers.get("X-Session-Token") or request.cookies.get(SESSION_COOKIE)
+
 
 @app.route("/users", methods=["POST"])
 def create_user():
     data = request.json
-    conn = get_connection(read=False)
-    cur = conn.cursor()
-    cur.execute("INSERT INTO users (name, email) VALUES (%s, %s)", (data["name"], data["email"]))
-    conn.commit()
-    cur.close()
-    conn.close()
-    return jsonify({"message": "User created"}), 201
+    with get_connection(read=False) as conn:
+        cur = conn.cursor()
+        cur.execute("INSERT INTO users (name, email) VALUES (%s, %s)", (data["name"], data["email"]))
+        conn.commit()
+        user_id = cur.lastrowid
+        token = session_token(conn)
+        cur.close()
+    resp = jsonify({"message": "User created", "id": user_id, "session_token": token})
+    if token:
+        # Header for API clients, cookie for browsers / cookie jars
+        resp.headers["X-Session-Token"] = token
+        resp.set_cookie(SESSION_COOKIE, token, httponly=True, samesite="Lax")
+    return resp, 201
 
 
 @app.route("/users/<int:user_id>", methods=["GET"])
 def get_user(user_id):
-    conn = get_connection(read=True)
-    cur = conn.cursor(dictionary=True)
-    cur.execute("SELECT * FROM users WHERE id=%s", (user_id,))
-    row = cur.fetchone()
-    cur.close()
-    conn.close()
+    def query(conn):
+        cur = conn.cursor(dictionary=True)
+        cur.execute("SELECT * FROM users WHERE id=%s", (user_id,))
+        row = cur.fetchone()
+        cur.close()
+        return row
+
+    row = run(query, read=True, token=request_token())
     if row:
         return jsonify(row)
     return jsonify({"error": "User not found"}), 404
@@ -31,13 +63,14 @@ def get_user(user_id):
 
 @app.route("/users", methods=["GET"])
 def list_users():
-    conn = get_connection(read=True)
-    cur = conn.cursor(dictionary=True)
-    cur.execute("SELECT * FROM users")
-    rows = cur.fetchall()
-    cur.close()
-    conn.close()
-    return jsonify(rows)
+    def query(conn):
+        cur = conn.cursor(dictionary=True)
+        cur.execute("SELECT * FROM users")
+        rows = cur.fetchall()
+        cur.close()
+        return rows
+
+    return jsonify(run(query, read=True, token=request_token()))
 
 
 if __name__ == "__main__":
@@ -1,34 +1,66 @@
-import mysql.connector
+import os
+
+from router import Node, Router
 
 MASTER_CONFIG = {
-    "host": "127.0.0.1",
-    "port": 3307,
+    "host": os.getenv("MASTER_HOST", "127.0.0.1"),
+    "port": int(os.getenv("MASTER_PORT", "3307")),
     "user": "root",
     "password": "root",
     "database": "usersdb"
 }
 
 REPLICA_CONFIG = {
-    "host": "127.0.0.1",
-    "port": 3308,
+    "host": os.getenv("REPLICA_HOST", "127.0.0.1"),
+    "port": int(os.getenv("REPLICA_PORT", "3308")),
     "user": "root",
     "password": "root",
     "database": "usersdb"
 }
 
+# Pool / breaker settings, shared by every node
+NODE_SETTINGS = {
+    "size": int(os.getenv("DB_POOL_SIZE", "10")),
+    "connect_timeout": float(os.getenv("DB_CONNECT_TIMEOUT", "1")),
+    "wait_timeout": float(os.getenv("DB_POOL_TIMEOUT", "5")),
+    "failure_threshold": int(os.getenv("DB_BREAKER_FAILURES", "2")),
+    "max_backoff": float(os.getenv("DB_BREAKER_MAX_BACKOFF", "30")),
+}
+
+# Reads: replica, master as fallback. Writes: master only.
+router = Router(
+    Node("master", MASTER_CONFIG, **NODE_SETTINGS),
+    [Node("replica", REPLICA_CONFIG, **NODE_SETTINGS)],
+    health_interval=float(os.getenv("DB_HEALTH_INTERVAL", "2")),
+    lag_interval=float(os.getenv("DB_LAG_POLL", "0.5")),
+    # Unset: stale reads allowed (the demo replica runs 5s behind on purpose)
+    max_lag=float(os.environ["DB_MAX_REPLICA_LAG"]) if os.getenv("DB_MAX_REPLICA_LAG") else None,
+    # Seconds a read-your-writes read may wait for the replica before using the master
+    ryw_wait=float(os.getenv("DB_RYW_WAIT", "0")),
+).start()
+
 
 def get_connection(read=False):
-    try:
-        if read:
-            return mysql.connector.connect(**REPLICA_CONFIG)
-    except:
-        print("Replica down, falling back to master")
-        return mysql.connector.connect(**MASTER_CONFIG)
-
-    try:
-        return mysql.connector.connect(**MASTER_CONFIG)
-    except:
-        if read:
-            print("Promoting replica to master (failover)")
-            return mysql.connector.connect(**REPLICA_CONFIG)
-        raise
+    """
+    Pooled connection for a read (replica, else master) or a write (master):
+
+        with get_connection(read=True) as conn:
+            ...
+
+    The connection goes back to the pool when the block ends.
+    """
+    return router.connection(read=read)
+
+
+def run(fn, read=False, token=None):
+    """
+    fn(conn) on a pooled connection; reads are retried on another node if
+    theirs dies mid-query. With a session `token` a read only uses a replica
+    that already has that write. Returns what fn returns.
+    """
+    return router.run(fn, read=read, token=token)
+
+
+def session_token(conn):
+    """Call after commit on a write connection; pass the result to later reads."""
+    return router.session_token(conn)
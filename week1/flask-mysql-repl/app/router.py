@@ -0,0 +1,453 @@
+"""
+Read/write router over pooled connections to the master and its replicas.
+
+    router = Router(Node("master", MASTER_CONFIG), [Node("replica1", REPLICA_CONFIG)])
+    router.start()                       # background health checks
+    with router.connection(read=True) as conn:
+        ...
+
+- Every node keeps a small pool (`NodePool`) instead of a new TCP
+  connection per request. Idle connections are pinged only after sitting
+  unused for a while.
+- Every node has a circuit breaker. Connect errors and lost connections
+  count as failures, and after `failure_threshold` in a row the breaker
+  opens. Requests then skip the node without trying it, and its idle
+  connections are dropped.
+- The health checker runs SELECT 1 on healthy nodes every `health_interval`.
+  It probes an open node again after 1s, 2s, 4s ... up to `max_backoff`,
+  and the first successful probe closes the breaker.
+- Reads go round-robin over replicas with a closed breaker, then fall back
+  to the master; `run()` also retries a read that lost its node mid-query.
+  Writes go to the master only (replicas are read-only); with its breaker
+  open they fail at once with NoHealthyNode.
+- `metrics()` counts routing decisions, fallbacks, failures and trips.
+  Breaker state changes are also logged.
+
+Replica lag and read-your-writes:
+
+- A poller runs SHOW REPLICA STATUS on every replica each `lag_interval`.
+  It keeps the source binlog position the replica has applied
+  (Relay_Source_Log_File / Exec_Source_Log_Pos) and Seconds_Behind_Source.
+  With `max_lag` set, replicas further behind (or not replicating) get no
+  reads.
+- After a write, `session_token(conn)` returns the master's binlog position
+  ("mysql-bin.000003:1337"). It covers that commit. A read that passes the
+  token goes to a replica only if that replica has applied the position,
+  otherwise to the master. With `ryw_wait` > 0 it first waits up to that
+  long on one replica (SOURCE_POS_WAIT).
+- Reads without a token still take any healthy replica (stale reads allowed).
+
+Binlog coordinates are used because the demo replicates by file/position,
+not GTID. This needs MySQL 8.0.26+ (SHOW REPLICA STATUS, SOURCE_POS_WAIT).
+"""
+
+import itertools
+import logging
+import queue
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+
+import mysql.connector
+from mysql.connector import errors
+
+# Errors that say "this node is unreachable", as opposed to a bad query
+NODE_ERRORS = (errors.InterfaceError, errors.OperationalError)
+
+log = logging.getLogger("db.router")
+
+
+class NoHealthyNode(errors.Error):
+    """No node could serve the request (all candidates down or exhausted)."""
+
+
+def parse_token(token: str) -> tuple:
+    """'mysql-bin.000003:1337' -> (3, 1337, 'mysql-bin.000003'); tuples compare in binlog order."""
+    name, _, pos = token.rpartition(":")
+    return int(name.rsplit(".", 1)[1]), int(pos), name
+
+
+# -----------------------------------------------------------------------------
+# Circuit breaker
+# -----------------------------------------------------------------------------
+class CircuitBreaker:
+    CLOSED, OPEN, HALF_OPEN = "closed", "open", "half_open"
+
+    def __init__(self, name: str, failure_threshold: int = 2, base_backoff: float = 1.0,
+                 max_backoff: float = 30.0):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.base_backoff = base_backoff
+        self.max_backoff = max_backoff
+        self.state = self.CLOSED
+        self.failures = 0
+        self.backoff = base_backoff
+        self.retry_at = 0.0
+        self.trips = 0
+        self._lock = threading.Lock()
+
+    def available(self) -> bool:
+        """May requests use the node? (Half-open is for the health probe only.)"""
+        return self.state == self.CLOSED
+
+    def probe_due(self, now: float) -> bool:
+        with self._lock:
+            if self.state == self.OPEN and now >= self.retry_at:
+                self.state = self.HALF_OPEN
+            return self.state != self.OPEN
+
+    def record_success(self) -> None:
+        with self._lock:
+            recovered = self.state != self.CLOSED
+            self.state, self.failures, self.backoff = self.CLOSED, 0, self.base_backoff
+        if recovered:
+            log.info("%s: healthy again, breaker closed", self.name)
+
+    def record_failure(self, error) -> bool:
+        """Returns True if this failure tripped a closed breaker."""
+        with self._lock:
+            self.failures += 1
+            tripped = False
+            if self.state == self.HALF_OPEN:
+                # Probe failed: stay away twice as long
+                self.backoff = min(self.backoff * 2, self.max_backoff)
+            elif self.state == self.OPEN or self.failures < self.failure_threshold:
+                return False
+            else:
+                self.backoff = self.base_backoff
+                self.trips += 1
+                tripped = True
+            self.state = self.OPEN
+            self.retry_at = time.monotonic() + self.backoff
+        log.warning("%s: breaker open, next probe in %.0fs (%s)", self.name, self.backoff, error)
+        return tripped
+
+
+# -----------------------------------------------------------------------------
+# Per-node connection pool
+# -----------------------------------------------------------------------------
+class NodePool:
+    def __init__(self, name: str, config: dict, size: int = 10, connect_timeout: float = 1.0,
+                 wait_timeout: float = 5.0, ping_after: float = 5.0):
+        self.name = name
+        self.config = dict(config, connection_timeout=max(1, round(connect_timeout)))
+        self.size = size
+        self.wait_timeout = wait_timeout
+        self.ping_after = ping_after
+        self._idle = queue.LifoQueue()   # (connection, parked at); LIFO keeps few sockets warm
+        self._slots = threading.BoundedSemaphore(size)
+        self.opened = 0
+
+    def acquire(self):
+        if not self._slots.acquire(timeout=self.wait_timeout):
+            raise errors.PoolError(f"{self.name}: all {self.size} connections busy")
+        try:
+            while True:
+                try:
+                    conn, parked_at = self._idle.get_nowait()
+                except queue.Empty:
+                    break
+                if time.monotonic() - parked_at < self.ping_after or conn.is_connected():
+                    return conn
+                self._close(conn)
+            conn = mysql.connector.connect(**self.config)
+            self.opened += 1
+            return conn
+        except BaseException:
+            self._slots.release()
+            raise
+
+    def release(self, conn, broken: bool = False) -> None:
+        try:
+            if broken:
+                self._close(conn)
+                return
+            if conn.in_transaction:
+                conn.rollback()  # never hand out someone else's open transaction
+            self._idle.put((conn, time.monotonic()))
+        except NODE_ERRORS:
+            self._close(conn)
+        finally:
+            self._slots.release()
+
+    def probe(self) -> None:
+        """SELECT 1 on a fresh connection (doesn't wait for a busy pool)."""
+        conn = mysql.connector.connect(**self.config)
+        try:
+            cur = conn.cursor()
+            cur.execute("SELECT 1")
+            cur.fetchall()
+            cur.close()
+        finally:
+            conn.close()
+
+    def clear(self) -> None:
+        """Drop idle connections (the node just failed; they are likely dead)."""
+        while True:
+            try:
+                conn, _ = self._idle.get_nowait()
+            except queue.Empty:
+                return
+            self._close(conn)
+
+    def stats(self) -> dict:
+        return {"size": self.size, "idle": self._idle.qsize(), "opened": self.opened}
+
+    @staticmethod
+    def _close(conn) -> None:
+        try:
+            conn.close()
+        except errors.Error:
+            pass
+
+
+class Node:
+    def __init__(self, name: str, config: dict, **pool_args):
+        breaker_args = {k: pool_args.pop(k) for k in ("failure_threshold", "max_backoff") if k in pool_args}
+        self.name = name
+        self.pool = NodePool(name, config, **pool_args)
+        self.breaker = CircuitBreaker(name, **breaker_args)
+        # Replicas only, refreshed by the lag poller
+        self.applied = None   # source binlog position applied so far (parse_token form)
+        self.lag = None       # Seconds_Behind_Source; None = unknown / not replicating
+
+
+# -----------------------------------------------------------------------------
+# Router
+# -----------------------------------------------------------------------------
+class Router:
+    def __init__(self, master: Node, replicas: list, health_interval: float = 2.0,
+                 lag_interval: float = 0.5, max_lag: float = None, ryw_wait: float = 0.0):
+        self.master = master
+        self.replicas = list(replicas)
+        self.nodes = [master] + self.replicas
+        self.health_interval = health_interval
+        self.lag_interval = lag_interval
+        self.max_lag = max_lag
+        self.ryw_wait = ryw_wait
+        self.counters = Counter()
+        self._rr = itertools.count()
+        self._lock = threading.Lock()
+        self._health = None
+
+    def start(self) -> "Router":
+        if self._health is None:
+            self._health = threading.Thread(target=self._health_loop, name="db-health", daemon=True)
+            self._health.start()
+            if self.replicas:
+                threading.Thread(target=self._lag_loop, name="db-lag", daemon=True).start()
+        return self
+
+    def candidates(self, read: bool) -> list:
+        if not read or not self.replicas:
+            return [self.master]
+        i = next(self._rr) % len(self.replicas)
+        return self.replicas[i:] + self.replicas[:i] + [self.master]
+
+    @contextmanager
+    def connection(self, read: bool = False, token: str = None):
+        """
+        A pooled connection to the best available node for a read or a
+        write. `token` (from session_token()) makes a read see that write.
+        """
+        kind = "read" if read else "write"
+        position, nodes = None, self.candidates(read)
+        if read and token:
+            try:
+                position = parse_token(token)
+            except (ValueError, IndexError):
+                self._count("ryw.bad_token")
+                nodes = [self.master]  # can't tell which replica is safe
+        may_wait = self.ryw_wait > 0
+
+        for node in nodes:
+            if not node.breaker.available():
+                self._count(f"skipped.{node.name}")  # breaker open: costs nothing
+                continue
+            wait = False
+            if node is not self.master:
+                if self.max_lag is not None and (node.lag is None or node.lag > self.max_lag):
+                    self._count(f"lagging.{node.name}")
+                    continue
+                if position is not None and (node.applied is None or node.applied < position):
+                    if not may_wait:
+                        self._count(f"behind.{node.name}")
+                        continue
+                    wait, may_wait = True, False  # wait on one replica at most
+            try:
+                conn = node.pool.acquire()
+            except NODE_ERRORS as e:
+                self._failed(node, e)
+                continue
+            except errors.PoolError:
+                self._count(f"pool_exhausted.{node.name}")
+                continue
+            if wait and not self._wait_for(node, conn, position):
+                continue
+
+            if node.breaker.failures:
+                node.breaker.record_success()  # failures only count in a row
+            self._count(f"{kind}.{node.name}")
+            if read and node is self.master and self.replicas:
+                self._count("fallback.read_to_master")
+                log.debug("read served by %s: no replica available", node.name)
+            broken = False
+            try:
+                yield conn
+            except NODE_ERRORS as e:
+                broken = True
+                self._failed(node, e)
+                raise
+            finally:
+                node.pool.release(conn, broken)
+            return
+
+        self._count(f"unavailable.{kind}")
+        raise NoHealthyNode(f"no healthy node for {kind}")
+
+    def run(self, fn, read: bool = False, token: str = None):
+        """
+        fn(conn) on a routed connection. A read whose node fails mid-query
+        is retried on the next candidate; a write is not (it may have
+        been applied).
+        """
+        attempts = len(self.nodes) if read else 1
+        for attempt in range(attempts):
+            try:
+                with self.connection(read=read, token=token) as conn:
+                    return fn(conn)
+            except NODE_ERRORS:
+                if attempt == attempts - 1:
+                    raise
+                self._count("retried.read")
+
+    @staticmethod
+    def session_token(conn):
+        """
+        After a commit on the master: its binlog position, which covers the
+        commit. None if binary logging is off.
+        """
+        cur = conn.cursor()
+        cur.execute("SHOW MASTER STATUS")
+        row = cur.fetchone()
+        cur.close()
+        return f"{row[0]}:{row[1]}" if row else None
+
+    def metrics(self) -> dict:
+        with self._lock:
+            counters = dict(self.counters)
+        return {
+            "counters": counters,
+            "nodes": {
+                node.name: dict(node.pool.stats(), breaker=node.breaker.state,
+                                trips=node.breaker.trips, failures=node.breaker.failures,
+                                **({} if node is self.master else {
+                                    "lag": node.lag,
+                                    "applied": f"{node.applied[2]}:{node.applied[1]}" if node.applied else None,
+                                }))
+                for node in self.nodes
+            },
+        }
+
+    def _count(self, key: str) -> None:
+        with self._lock:
+            self.counters[key] += 1
+
+    def _failed(self, node: Node, error) -> None:
+        self._count(f"failed.{node.name}")
+        if node.breaker.record_failure(error):
+            self._count(f"tripped.{node.name}")
+        # One dead connection usually means its idle siblings are dead too
+        node.pool.clear()
+
+    def _health_loop(self) -> None:
+        while True:
+            for node in self.nodes:
+                if not node.breaker.probe_due(time.monotonic()):
+                    continue
+                try:
+                    node.pool.probe()
+                except errors.Error as e:
+                    # Not just NODE_ERRORS: 1045 access denied, 1049 unknown
+                    # database... must not kill this thread, or an open
+                    # breaker is never probed again
+                    if not isinstance(e, NODE_ERRORS):
+                        log.warning("%s: health probe failed (%s)", node.name, e)
+                    self._failed(node, e)
+                else:
+                    node.breaker.record_success()
+            time.sleep(self.health_interval)
+
+    # Replica positions
+    def _lag_loop(self) -> None:
+        while True:
+            for node in self.replicas:
+                if node.breaker.available():
+                    self._poll_replica(node)
+            time.sleep(self.lag_interval)
+
+    def _poll_replica(self, node: Node) -> None:
+        try:
+            conn = node.pool.acquire()
+        except errors.PoolError:
+            return  # busy serving reads; try next round
+        except errors.Error as e:
+            # Any connect error (not only NODE_ERRORS) counts against the node
+            if not isinstance(e, NODE_ERRORS):
+                log.warning("%s: cannot connect for replica status (%s)", node.name, e)
+            self._failed(node, e)
+            return
+        broken = False
+        try:
+            cur = conn.cursor(dictionary=True)
+            cur.execute("SHOW REPLICA STATUS")
+            row = cur.fetchone()
+            cur.close()
+        except NODE_ERRORS as e:
+            broken = True
+            self._failed(node, e)
+            return
+        except errors.Error as e:
+            # e.g. missing REPLICATION CLIENT privilege: position unknown
+            log.warning("%s: cannot read replica status (%s)", node.name, e)
+            node.applied = node.lag = None
+            return
+        finally:
+            node.pool.release(conn, broken)
+        if not row or not row.get("Relay_Source_Log_File"):
+            node.applied = node.lag = None  # not (or no longer) a replica
+            return
+        position = parse_token(f"{row['Relay_Source_Log_File']}:{row['Exec_Source_Log_Pos']}")
+        if node.applied is None or position > node.applied:
+            node.applied = position
+        node.lag = row["Seconds_Behind_Source"]
+
+    def _wait_for(self, node: Node, conn, position: tuple) -> bool:
+        """Wait up to ryw_wait for `node` to apply `position`; releases conn if not."""
+        broken = False
+        try:
+            cur = conn.cursor()
+            cur.execute("SELECT SOURCE_POS_WAIT(%s, %s, %s)", (position[2], position[1], self.ryw_wait))
+            (result,) = cur.fetchone()
+            cur.close()
+        except NODE_ERRORS as e:
+            broken = True
+            self._failed(node, e)
+            result = None
+        except errors.Error as e:
+            # e.g. 1317 query interrupted, 1305 on servers without SOURCE_POS_WAIT
+            log.warning("%s: SOURCE_POS_WAIT failed (%s)", node.name, e)
+            result = None
+        except BaseException:
+            node.pool.release(conn, True)
+            raise
+        # NULL: not replicating; -1: timed out
+        if result is not None and result >= 0:
+            self._count("ryw.waited")
+            if node.applied is None or position > node.applied:
+                node.applied = position
+            return True
+        self._count("ryw.wait_timeout")
+        node.pool.release(conn, broken)
+        return False
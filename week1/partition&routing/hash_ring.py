@@ -0,0 +1,112 @@
+"""
+Consistent-hash ring with weighted virtual nodes.
+
+Each partition owns `vnodes * weight` points on a 64-bit ring; a key belongs
+to the first point clockwise from its hash. Adding a partition only steals
+the ranges just before its new points (~1/(N+1) of the keys), instead of
+reshuffling almost everything like `key % N` does.
+
+Lookups are one hash + one `bisect` over a sorted array of points.
+
+    ring = HashRing(["partition1", "partition2"])
+    ring.get_node(42)                       # -> "partition2"
+    bigger = ring.with_node("partition3")   # rings are immutable
+
+`ModuloPlacement` is the router's original `key % N` scheme, kept so a
+deployment still laid out that way can be read from and migrated off.
+"""
+
+import hashlib
+from bisect import bisect_right
+
+
+_MASK64 = (1 << 64) - 1
+
+
+def _mix64(x: int) -> int:
+    """splitmix64 finalizer: cheap, well-distributed 64-bit mix of an int."""
+    z = (x + 0x9E3779B97F4A7C15) & _MASK64
+    z = ((z ^ (z >> 30)) * 0xBF58476D1CE4E5B9) & _MASK64
+    z = ((z ^ (z >> 27)) * 0x94D049BB133111EB) & _MASK64
+    return z ^ (z >> 31)
+
+
+def stable_hash(key) -> int:
+    """
+    64-bit hash that is the same in every process (unlike built-in hash()).
+    Numeric keys (1, "1") take the fast integer mix; other strings use blake2b.
+    """
+    if isinstance(key, int):
+        return _mix64(key)
+    try:
+        return _mix64(int(key))
+    except ValueError:
+        return int.from_bytes(hashlib.blake2b(key.encode(), digest_size=8).digest(), "big")
+
+
+class HashRing:
+    def __init__(self, nodes, vnodes=160):
+        """`nodes` is a list of names (weight 1) or a {name: weight} dict."""
+        if not isinstance(nodes, dict):
+            nodes = {name: 1 for name in nodes}
+        if not nodes:
+            raise ValueError("ring needs at least one node")
+        self.weights = dict(nodes)
+        self.vnodes = vnodes
+
+        points = sorted(
+            (stable_hash(f"{name}#{i}"), name)
+            for name, weight in self.weights.items()
+            for i in range(int(vnodes * weight))
+        )
+        self._hashes = [h for h, _ in points]  # list: bisect on it is faster than on array
+        self._owners = [name for _, name in points]
+
+    @property
+    def nodes(self):
+        return list(self.weights)
+
+    def get_node(self, key) -> str:
+        i = bisect_right(self._hashes, stable_hash(key))
+        return self._owners[i if i < len(self._owners) else 0]
+
+    def with_node(self, name, weight=1):
+        return HashRing({**self.weights, name: weight}, self.vnodes)
+
+    def without_node(self, name):
+        weights = dict(self.weights)
+        weights.pop(name)
+        return HashRing(weights, self.vnodes)
+
+    def moved_fraction(self, other, keys) -> float:
+        """Share of `keys` whose owner differs between this ring and `other`."""
+        keys = list(keys)
+        moved = sum(1 for k in keys if self.get_node(k) != other.get_node(k))
+        return moved / len(keys) if keys else 0.0
+
+
+class ModuloPlacement:
+    """The legacy `key % N` placement (same lookup interface as HashRing)."""
+
+    def __init__(self, nodes):
+        self.nodes = list(nodes)
+        if not self.nodes:
+            raise ValueError("placement needs at least one node")
+
+    def get_node(self, key) -> str:
+        if isinstance(key, str):
+            try:
+                key = int(key)
+            except ValueError:
+                # Same fallback as the old router: sum of character codes
+                key = sum(ord(c) for c in key)
+        return self.nodes[int(key) % len(self.nodes)]
+
+
+def make_placement(scheme: str, nodes):
+    """`"ring"` -> HashRing, `"modulo"` -> ModuloPlacement."""
+    if scheme == "ring":
+        return HashRing(nodes)
+    if scheme == "modulo":
+        return ModuloPlacement(nodes)
+    raise ValueError(f"unknown partition scheme {scheme!r} (expected 'ring' or 'modulo')")
@@ -0,0 +1,79 @@
+"""
+Replay a key file through the router's hashing and report the distribution.
+
+One key per line (user ids, emails, whatever you route by):
+
+    python key_distribution.py keys.txt --partitions partition1..64
+    python key_distribution.py keys.txt --compare-legacy --top 20
+
+Prints keys per partition, skew (max / mean; 1.0 is perfectly even) and the
+top-K hot keys from the same Space-Saving sketch the router uses for /stats.
+`--compare-legacy` adds the old `sum(ord(c)) % N` string fallback, where
+anagrams ("abc", "cab") always collide.
+"""
+
+import argparse
+import os
+from collections import Counter
+
+from hash_ring import HashRing
+from router_stats import SpaceSaving
+from topology import expand_names
+
+
+def legacy_partition(partitions, key):
+    try:
+        k = int(key)
+    except ValueError:
+        k = sum(ord(c) for c in key)
+    return partitions[k % len(partitions)]
+
+
+def report(title, counts, partitions):
+    total = sum(counts.values())
+    mean = total / len(partitions)
+    print(f"\n{title}")
+    for p in partitions:
+        n = counts.get(p, 0)
+        print(f"  {p:<20} {n:>10}  {n / total:6.1%}")
+    print(f"  skew (max/mean): {max(counts.get(p, 0) for p in partitions) / mean:.3f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("keyfile")
+    parser.add_argument("--partitions", default=os.getenv("PARTITIONS", "partition1,partition2"))
+    parser.add_argument("--vnodes", type=int, default=160)
+    parser.add_argument("--top", type=int, default=10, help="hot keys to show")
+    parser.add_argument("--sketch-size", type=int, default=1000, help="Space-Saving counters")
+    parser.add_argument("--compare-legacy", action="store_true")
+    args = parser.parse_args()
+
+    partitions = expand_names(args.partitions)
+    ring = HashRing(partitions, args.vnodes)
+    ring_counts, legacy_counts = Counter(), Counter()
+    hot = SpaceSaving(args.sketch_size)
+
+    with open(args.keyfile) as f:
+        for line in f:
+            key = line.strip()
+            if not key:
+                continue
+            ring_counts[ring.get_node(key)] += 1
+            hot.add(key)
+            if args.compare_legacy:
+                legacy_counts[legacy_partition(partitions, key)] += 1
+
+    if not ring_counts:
+        raise SystemExit("no keys in file")
+    report(f"Hash ring ({args.vnodes} vnodes/partition)", ring_counts, partitions)
+    if args.compare_legacy:
+        report("Legacy modulo / sum(ord) fallback", legacy_counts, partitions)
+
+    print(f"\nTop {args.top} keys (count, max overestimate):")
+    for item in hot.top(args.top):
+        print(f"  {item['key']:<30} {item['count']:>8}  ±{item['error']}")
+
+
+if __name__ == "__main__":
+    main()
@@ -5,17 +5,38 @@ Simple MySQL Hash Routing (Flask) — Thoroughly Commented
 --------------------------------------------------------
 
 What this does (super simple):
-- Uses **two MySQL databases** on the *same server*: `partition1` and `partition2`.
-- Routes each request by a **very basic hash**: `id % 2`.
-- **Creates the databases and the `users` table at startup** if they don't exist.
-- Minimal HTTP router using **Flask** with two endpoints:
+- Uses **N MySQL databases** (`PARTITIONS`, default `partition1,partition2`),
+  on one server or spread over several via `TOPOLOGY_FILE` (see `topology.py`).
+- Routes each request with a **consistent-hash ring** (see `hash_ring.py`),
+  so adding a partition only moves ~1/(N+1) of the users.
+- **Creates the databases and the `users` table at startup** if they don't exist
+  (all partitions in parallel), then warms the pools in the background.
+- Connections per host are capped by a shared budget (`HOST_MAX_CONNECTIONS`
+  or `max_connections` in the topology), however many partitions it holds.
+- Minimal HTTP router using **Flask**:
     - `POST /users` → insert user into the correct partition
     - `GET  /users/<id>` → read that user from the correct partition
+    - `POST /users/bulk` → one multi-row INSERT per partition, per-item errors
+    - `GET  /users?ids=1,2,3` → parallel `IN (...)` query per partition, merged
+    - `GET  /users?after_id=&limit=` → all partitions' cursors merged by id
+      (heap k-way merge), streamed as JSON or NDJSON; keyset pagination
+    - `GET  /stats` → per-partition rate/latency/pool saturation, skew,
+      top-K hot keys and cache hit rate (see `router_stats.py`)
+- `GET /users/<id>` goes through an in-process read-through cache
+  (`user_cache.py`: LRU + TTL, negative caching, single-flight); set
+  `USER_CACHE_REDIS_URL` to share it between router processes.
 
 Why this looks like sharding:
-- Each partition is a separate MySQL database. You can think of them as two shards.
-- The app decides where a row goes by hashing the key (here, just modulo 2).
-- No rebalancing, no metadata tables, no complexity.
+- Each partition is a separate MySQL database. You can think of them as shards.
+- The app decides where a row goes by hashing the key onto the ring.
+- Rebalancing after adding a partition: set `PREVIOUS_PARTITIONS` to the old
+  list while `rebalance.py` copies the moved users over; meanwhile reads
+  fall back to the old owner (dual-read) so nobody 404s mid-migration.
+- Upgrading from the old `id % N` router (about half the users change
+  partition on the ring): deploy with
+      PREVIOUS_PARTITIONS=partition1,partition2 PREVIOUS_PARTITION_SCHEME=modulo
+  so reads fall back to the modulo location, run `rebalance.py`, then unset
+  both. `PARTITION_SCHEME=modulo` keeps routing the old way instead.
 
 How to run:
     pip install flask mysql-connector-python
@@ -28,23 +49,51 @@ Test:
       -d '{"id":1, "name":"Alice", "email":"a@example.com"}'
 
     curl http://localhost:8000/users/1
+
+    curl -X POST http://localhost:8000/users/bulk \
+      -H 'content-type: application/json' \
+      -d '[{"id":2, "name":"Bob", "email":"b@example.com"},
+           {"id":3, "name":"Carol", "email":"c@example.com"}]'
+
+    curl 'http://localhost:8000/users?ids=1,2,3'
+
+    curl 'http://localhost:8000/users?after_id=1&limit=100'
+    curl -N 'http://localhost:8000/users?format=ndjson' > users.ndjson   # full export
 """
+import heapq
+import itertools
+import json
 import os
+import threading
+import time
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+
 import mysql.connector
-from mysql.connector import pooling
-from flask import Flask, request, jsonify
+from flask import Flask, Response, request, jsonify, stream_with_context
+
+from hash_ring import make_placement
+from router_stats import RouterStats
+from topology import load_topology
+from user_cache import ReadThroughCache, RedisBackend
 
 # -----------------------------
-# Configuration via environment variables
+# Configuration: topology (see topology.py)
 # -----------------------------
-# These are read once on process start. You can hardcode defaults for dev.
-MYSQL_HOST = os.getenv("MYSQL_HOST", "127.0.0.1")
-MYSQL_PORT = int(os.getenv("MYSQL_PORT", "3306"))
-MYSQL_USER = os.getenv("MYSQL_USER", "root")
-MYSQL_PASSWORD = os.getenv("MYSQL_PASSWORD", "")
+# Read once on process start. Without TOPOLOGY_FILE everything lives on
+# MYSQL_HOST; PARTITIONS accepts ranges, e.g. PARTITIONS=partition1..64.
+TOPOLOGY = load_topology()
+
+# Current ring members, and the list *before* the last change. While the
+# latter is set, reads that miss on the new owner retry on the old one.
+PARTITIONS = TOPOLOGY.partitions
+PREVIOUS_PARTITIONS = TOPOLOGY.previous_partitions
 
-# Two partitions = two separate databases on the same server.
-PARTITIONS = ["partition1", "partition2"]
+# Every database we may talk to (current + previous during a migration)
+ALL_PARTITIONS = TOPOLOGY.all_partitions
+
+# Parallelism of the startup DDL (CREATE DATABASE / CREATE TABLE)
+BOOTSTRAP_WORKERS = int(os.getenv("BOOTSTRAP_WORKERS", "16"))
 
 # Schema for the `users` table (will exist inside EACH partition DB)
 USERS_TABLE_SQL = (
@@ -55,20 +104,35 @@ USERS_TABLE_SQL = (
     ") ENGINE=InnoDB"
 )
 
+# -----------------------------
+# Connection pools per partition
+# -----------------------------
+# Lazy: nothing connects until first use (or the background warm-up below).
+# Pools on the same host share HOST_BUDGETS[host], so 64 partitions x
+# POOL_SIZE never exceed that host's max_connections.
+POOLS, HOST_BUDGETS = TOPOLOGY.build_pools()
+
 # -----------------------------
 # Bootstrap: ensure DBs and tables exist
 # -----------------------------
 
-def ensure_databases() -> None:
-    """Ensure the two partition databases exist."""
-    # Here we connect WITHOUT specifying a database.
-    admin = mysql.connector.connect(
-        host=MYSQL_HOST, port=MYSQL_PORT, user=MYSQL_USER, password=MYSQL_PASSWORD
-    )
+def create_databases(host: str) -> None:
+    """Ensure the partition databases placed on `host` exist."""
+    dbs = TOPOLOGY.partitions_on(host)
+    if not dbs:
+        return
+    # Here we connect WITHOUT specifying a database (still counted in the host's budget).
+    budget = HOST_BUDGETS[host]
+    budget.acquire(None, time.monotonic() + 30)
+    try:
+        admin = mysql.connector.connect(**TOPOLOGY.connect_args(host))
+    except BaseException:
+        budget.release()
+        raise
     # Create a cursor object. Think of this as your SQL command executor.
     cur = admin.cursor()
     try:
-        for db in PARTITIONS:
+        for db in dbs:
             # This will create the database if missing (idempotent)
             cur.execute(
                 f"CREATE DATABASE IF NOT EXISTS `{db}` "
@@ -78,70 +142,327 @@ def ensure_databases() -> None:
     finally:
         cur.close()   # Close cursor when done (good practice)
         admin.close() # Close connection when done
+        budget.release()
+
+
+def create_table(db: str) -> None:
+    """Ensure one partition has the `users` table (its first pooled connection stays warm)."""
+    conn = POOLS[db].get_connection()
+    cur = conn.cursor()  # Cursor = SQL command interface for this connection
+    try:
+        cur.execute(USERS_TABLE_SQL)  # Run CREATE TABLE
+        conn.commit()
+    finally:
+        cur.close()
+        conn.close()
+
+
+def ensure_databases() -> None:
+    """Create missing partition databases, all hosts in parallel."""
+    with ThreadPoolExecutor(max_workers=max(1, min(BOOTSTRAP_WORKERS, len(TOPOLOGY.hosts)))) as ex:
+        list(ex.map(create_databases, TOPOLOGY.hosts))
 
 
 def ensure_tables() -> None:
-    """Ensure each partition has the `users` table."""
-    for db in PARTITIONS:
-        conn = mysql.connector.connect(
-            host=MYSQL_HOST,
-            port=MYSQL_PORT,
-            user=MYSQL_USER,
-            password=MYSQL_PASSWORD,
-            database=db,
-        )
-        cur = conn.cursor()  # Cursor = SQL command interface for this connection
-        try:
-            cur.execute(USERS_TABLE_SQL)  # Run CREATE TABLE
-            conn.commit()
-        finally:
-            cur.close()
-            conn.close()
+    """Create missing `users` tables, many partitions at once (startup ~ flat in N)."""
+    with ThreadPoolExecutor(max_workers=max(1, min(BOOTSTRAP_WORKERS, len(ALL_PARTITIONS)))) as ex:
+        list(ex.map(create_table, ALL_PARTITIONS))
+
 
-# Run bootstrap once on startup
+def warm_pools() -> None:
+    """Top every pool up to POOL_MIN_IDLE idle connections, within free host budget."""
+    with ThreadPoolExecutor(max_workers=max(1, min(BOOTSTRAP_WORKERS, len(ALL_PARTITIONS)))) as ex:
+        for db, fut in [(db, ex.submit(POOLS[db].warm)) for db in ALL_PARTITIONS]:
+            try:
+                fut.result()
+            except mysql.connector.Error as e:
+                print(f"warm-up of {db} failed: {e}")
+
+# Run bootstrap once on startup; warm-up continues in the background
 ensure_databases()
 ensure_tables()
+threading.Thread(target=warm_pools, name="pool-warmup", daemon=True).start()
 
 # -----------------------------
-# Connection pools per partition
+# Hashing + Routing
+# -----------------------------
+# "ring" (consistent hashing) or "modulo" (the original `id % N` layout).
+# The previous scheme is separate so a modulo deployment can move to the ring.
+PARTITION_SCHEME = os.getenv("PARTITION_SCHEME", "ring")
+PREVIOUS_PARTITION_SCHEME = os.getenv("PREVIOUS_PARTITION_SCHEME", "ring")
+
+RING = make_placement(PARTITION_SCHEME, PARTITIONS)
+PREVIOUS_RING = make_placement(PREVIOUS_PARTITION_SCHEME, PREVIOUS_PARTITIONS) if PREVIOUS_PARTITIONS else None
+
+
+def get_partition(key: int | str) -> str:
+    """Pick a partition with the current scheme (the hash ring by default)."""
+    return RING.get_node(key)
+
+
+def get_previous_partition(key: int | str) -> str | None:
+    """Where the key lived before the current migration (None if no migration)."""
+    return PREVIOUS_RING.get_node(key) if PREVIOUS_RING else None
+
+
+# -----------------------------
+# Instrumentation
+# -----------------------------
+# Per-partition request rate, latency, in-flight calls and hot keys -> /stats
+ROUTER_STATS = RouterStats(top_k=int(os.getenv("HOT_KEYS_TOP_K", "50")))
+
+
+def checkout(db: str):
+    """Pooled connection for `db`, timed as one partition call until conn.close()."""
+    return ROUTER_STATS.checkout(POOLS[db], db)
+
+
+def fetch_user(db: str, user_id: int):
+    """Primary-key lookup in one partition; returns the row tuple or None."""
+    conn = checkout(db)
+    try:
+        cur = conn.cursor()
+        cur.execute("SELECT id, name, email FROM users WHERE id=%s", (user_id,))
+        row = cur.fetchone()  # fetchone() pulls one row
+    finally:
+        cur.close()
+        conn.close()
+    return row
+
+def load_user(user_id: int) -> dict | None:
+    """Cache loader: current owner first, then the previous one mid-migration."""
+    db = get_partition(user_id)
+    row = fetch_user(db, user_id)
+
+    # Dual-read: during a migration the user may not have been copied yet
+    if not row:
+        old_db = get_previous_partition(user_id)
+        if old_db and old_db != db:
+            row = fetch_user(old_db, user_id)
+
+    return {"id": row[0], "name": row[1], "email": row[2]} if row else None
+
+# -----------------------------
+# Read-through cache in front of get_user
 # -----------------------------
-POOLS = {
-    db: pooling.MySQLConnectionPool(
-        pool_name=f"pool_{db}",
-        pool_size=5,
-        host=MYSQL_HOST,
-        port=MYSQL_PORT,
-        user=MYSQL_USER,
-        password=MYSQL_PASSWORD,
-        database=db,
-        auth_plugin="mysql_native_password",
-    )
-    for db in PARTITIONS
-}
+# Hot ids are served from memory instead of taking one of the partition's
+# few pooled connections. 404s are cached briefly too (negative caching).
+USER_CACHE = ReadThroughCache(
+    load_user,
+    max_entries=int(os.getenv("USER_CACHE_SIZE", "100000")),
+    ttl=float(os.getenv("USER_CACHE_TTL", "30")),
+    negative_ttl=float(os.getenv("USER_CACHE_NEGATIVE_TTL", "2")),
+    backend=RedisBackend(os.environ["USER_CACHE_REDIS_URL"]) if os.getenv("USER_CACHE_REDIS_URL") else None,
+)
 
 # -----------------------------
-# Hashing + Routing
+# Batch helpers (bulk insert / multi-get)
 # -----------------------------
-def get_partition(key: int | str) -> str:
-    """Pick a partition by a very basic hash."""
-    if isinstance(key, str):
+# Per-partition work for one HTTP request runs in parallel on this executor.
+FANOUT = ThreadPoolExecutor(max_workers=max(4, len(ALL_PARTITIONS)), thread_name_prefix="fanout")
+
+MAX_BULK_ROWS = 10_000  # rows per POST /users/bulk
+MAX_MULTI_GET = 1_000   # ids per GET /users?ids=...
+INSERT_CHUNK = 1_000    # rows per multi-row INSERT statement
+
+
+def parse_user_id(value) -> int | None:
+    """JSON id (int, or a string of digits) as an int; None if it isn't one."""
+    if isinstance(value, bool):
+        return None
+    if isinstance(value, int):
+        return value
+    if isinstance(value, str) and value.strip().lstrip("-").isdigit():
+        return int(value)
+    return None
+
+
+def insert_users(db: str, rows: list[tuple]) -> list[str | None]:
+    """
+    Insert `rows` (id, name, email) into one partition in a single transaction.
+    Returns one error message (or None) per row.
+
+    Fast path: multi-row INSERTs. If any row is rejected (constraint, or bad
+    data such as an over-long name) the whole statement fails, so we roll back
+    and replay row by row — InnoDB only undoes the failing statement — to find
+    out exactly which rows were bad. Connection-level errors still propagate.
+    """
+    errors = [None] * len(rows)
+    conn = checkout(db)
+    cur = conn.cursor()
+    try:
+        try:
+            for start in range(0, len(rows), INSERT_CHUNK):
+                chunk = rows[start:start + INSERT_CHUNK]
+                cur.execute(
+                    "INSERT INTO users (id, name, email) VALUES "
+                    + ", ".join(["(%s, %s, %s)"] * len(chunk)),
+                    [value for row in chunk for value in row],
+                )
+        except mysql.connector.DatabaseError as e:
+            if isinstance(e, mysql.connector.OperationalError):
+                raise  # the partition, not a row, is the problem
+            conn.rollback()
+            for i, row in enumerate(rows):
+                try:
+                    cur.execute("INSERT INTO users (id, name, email) VALUES (%s, %s, %s)", row)
+                except mysql.connector.DatabaseError as e:
+                    if isinstance(e, mysql.connector.OperationalError):
+                        raise
+                    errors[i] = str(e)
+        conn.commit()
+    finally:
+        cur.close()
+        conn.close()
+    return errors
+
+
+def fetch_users(db: str, ids: list[int]) -> dict[int, tuple]:
+    """One `IN (...)` query against one partition; returns {id: row}."""
+    conn = checkout(db)
+    cur = conn.cursor()
+    try:
+        cur.execute(
+            "SELECT id, name, email FROM users WHERE id IN (" + ", ".join(["%s"] * len(ids)) + ")",
+            ids,
+        )
+        return {row[0]: row for row in cur.fetchall()}
+    finally:
+        cur.close()
+        conn.close()
+
+
+def fetch_many(groups: dict[str, list[int]]) -> tuple[dict[int, tuple], dict[int, str]]:
+    """Scatter-gather: query every partition in `groups` at once. Returns (rows, errors)."""
+    found, errors = {}, {}
+    futures = {FANOUT.submit(fetch_users, db, ids): (db, ids) for db, ids in groups.items()}
+    for fut, (db, ids) in futures.items():
+        try:
+            found.update(fut.result())
+        except mysql.connector.Error as e:
+            errors.update({i: f"{db}: {e}" for i in ids})
+    return found, errors
+
+# -----------------------------
+# Cross-partition scan (GET /users without ids)
+# -----------------------------
+MAX_SCAN_PAGE = 10_000  # `limit` per GET /users page (omit it to export everything)
+SCAN_FETCH = 500        # rows pulled off each partition's cursor at a time
+
+
+class PartitionScan:
+    """
+    Ordered, unbuffered cursor over one partition's users. Rows stay on the
+    server / in the socket until fetched, so memory is SCAN_FETCH rows per
+    partition whatever the table size.
+    """
+
+    def __init__(self, db: str, after_id: int | None, limit: int | None):
+        self.db = db
+        self.limit = limit
+        self.rows = 0  # rows yielded so far
+        self.exhausted = False
+        self.conn = checkout(db)
+        try:
+            self.cur = self.conn.cursor()  # unbuffered (mysql.connector's default)
+            sql, params = "SELECT id, name, email FROM users", []
+            if after_id is not None:
+                sql += " WHERE id > %s"
+                params.append(after_id)
+            sql += " ORDER BY id"
+            if limit:
+                sql += " LIMIT %s"  # a page can't need more than `limit` rows from one partition
+                params.append(limit)
+            self.cur.execute(sql, params)
+            self.batch = self.cur.fetchmany(SCAN_FETCH)
+        except BaseException:
+            self.conn.discard()
+            raise
+
+    def __iter__(self):
+        while self.batch:
+            for row in self.batch:
+                self.rows += 1
+                yield row
+            self.batch = self.cur.fetchmany(SCAN_FETCH)
+        self.exhausted = True
+
+    @property
+    def truncated(self) -> bool:
+        """Stopped by LIMIT, so the partition may hold more rows."""
+        return bool(self.limit) and self.rows >= self.limit
+
+    def close(self):
+        if self.conn is None:
+            return
+        conn, self.conn = self.conn, None
+        if self.exhausted:
+            self.cur.close()
+            conn.close()
+        else:
+            # Unread rows would poison the next user of this connection
+            conn.discard()
+
+
+def scan_users(after_id: int | None = None, limit: int | None = None):
+    """
+    Yield (id, name, email) across all partitions in id order, at most `limit`.
+    Every partition's cursor is opened in parallel, then merged with a heap.
+
+    Mid-migration a user can exist on two partitions (or move while we
+    scan), so dropping duplicates may leave the merge short of `limit`. If
+    any partition stopped at its LIMIT we then scan again after the last
+    id, so a page is only short at the real end of the table.
+    """
+    last_id, sent = None, 0
+    while True:
+        futures = [FANOUT.submit(PartitionScan, db, after_id, limit and limit - sent)
+                   for db in ALL_PARTITIONS]
+        scans, error = [], None
+        for fut in futures:
+            try:
+                scans.append(fut.result())
+            except Exception as e:
+                error = error or e
         try:
-            key = int(key)
-        except ValueError:
-            # fallback: sum of character codes
-            key = sum(ord(c) for c in key)
-    idx = int(key) % len(PARTITIONS)
-    return PARTITIONS[idx]
+            if error:
+                raise error
+            for row in heapq.merge(*scans, key=lambda r: r[0]):
+                if row[0] == last_id:
+                    continue  # the same user on its old and new partition
+                yield row
+                last_id, sent = row[0], sent + 1
+                if limit and sent >= limit:
+                    return
+            if not any(scan.truncated for scan in scans) or last_id is None:
+                return
+            after_id = last_id  # short after dedup, but more rows may follow: refill
+        finally:
+            for scan in scans:
+                scan.close()
 
 # -----------------------------
 # Flask app & endpoints
 # -----------------------------
 app = Flask(__name__)
 
+@app.errorhandler(mysql.connector.errors.PoolError)
+def pool_exhausted(e):
+    """Partition pool or host budget used up (see topology.py): try again later."""
+    return jsonify({"error": str(e)}), 503, {"Retry-After": "1"}
+
 @app.route("/health", methods=["GET"])
 def health():
     return {"status": "ok"}
 
+@app.route("/stats", methods=["GET"])
+def stats():
+    return jsonify({
+        **ROUTER_STATS.snapshot(POOLS),
+        "hosts": {name: budget.stats() for name, budget in HOST_BUDGETS.items()},
+        "user_cache": USER_CACHE.stats(),
+    })
+
 @app.route("/users", methods=["POST"])
 def create_user():
     """Insert a user into the correct partition."""
@@ -155,8 +476,10 @@ def create_user():
     user_id = data["id"]
     db = get_partition(user_id)
 
+    ROUTER_STATS.record_request(db, user_id)
+
     # Get a pooled connection and cursor (cursor is how we run SQL)
-    conn = POOLS[db].get_connection()
+    conn = checkout(db)
     try:
         cur = conn.cursor()
         cur.execute(
@@ -170,25 +493,162 @@ def create_user():
         cur.close()
         conn.close()
 
+    # Drop any cached "not found" for this id
+    USER_CACHE.invalidate(int(user_id))
     return jsonify(data)
 
 @app.route("/users/<int:user_id>", methods=["GET"])
 def get_user(user_id: int):
-    """Retrieve a user from the correct partition."""
-    db = get_partition(user_id)
-    conn = POOLS[db].get_connection()
+    """Retrieve a user from the correct partition (through the cache)."""
+    ROUTER_STATS.record_request(get_partition(user_id), user_id)
+    user = USER_CACHE.get(user_id)
+    if not user:
+        return jsonify({"error": "User not found"}), 404
+
+    return jsonify(user)
+
+@app.route("/users/bulk", methods=["POST"])
+def create_users_bulk():
+    """
+    Insert many users: rows are grouped by partition and each group is written
+    with multi-row INSERTs, all partitions in parallel. One bad row (e.g. a
+    duplicate email) only fails that row, reported by its index in the input.
+    """
+    data = request.json
+    if isinstance(data, dict):
+        data = data.get("users")
+    if not isinstance(data, list):
+        return jsonify({"error": "Expected a JSON list of users"}), 400
+    if len(data) > MAX_BULK_ROWS:
+        return jsonify({"error": f"At most {MAX_BULK_ROWS} users per request"}), 413
+
+    results = [None] * len(data)
+    groups = defaultdict(list)  # partition -> [(input index, row)]
+    for i, item in enumerate(data):
+        missing = [f for f in ("id", "name", "email") if not isinstance(item, dict) or f not in item]
+        if missing:
+            results[i] = {"index": i, "status": "error", "error": f"Missing field: {missing[0]}"}
+            continue
+        user_id = parse_user_id(item["id"])
+        if user_id is None:
+            results[i] = {"index": i, "status": "error", "error": "id must be an integer"}
+            continue
+        db = get_partition(user_id)
+        ROUTER_STATS.record_request(db, user_id)
+        groups[db].append((i, (user_id, item["name"], item["email"])))
+
+    futures = {
+        FANOUT.submit(insert_users, db, [row for _, row in items]): items
+        for db, items in groups.items()
+    }
+    for fut, items in futures.items():
+        try:
+            errors = fut.result()
+        except mysql.connector.Error as e:
+            errors = [str(e)] * len(items)  # whole partition unavailable
+        for (i, row), err in zip(items, errors):
+            results[i] = {"index": i, "id": row[0], "status": "error" if err else "created"}
+            if err:
+                results[i]["error"] = err
+            else:
+                USER_CACHE.invalidate(row[0])
+
+    created = sum(r["status"] == "created" for r in results)
+    return jsonify({"created": created, "failed": len(results) - created, "results": results})
+
+@app.route("/users", methods=["GET"])
+def get_users():
+    """Multi-get with `?ids=1,2,3`; without ids, a scan of all users (see list_users)."""
+    if "ids" not in request.args:
+        return list_users()
     try:
-        cur = conn.cursor()
-        cur.execute("SELECT id, name, email FROM users WHERE id=%s", (user_id,))
-        row = cur.fetchone()  # fetchone() pulls one row
-    finally:
-        cur.close()
-        conn.close()
+        ids = list(dict.fromkeys(int(x) for x in request.args.get("ids", "").split(",") if x.strip()))
+    except ValueError:
+        return jsonify({"error": "ids must be comma-separated integers"}), 400
+    if not ids:
+        return jsonify({"error": "Missing ids"}), 400
+    if len(ids) > MAX_MULTI_GET:
+        return jsonify({"error": f"At most {MAX_MULTI_GET} ids per request"}), 413
 
-    if not row:
-        return jsonify({"error": "User not found"}), 404
+    groups = defaultdict(list)
+    for user_id in ids:
+        db = get_partition(user_id)
+        ROUTER_STATS.record_request(db, user_id)
+        groups[db].append(user_id)
+    found, errors = fetch_many(groups)
+
+    # Dual-read for ids not yet migrated off their previous partition
+    if PREVIOUS_RING:
+        retry = defaultdict(list)
+        for user_id in ids:
+            if user_id not in found and user_id not in errors:
+                old_db = get_previous_partition(user_id)
+                if old_db != get_partition(user_id):
+                    retry[old_db].append(user_id)
+        if retry:
+            more, more_errors = fetch_many(retry)
+            found.update(more)
+            errors.update(more_errors)
+
+    return jsonify({
+        "users": [{"id": r[0], "name": r[1], "email": r[2]} for r in (found.get(i) for i in ids) if r],
+        "missing": [i for i in ids if i not in found and i not in errors],
+        "errors": {str(i): msg for i, msg in errors.items()},
+    })
+
+def list_users():
+    """
+    `GET /users?after_id=100&limit=50` -> users in id order, streamed.
+
+    Keyset pagination: pass the last id you got as the next `after_id`.
+    Without `limit` the whole table is exported. Default output is one JSON
+    document `{"users": [...], "next_after_id": ...}` (null on the last page);
+    `?format=ndjson` or `Accept: application/x-ndjson` sends one user per line.
+    Either way rows are written as they come off the merge, never buffered.
+    """
+    try:
+        after_id = int(request.args["after_id"]) if request.args.get("after_id") else None
+        limit = int(request.args.get("limit") or 0)
+    except ValueError:
+        return jsonify({"error": "after_id and limit must be integers"}), 400
+    if limit < 0 or limit > MAX_SCAN_PAGE:
+        return jsonify({"error": f"limit must be between 1 and {MAX_SCAN_PAGE}"}), 400
+    ndjson = (request.args.get("format") == "ndjson"
+              or "application/x-ndjson" in request.headers.get("Accept", ""))
+
+    rows = scan_users(after_id, limit or None)
+    try:
+        first = next(rows, None)  # open every cursor now so failures are still a clean 503
+    except mysql.connector.Error as e:
+        return jsonify({"error": str(e)}), 503
+
+    def user(row):
+        return json.dumps({"id": row[0], "name": row[1], "email": row[2]})
+
+    def generate():
+        sent, last_id = 0, None
+        try:
+            if ndjson:
+                for row in itertools.chain([first], rows) if first else ():
+                    yield user(row) + "\n"
+                return
+            yield '{"users": ['
+            if first:
+                yield user(first)
+                sent, last_id = 1, first[0]
+            for row in rows:
+                yield ", " + user(row)
+                sent, last_id = sent + 1, row[0]
+            more = bool(limit) and sent == limit
+            yield f'], "next_after_id": {json.dumps(last_id if more else None)}}}'
+        except mysql.connector.Error as e:
+            # Headers are gone already: end the body with the error instead
+            yield json.dumps({"error": str(e)}) + "\n" if ndjson else f'], "error": {json.dumps(str(e))}}}'
+        finally:
+            rows.close()
 
-    return jsonify({"id": row[0], "name": row[1], "email": row[2]})
+    return Response(stream_with_context(generate()),
+                    mimetype="application/x-ndjson" if ndjson else "application/json")
 
 if __name__ == "__main__":
     app.run(host="0.0.0.0", port=8000, debug=True)
@@ -0,0 +1,159 @@
+"""
+Online rebalancing after the partition list changed.
+
+Run it with the same environment as the router during the migration window:
+
+    export PREVIOUS_PARTITIONS=partition1,partition2
+    export PARTITIONS=partition1,partition2,partition3
+    python rebalance.py --batch 1000
+
+For every *previous* partition it walks `users` in primary-key order, one
+batch at a time, and moves only the rows whose owner changed on the new
+ring. Each moved batch is:
+
+    1. inserted into its new partition with INSERT IGNORE, matched by id
+       only: a row already there (copied by an earlier run, or written by
+       the router since the migration began) is never overwritten, then
+    2. deleted from the old partition, but only for ids now present in the
+       new one. A row whose email already belongs to a different id there
+       is reported as a conflict and left where it is, for a human to fix.
+
+At any moment a user lives in the old partition, the new one, or briefly
+both, so the router's dual-read in `get_user` always finds them. When the
+tool finishes, unset PREVIOUS_PARTITIONS and restart the router.
+
+Coming from the old `id % N` router, add PREVIOUS_PARTITION_SCHEME=modulo
+(for the router's dual-read; the scan itself does not depend on it):
+
+    export PREVIOUS_PARTITIONS=partition1,partition2 PREVIOUS_PARTITION_SCHEME=modulo
+    export PARTITIONS=partition1,partition2
+
+Here about half the rows move, since modulo and ring placement are unrelated.
+
+Rows are scanned rather than looked up by hash range because `users` is
+keyed by id, not by ring position; with the ring only ~1/(N+1) of them
+actually move when a partition is added.
+"""
+
+import argparse
+import time
+from collections import defaultdict
+
+from partition_routing import POOLS, PREVIOUS_PARTITIONS, PREVIOUS_PARTITION_SCHEME, get_partition
+
+
+def migrate_partition(src: str, batch: int, pause: float, dry_run: bool = False) -> tuple[int, int, int]:
+    """Move rows out of `src` that the current placement assigns elsewhere. Returns (scanned, moved, conflicts)."""
+    scanned = moved = conflicts = 0
+    after_id = None
+    while True:
+        conn = POOLS[src].get_connection()
+        try:
+            cur = conn.cursor()
+            if after_id is None:
+                cur.execute("SELECT id, name, email FROM users ORDER BY id LIMIT %s", (batch,))
+            else:
+                cur.execute(
+                    "SELECT id, name, email FROM users WHERE id > %s ORDER BY id LIMIT %s",
+                    (after_id, batch),
+                )
+            rows = cur.fetchall()
+            cur.close()
+        finally:
+            conn.close()
+        if not rows:
+            return scanned, moved, conflicts
+
+        scanned += len(rows)
+        after_id = rows[-1][0]
+
+        # Group the rows that changed owner by their new partition
+        by_target = defaultdict(list)
+        for row in rows:
+            target = get_partition(row[0])
+            if target != src:
+                by_target[target].append(row)
+
+        for target, target_rows in by_target.items():
+            if dry_run:
+                landed = [r[0] for r in target_rows]
+            else:
+                landed = copy_rows(target, target_rows)
+                if landed:
+                    delete_rows(src, landed)
+            moved += len(landed)
+            print(f"  {src} -> {target}: {len(landed)} users (up to id {target_rows[-1][0]})")
+            landed = set(landed)
+            for row in target_rows:
+                if row[0] not in landed:
+                    conflicts += 1
+                    print(f"  CONFLICT: user {row[0]} ({row[2]}) not moved: "
+                          f"email already used by another id in {target}; kept in {src}")
+
+        if pause:
+            time.sleep(pause)  # throttle so live traffic keeps its share of the pools
+
+
+def copy_rows(db: str, rows: list[tuple]) -> list[int]:
+    """
+    Insert `rows` into `db` unless their id is already there; returns the
+    ids present in `db` afterwards (safe to delete from the source). Ids
+    skipped because of the UNIQUE email key are left out.
+    """
+    ids = [row[0] for row in rows]
+    conn = POOLS[db].get_connection()
+    try:
+        cur = conn.cursor()
+        placeholders = ", ".join(["(%s, %s, %s)"] * len(rows))
+        # No ON DUPLICATE KEY UPDATE: that also fires on the email key and
+        # would overwrite another user's row (or a newer write of this one)
+        cur.execute(
+            f"INSERT IGNORE INTO users (id, name, email) VALUES {placeholders}",
+            [value for row in rows for value in row],
+        )
+        conn.commit()
+        cur.execute(
+            "SELECT id FROM users WHERE id IN (" + ", ".join(["%s"] * len(ids)) + ")", ids
+        )
+        present = {row[0] for row in cur.fetchall()}
+        cur.close()
+    finally:
+        conn.close()
+    return [i for i in ids if i in present]
+
+
+def delete_rows(db: str, ids: list[int]) -> None:
+    conn = POOLS[db].get_connection()
+    try:
+        cur = conn.cursor()
+        placeholders = ", ".join(["%s"] * len(ids))
+        cur.execute(f"DELETE FROM users WHERE id IN ({placeholders})", ids)
+        conn.commit()
+        cur.close()
+    finally:
+        conn.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Move users to their new partitions.")
+    parser.add_argument("--batch", type=int, default=1000, help="rows scanned per batch")
+    parser.add_argument("--pause", type=float, default=0.05, help="seconds to sleep between batches")
+    parser.add_argument("--dry-run", action="store_true", help="only report what would move")
+    args = parser.parse_args()
+
+    if not PREVIOUS_PARTITIONS:
+        raise SystemExit("PREVIOUS_PARTITIONS is not set: nothing to migrate from")
+
+    print(f"Migrating from {PREVIOUS_PARTITION_SCHEME} placement of {', '.join(PREVIOUS_PARTITIONS)}")
+    start = time.time()
+    total_scanned = total_moved = total_conflicts = 0
+    for src in PREVIOUS_PARTITIONS:
+        print(f"Scanning {src} ...")
+        scanned, moved, conflicts = migrate_partition(src, args.batch, args.pause, args.dry_run)
+        total_scanned += scanned
+        total_moved += moved
+        total_conflicts += conflicts
+    print(f"Done in {time.time() - start:.1f}s: scanned {total_scanned}, moved {total_moved} "
+          f"({total_moved / max(total_scanned, 1):.1%}), conflicts {total_conflicts}")
+    if total_conflicts:
+        raise SystemExit("some users were not moved (email conflicts above); resolve them and re-run")
@@ -0,0 +1,59 @@
+"""
+Modulo routing vs consistent-hash ring.
+
+Reports, for N -> N+1 partitions:
+- lookup cost (ns per key) for `key % N` and for HashRing.get_node
+- fraction of keys that change partition (ideal is 1/(N+1))
+- load spread (max/min keys per partition) for the ring
+
+    python ring_benchmark.py --keys 200000 --partitions 2,4,8,16 --vnodes 40,160
+"""
+
+import argparse
+import time
+from collections import Counter
+
+from hash_ring import HashRing
+
+
+def modulo_node(nodes, key):
+    return nodes[int(key) % len(nodes)]
+
+
+def time_per_lookup(fn, keys):
+    start = time.perf_counter()
+    for k in keys:
+        fn(k)
+    return (time.perf_counter() - start) / len(keys) * 1e9
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--keys", type=int, default=200_000)
+    parser.add_argument("--partitions", default="2,4,8,16")
+    parser.add_argument("--vnodes", default="40,160")
+    args = parser.parse_args()
+
+    keys = range(args.keys)
+    print(f"{'N->N+1':>8} {'scheme':>12} {'ns/lookup':>10} {'moved':>8} {'ideal':>7} {'max/min load':>13}")
+    for n in (int(x) for x in args.partitions.split(",")):
+        old_nodes = [f"partition{i + 1}" for i in range(n)]
+        new_nodes = old_nodes + [f"partition{n + 1}"]
+        ideal = 1 / (n + 1)
+
+        moved = sum(1 for k in keys if modulo_node(old_nodes, k) != modulo_node(new_nodes, k)) / len(keys)
+        ns = time_per_lookup(lambda k: modulo_node(new_nodes, k), keys)
+        print(f"{n:>4}->{n + 1:<3} {'modulo':>12} {ns:>10.0f} {moved:>8.1%} {ideal:>7.1%} {'1.00':>13}")
+
+        for vnodes in (int(x) for x in args.vnodes.split(",")):
+            old_ring = HashRing(old_nodes, vnodes)
+            new_ring = HashRing(new_nodes, vnodes)
+            ns = time_per_lookup(new_ring.get_node, keys)
+            moved = old_ring.moved_fraction(new_ring, keys)
+            load = Counter(new_ring.get_node(k) for k in keys)
+            spread = max(load.values()) / max(min(load.values()), 1)
+            print(f"{n:>4}->{n + 1:<3} {f'ring/{vnodes}':>12} {ns:>10.0f} {moved:>8.1%} {ideal:>7.1%} {spread:>13.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,232 @@
+"""
+Per-partition load instrumentation for the hash router.
+
+- request rate per partition (sliding window of 1-second buckets)
+- DB latency per partition (log2-bucket histogram -> p50/p95/p99)
+- in-flight DB calls per partition, plus pool idle/size when available
+- top-K hot keys across all partitions (Space-Saving sketch, bounded memory)
+
+    ROUTER_STATS.record_request("partition1", user_id)
+    with ROUTER_STATS.track("partition1"):
+        ...run the query...
+    conn = ROUTER_STATS.checkout(POOLS["partition1"], "partition1")  # tracked until conn.close()
+    ROUTER_STATS.snapshot(POOLS)   # JSON-ready dict for /stats
+"""
+
+import heapq
+import itertools
+import threading
+import time
+from contextlib import contextmanager
+
+
+class SpaceSaving:
+    """
+    Top-K heavy hitters in O(k) memory (Metwally et al.). Counts are upper
+    bounds; `error` is how much a count may be overestimated.
+
+    The minimum is found with a heap and lazy deletion: every count change
+    pushes a fresh (count, seq, key) entry and stale ones are skipped when
+    they surface, so add() is O(log k) amortized instead of an O(k) scan.
+    """
+
+    def __init__(self, k=50):
+        self.k = k
+        self._counts = {}  # key -> [count, error]
+        self._heap = []    # (count, seq, key), possibly stale
+        self._seq = itertools.count()  # tie-breaker: keys need not be comparable
+
+    def add(self, key, n=1):
+        entry = self._counts.get(key)
+        if entry is not None:
+            entry[0] += n
+        elif len(self._counts) < self.k:
+            entry = self._counts[key] = [n, 0]
+        else:
+            # Replace the current minimum; the newcomer inherits its count as error
+            floor = self._pop_min()
+            entry = self._counts[key] = [floor + n, floor]
+        heapq.heappush(self._heap, (entry[0], next(self._seq), key))
+        if len(self._heap) > 4 * self.k:
+            self._compact()
+
+    def _pop_min(self):
+        while True:
+            count, _, key = heapq.heappop(self._heap)
+            entry = self._counts.get(key)
+            if entry is not None and entry[0] == count:
+                del self._counts[key]
+                return count
+
+    def _compact(self):
+        # Drop stale entries so the heap stays O(k)
+        self._heap = [(c, next(self._seq), k) for k, (c, _) in self._counts.items()]
+        heapq.heapify(self._heap)
+
+    def top(self, n=None):
+        items = sorted(self._counts.items(), key=lambda kv: kv[1][0], reverse=True)
+        return [{"key": k, "count": c, "error": e} for k, (c, e) in items[:n]]
+
+
+class _Latency:
+    """log2 buckets from 100us; enough resolution to spot a slow shard."""
+    BASE = 100e-6
+    BUCKETS = 20
+
+    def __init__(self):
+        self.counts = [0] * (self.BUCKETS + 1)
+        self.n = 0
+
+    def add(self, seconds):
+        i = 0
+        while seconds > self.BASE * (1 << i) and i < self.BUCKETS:
+            i += 1
+        self.counts[i] += 1
+        self.n += 1
+
+    def quantile(self, q):
+        if not self.n:
+            return 0.0
+        target, seen = q * self.n, 0
+        for i, c in enumerate(self.counts):
+            seen += c
+            if seen >= target:
+                return self.BASE * (1 << i)
+        return self.BASE * (1 << self.BUCKETS)
+
+
+class _PartitionStats:
+    def __init__(self, window):
+        self.window = window
+        self.buckets = [0] * window   # requests per second, ring buffer
+        self.stamps = [0] * window    # which second each bucket belongs to
+        self.total = 0
+        self.in_flight = 0
+        self.latency = _Latency()
+
+    def hit(self, now_s):
+        i = now_s % self.window
+        if self.stamps[i] != now_s:
+            self.stamps[i] = now_s
+            self.buckets[i] = 0
+        self.buckets[i] += 1
+        self.total += 1
+
+    def rate(self, now_s):
+        fresh = sum(c for c, s in zip(self.buckets, self.stamps) if now_s - s < self.window)
+        return fresh / self.window
+
+
+class RouterStats:
+    def __init__(self, top_k=50, window=60):
+        self.window = window
+        self._lock = threading.Lock()
+        self._partitions = {}
+        self._hot = SpaceSaving(top_k)
+
+    def _get(self, partition):
+        stats = self._partitions.get(partition)
+        if stats is None:
+            stats = self._partitions[partition] = _PartitionStats(self.window)
+        return stats
+
+    def record_request(self, partition, key):
+        with self._lock:
+            self._get(partition).hit(int(time.time()))
+            self._hot.add(key)
+
+    def begin(self, partition):
+        with self._lock:
+            self._get(partition).in_flight += 1
+        return time.perf_counter()
+
+    def end(self, partition, started):
+        elapsed = time.perf_counter() - started
+        with self._lock:
+            stats = self._get(partition)
+            stats.in_flight -= 1
+            stats.latency.add(elapsed)
+
+    @contextmanager
+    def track(self, partition):
+        """Time one DB call against `partition` and count it as in flight meanwhile."""
+        started = self.begin(partition)
+        try:
+            yield
+        finally:
+            self.end(partition, started)
+
+    def checkout(self, pool, partition):
+        """pool.get_connection(), timed (pool wait included) until the connection is closed."""
+        started = self.begin(partition)
+        try:
+            conn = pool.get_connection()
+        except BaseException:
+            self.end(partition, started)
+            raise
+        return _TrackedConnection(conn, lambda: self.end(partition, started))
+
+    def snapshot(self, pools=None, top=20):
+        now_s = int(time.time())
+        with self._lock:
+            partitions = {}
+            for name, s in sorted(self._partitions.items()):
+                partitions[name] = {
+                    "requests": s.total,
+                    "rate_per_s": round(s.rate(now_s), 3),
+                    "in_flight": s.in_flight,
+                    "latency_p50_ms": round(s.latency.quantile(0.50) * 1000, 3),
+                    "latency_p95_ms": round(s.latency.quantile(0.95) * 1000, 3),
+                    "latency_p99_ms": round(s.latency.quantile(0.99) * 1000, 3),
+                }
+            hot = self._hot.top(top)
+        for name, pool in (pools or {}).items():
+            entry = partitions.setdefault(name, {"requests": 0, "rate_per_s": 0.0, "in_flight": 0})
+            entry.update(pool_saturation(pool))
+        rates = [p["rate_per_s"] for p in partitions.values()]
+        mean = sum(rates) / len(rates) if rates else 0.0
+        return {
+            "partitions": partitions,
+            "skew": round(max(rates) / mean, 3) if mean else None,  # 1.0 = perfectly even
+            "hot_keys": hot,
+        }
+
+
+class _TrackedConnection:
+    """Delegates to a pooled connection; reports back once on close()."""
+
+    def __init__(self, conn, on_close):
+        self._conn = conn
+        self._on_close = on_close
+
+    def __getattr__(self, name):
+        return getattr(self._conn, name)
+
+    def close(self):
+        try:
+            self._conn.close()
+        finally:
+            self._done()
+
+    def discard(self):
+        try:
+            self._conn.discard()
+        finally:
+            self._done()
+
+    def _done(self):
+        if self._on_close:
+            self._on_close()
+            self._on_close = None
+
+
+def pool_saturation(pool):
+    """Pool's own stats() if it has one, else idle/size of a mysql.connector MySQLConnectionPool."""
+    if hasattr(pool, "stats"):
+        return pool.stats()
+    size = getattr(pool, "pool_size", None)
+    queue = getattr(pool, "_cnx_queue", None)
+    if size is None or queue is None:
+        return {}
+    idle = queue.qsize()
+    return {"pool_size": size, "pool_idle": idle, "pool_saturation": round(1 - idle / size, 3)}
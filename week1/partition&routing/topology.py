@@ -0,0 +1,392 @@
+"""
+Partition topology: which MySQL host holds which partition, and how many
+connections the router may open to each host.
+
+    TOPOLOGY_FILE=topology.json python partition_routing.py
+
+    {
+      "hosts": {
+        "db-a": {"host": "10.0.0.11", "port": 3306, "max_connections": 80,
+                 "partitions": "partition1..32"},
+        "db-b": {"host": "10.0.0.12", "max_connections": 80,
+                 "partitions": ["partition33..64"]}
+      },
+      "partitions": "partition1..64",
+      "previous_partitions": "partition1..48",
+      "pool": {"max_size": 5, "min_idle": 1, "timeout": 10}
+    }
+
+- `hosts.*.partitions` is where each database lives; the top-level
+  `partitions` / `previous_partitions` are the current and pre-migration ring
+  members (default: everything placed / nothing). PARTITIONS and
+  PREVIOUS_PARTITIONS in the environment still override them.
+- Missing host fields fall back to MYSQL_HOST / MYSQL_PORT / MYSQL_USER /
+  MYSQL_PASSWORD. Without a file every partition lives on MYSQL_HOST, as before.
+- "name1..N" expands to name1, name2, ..., nameN anywhere a list is accepted.
+
+Connection budget: each partition gets a lazy PartitionPool (nothing is opened
+until first use or warm()), and all pools on a host draw from that host's
+HostBudget. 64 partitions x max_size 5 therefore never exceed the host's
+`max_connections`; a pool that needs a connection while the budget is spent
+first closes an idle one parked in a sibling pool, then waits up to `timeout`.
+"""
+
+import json
+import os
+import re
+import threading
+import time
+from collections import deque
+
+import mysql.connector
+from mysql.connector.errors import PoolError
+
+_RANGE = re.compile(r"^(.*?)(\d+)\.\.(\d+)$")
+
+
+def expand_names(spec) -> list[str]:
+    """'p1..3,x' or ['p1..3', 'x'] -> ['p1', 'p2', 'p3', 'x'] (duplicates dropped)."""
+    if isinstance(spec, str):
+        spec = spec.split(",")
+    names = []
+    for item in spec or ():
+        item = item.strip()
+        if not item:
+            continue
+        m = _RANGE.match(item)
+        if m:
+            prefix, lo, hi = m.group(1), int(m.group(2)), int(m.group(3))
+            names.extend(f"{prefix}{i}" for i in range(lo, hi + 1))
+        else:
+            names.append(item)
+    return list(dict.fromkeys(names))
+
+
+# -----------------------------
+# Per-host connection budget
+# -----------------------------
+class HostBudget:
+    """Cap on open connections to one MySQL host, shared by all its partition pools."""
+
+    def __init__(self, name: str, limit: int):
+        self.name = name
+        self.limit = limit
+        self.pools = []   # PartitionPools drawing from this budget
+        self.waiting = 0  # threads blocked in acquire()
+        self._cond = threading.Condition()
+        self._open = 0
+        self._waits = 0   # acquires that had to wait (once each, however long)
+        self._reclaimed = 0
+
+    def acquire(self, requester, deadline: float) -> None:
+        """Take one connection slot, reclaiming idle ones from sibling pools if needed."""
+        waited = False
+        while True:
+            with self._cond:
+                if self._open < self.limit:
+                    self._open += 1
+                    return
+            # Budget spent: close a connection parked idle in another pool
+            if any(p.drop_idle() for p in self.pools if p is not requester):
+                with self._cond:
+                    self._reclaimed += 1
+                continue
+            with self._cond:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    raise PoolError(f"host {self.name}: connection budget of {self.limit} exhausted")
+                if self._open >= self.limit:
+                    if not waited:
+                        waited = True
+                        self._waits += 1
+                    self.waiting += 1
+                    try:
+                        # Short slices: a sibling may park a connection without notifying us
+                        self._cond.wait(min(remaining, 0.05))
+                    finally:
+                        self.waiting -= 1
+
+    def try_acquire(self) -> bool:
+        """Take a slot only if one is free right now (used for background warm-up)."""
+        with self._cond:
+            if self._open < self.limit:
+                self._open += 1
+                return True
+            return False
+
+    def release(self) -> None:
+        with self._cond:
+            self._open -= 1
+            self._cond.notify()
+
+    def stats(self) -> dict:
+        with self._cond:
+            return {"limit": self.limit, "open": self._open, "waits": self._waits,
+                    "reclaimed": self._reclaimed, "partitions": len(self.pools)}
+
+
+# -----------------------------
+# Lazy per-partition pool
+# -----------------------------
+class PartitionPool:
+    """
+    Drop-in for mysql.connector's MySQLConnectionPool (get_connection() /
+    conn.close()), but opens connections on demand, at most `max_size`, each
+    one paid for out of the host's budget.
+    """
+
+    def __init__(self, name: str, connect_args: dict, budget: HostBudget,
+                 max_size=5, min_idle=1, timeout=10.0, pre_ping_after=5.0):
+        self.name = name
+        self.connect_args = connect_args
+        self.budget = budget
+        self.max_size = max_size
+        self.min_idle = min_idle
+        self.timeout = timeout
+        self.pre_ping_after = pre_ping_after
+        budget.pools.append(self)
+
+        self._cond = threading.Condition()
+        self._idle = deque()  # (raw connection, parked_at)
+        self._size = 0        # open connections, idle + checked out
+        self._waiting = 0
+        self._connects = 0
+
+    def get_connection(self, timeout=None):
+        deadline = time.monotonic() + (self.timeout if timeout is None else timeout)
+        while True:
+            entry = self._take_or_reserve(deadline)
+            if entry is None:
+                return _PooledConnection(self, self._open_new(deadline))
+            raw, parked_at = entry
+            if self._alive(raw, parked_at):
+                return _PooledConnection(self, raw)
+            self._discard(raw)
+
+    def warm(self, n=None) -> int:
+        """
+        Open connections until `n` (default min_idle) are idle. Only uses free
+        budget: warming never waits, nor evicts another partition's connections.
+        """
+        opened = 0
+        target = self.min_idle if n is None else n
+        while True:
+            with self._cond:
+                if len(self._idle) >= target or self._size >= self.max_size:
+                    return opened
+                self._size += 1
+            if not self.budget.try_acquire():
+                self._unreserve()
+                return opened
+            self._park(self._connect())
+            opened += 1
+
+    def drop_idle(self) -> bool:
+        """Close one idle connection to hand its slot back to the host budget."""
+        with self._cond:
+            if not self._idle:
+                return False
+            raw, _ = self._idle.popleft()
+        self._discard(raw)
+        return True
+
+    def close(self) -> None:
+        while self.drop_idle():
+            pass
+
+    def stats(self) -> dict:
+        with self._cond:
+            idle, size = len(self._idle), self._size
+            waiting, connects = self._waiting, self._connects
+        return {"pool_size": self.max_size, "pool_open": size, "pool_idle": idle,
+                "pool_waiting": waiting, "pool_connects": connects,
+                "pool_saturation": round((size - idle) / self.max_size, 3)}
+
+    # -- internals ---------------------------------------------------------
+    def _take_or_reserve(self, deadline):
+        """(raw, parked_at) of an idle connection, or None after reserving a slot for a new one."""
+        with self._cond:
+            while True:
+                if self._idle:
+                    return self._idle.pop()  # LIFO: the warmest connection
+                if self._size < self.max_size:
+                    self._size += 1
+                    return None
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    raise PoolError(f"{self.name}: pool exhausted ({self.max_size} connections in use)")
+                self._waiting += 1
+                try:
+                    self._cond.wait(remaining)
+                finally:
+                    self._waiting -= 1
+
+    def _open_new(self, deadline):
+        """Connect for a slot already reserved in _size; gives the slot back on failure."""
+        try:
+            self.budget.acquire(self, deadline)
+        except BaseException:
+            self._unreserve()
+            raise
+        return self._connect()
+
+    def _connect(self):
+        """Connect for a reserved slot whose budget is already taken; undoes both on failure."""
+        try:
+            raw = mysql.connector.connect(**self.connect_args)
+        except BaseException:
+            self.budget.release()
+            self._unreserve()
+            raise
+        with self._cond:
+            self._connects += 1
+        return raw
+
+    def _alive(self, raw, parked_at: float) -> bool:
+        if time.monotonic() - parked_at < self.pre_ping_after:
+            return True
+        try:
+            raw.ping(reconnect=False)
+            return True
+        except mysql.connector.Error:
+            return False
+
+    def _release(self, raw) -> None:
+        try:
+            if raw.in_transaction:
+                raw.rollback()  # never hand the next caller someone else's open transaction
+        except mysql.connector.Error:
+            self._discard(raw)
+            return
+        with self._cond:
+            # Nobody here needs it but another partition on the host does: free the slot
+            give_back = self.budget.waiting and not self._waiting
+        if give_back:
+            self._discard(raw)
+        else:
+            self._park(raw)
+
+    def _park(self, raw) -> None:
+        with self._cond:
+            self._idle.append((raw, time.monotonic()))
+            self._cond.notify()
+
+    def _discard(self, raw) -> None:
+        try:
+            raw.close()
+        except mysql.connector.Error:
+            pass
+        self.budget.release()
+        self._unreserve()
+
+    def _unreserve(self) -> None:
+        with self._cond:
+            self._size -= 1
+            self._cond.notify()
+
+
+class _PooledConnection:
+    """Delegates to the raw connection; close() returns it to its PartitionPool."""
+
+    def __init__(self, pool, raw):
+        self._pool = pool
+        self._raw = raw
+
+    def __getattr__(self, name):
+        return getattr(self._raw, name)
+
+    def close(self):
+        raw, self._raw = self._raw, None
+        if raw is not None:
+            self._pool._release(raw)
+
+    def discard(self):
+        """Like close(), but drop the connection (e.g. a streamed result was abandoned)."""
+        raw, self._raw = self._raw, None
+        if raw is not None:
+            self._pool._discard(raw)
+
+
+# -----------------------------
+# Topology
+# -----------------------------
+class Topology:
+    def __init__(self, hosts: dict, placement: dict, partitions: list, previous_partitions: list,
+                 pool_options: dict | None = None):
+        self.hosts = hosts                      # host name -> connect settings + max_connections
+        self.placement = placement              # partition -> host name
+        self.partitions = partitions            # current ring
+        self.previous_partitions = previous_partitions
+        self.all_partitions = list(dict.fromkeys(partitions + previous_partitions))
+        self.pool_options = pool_options or {}
+        unplaced = [p for p in self.all_partitions if p not in placement]
+        if unplaced:
+            raise ValueError(f"partitions not placed on any host: {', '.join(unplaced)}")
+
+    def connect_args(self, host: str, database: str | None = None) -> dict:
+        cfg = self.hosts[host]
+        args = {"host": cfg["host"], "port": cfg["port"], "user": cfg["user"],
+                "password": cfg["password"], "auth_plugin": "mysql_native_password"}
+        if database:
+            args["database"] = database
+        return args
+
+    def partitions_on(self, host: str) -> list[str]:
+        return [p for p in self.all_partitions if self.placement[p] == host]
+
+    def build_pools(self) -> tuple[dict, dict]:
+        """Lazy pools for every partition in use, plus one budget per host. Opens nothing."""
+        budgets = {name: HostBudget(name, cfg["max_connections"]) for name, cfg in self.hosts.items()}
+        pools = {
+            db: PartitionPool(db, self.connect_args(self.placement[db], db),
+                              budgets[self.placement[db]], **self.pool_options)
+            for db in self.all_partitions
+        }
+        return pools, budgets
+
+
+def load_topology(env=os.environ) -> Topology:
+    """Topology from TOPOLOGY_FILE if set, else the single-host MYSQL_* / PARTITIONS settings."""
+    defaults = {
+        "host": env.get("MYSQL_HOST", "127.0.0.1"),
+        "port": int(env.get("MYSQL_PORT", "3306")),
+        "user": env.get("MYSQL_USER", "root"),
+        "password": env.get("MYSQL_PASSWORD", ""),
+        "max_connections": int(env.get("HOST_MAX_CONNECTIONS", "100")),
+    }
+    pool_options = {
+        "max_size": int(env.get("POOL_SIZE", "5")),
+        "min_idle": int(env.get("POOL_MIN_IDLE", "1")),
+        "timeout": float(env.get("POOL_TIMEOUT", "10")),
+    }
+
+    path = env.get("TOPOLOGY_FILE")
+    if path:
+        with open(path) as f:
+            spec = json.load(f)
+        hosts, placement = {}, {}
+        for name, cfg in spec["hosts"].items():
+            hosts[name] = {**defaults, **{k: v for k, v in cfg.items() if k != "partitions"}}
+            for db in expand_names(cfg.get("partitions", ())):
+                if db in placement:
+                    raise ValueError(f"{db} is placed on both {placement[db]} and {name}")
+                placement[db] = name
+        partitions = expand_names(spec.get("partitions", list(placement)))
+        previous = expand_names(spec.get("previous_partitions", ()))
+        pool_options.update(spec.get("pool", {}))
+    else:
+        partitions = expand_names("partition1,partition2")
+        previous = []
+
+    # Environment wins, so a migration can be started without editing the file
+    if env.get("PARTITIONS"):
+        partitions = expand_names(env["PARTITIONS"])
+    if env.get("PREVIOUS_PARTITIONS"):
+        previous = expand_names(env["PREVIOUS_PARTITIONS"])
+    if not partitions:
+        raise ValueError("no partitions configured")
+
+    if not path:
+        hosts = {"default": defaults}
+        placement = {db: "default" for db in partitions + previous}
+    return Topology(hosts, placement, partitions, previous, pool_options)
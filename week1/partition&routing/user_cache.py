@@ -0,0 +1,153 @@
+"""
+In-process read-through cache for hot point lookups.
+
+    cache = ReadThroughCache(load_user, max_entries=10_000, ttl=30, negative_ttl=2)
+    cache.get(42)          # hit, or calls load_user(42) once and caches the result
+    cache.invalidate(42)   # after a write
+
+- Bounded: LRU eviction past `max_entries`, entries expire after `ttl` seconds.
+- Negative caching: a loader result of None (404) is cached for `negative_ttl`.
+- Single-flight: concurrent misses on the same key share ONE loader call.
+- `stats()` reports hits / misses / hit rate / loads / coalesced waits.
+- Optional shared `backend` (get/set/delete of JSON strings, e.g. RedisBackend)
+  consulted after a local miss, so several router processes share loads.
+  Cached values must therefore be JSON-serialisable.
+"""
+
+import json
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future
+
+try:
+    import redis
+except ImportError:  # optional shared backend
+    redis = None
+
+
+class RedisBackend:
+    """Shared cache tier in Redis (keys are prefixed, values are JSON strings)."""
+
+    def __init__(self, url="redis://localhost:6379/0", prefix="users:"):
+        if redis is None:
+            raise RuntimeError("redis is not installed (pip install redis)")
+        self.client = redis.Redis.from_url(url)
+        self.prefix = prefix
+
+    def get(self, key):
+        raw = self.client.get(self.prefix + str(key))
+        return raw.decode() if raw is not None else None
+
+    def set(self, key, value, ttl):
+        self.client.set(self.prefix + str(key), value, px=max(1, int(ttl * 1000)))
+
+    def delete(self, key):
+        self.client.delete(self.prefix + str(key))
+
+
+class ReadThroughCache:
+    def __init__(self, loader, max_entries=10_000, ttl=30.0, negative_ttl=2.0, backend=None):
+        self.loader = loader
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self.backend = backend
+
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()  # key -> (expires_at, value)
+        self._inflight = {}            # key -> Future shared by concurrent misses
+        self._counters = {"hits": 0, "negative_hits": 0, "misses": 0, "loads": 0,
+                          "coalesced": 0, "backend_hits": 0, "evictions": 0, "load_errors": 0}
+
+    def get(self, key):
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                if entry[0] > now:
+                    self._entries.move_to_end(key)
+                    self._counters["hits" if entry[1] is not None else "negative_hits"] += 1
+                    return entry[1]
+                del self._entries[key]
+            self._counters["misses"] += 1
+            fut = self._inflight.get(key)
+            leader = fut is None
+            if leader:
+                fut = self._inflight[key] = Future()
+            else:
+                self._counters["coalesced"] += 1
+
+        if not leader:
+            return fut.result()  # re-raises the leader's error, if any
+
+        try:
+            value, loaded = self._load(key)
+            wrote_backend = False
+            if loaded and self.backend is not None:
+                with self._lock:
+                    wrote_backend = self._inflight.get(key) is fut
+                if wrote_backend:
+                    self.backend.set(key, json.dumps(value), self._ttl_for(value))
+        except BaseException as e:
+            with self._lock:
+                self._counters["load_errors"] += 1
+                if self._inflight.get(key) is fut:
+                    del self._inflight[key]
+            fut.set_exception(e)
+            raise
+        with self._lock:
+            # Skip the store if invalidate() ran while we were loading
+            current = self._inflight.get(key) is fut
+            if current:
+                del self._inflight[key]
+                self._store(key, value)
+        if wrote_backend and not current:
+            # invalidate() slipped in between our check and the write; its
+            # backend delete may have gone first, so take the value back out
+            self.backend.delete(key)
+        fut.set_result(value)
+        return value
+
+    def invalidate(self, key):
+        with self._lock:
+            self._entries.pop(key, None)
+            self._inflight.pop(key, None)  # an in-flight load must not repopulate stale data
+        if self.backend is not None:
+            self.backend.delete(key)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._inflight.clear()
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._counters, size=len(self._entries), max_entries=self.max_entries)
+        lookups = stats["hits"] + stats["negative_hits"] + stats["misses"]
+        stats["hit_rate"] = round((stats["hits"] + stats["negative_hits"]) / lookups, 4) if lookups else 0.0
+        return stats
+
+    # -- internals ---------------------------------------------------------
+    def _load(self, key):
+        """(value, True if it came from the loader rather than the backend)."""
+        if self.backend is not None:
+            raw = self.backend.get(key)
+            if raw is not None:
+                with self._lock:
+                    self._counters["backend_hits"] += 1
+                return json.loads(raw), False
+        value = self.loader(key)
+        with self._lock:
+            self._counters["loads"] += 1
+        return value, True
+
+    def _ttl_for(self, value):
+        return self.ttl if value is not None else self.negative_ttl
+
+    def _store(self, key, value):
+        self._entries[key] = (time.monotonic() + self._ttl_for(value), value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self._counters["evictions"] += 1
@@ -0,0 +1,120 @@
+"""
+Striped counters and append buffers for hot paths.
+
+The demo in thread_safe_increment.py serialises every writer on one global
+Lock around `list.append`. These two classes split the state into stripes
+instead, each with its own small lock, so writers on different threads
+rarely touch the same lock. Reads/drains walk all stripes and aggregate.
+
+Storage is `array`-backed (machine ints, no boxed Python ints per element).
+
+    requests = ShardedCounter()
+    requests.add()            # from any thread
+    requests.value()          # approximate while writers run, exact once they stop
+
+    latencies = ConcurrentAppendBuffer("d")
+    latencies.append(0.012)
+    batch = latencies.drain()  # array('d', [...]); buffer is empty afterwards
+
+Each thread is pinned to a stripe on first use (round-robin), which spreads
+threads evenly; hashing thread idents would not.
+"""
+
+import itertools
+import os
+import threading
+from array import array
+
+
+def _default_stripes():
+    # Next power of two >= 2 * CPUs, so stripe lookup is a bit-mask
+    n = 2 * (os.cpu_count() or 4)
+    return 1 << (n - 1).bit_length()
+
+
+class _StripeAssigner:
+    """Gives each thread a fixed stripe index, round-robin."""
+
+    def __init__(self, stripes):
+        self._mask = stripes - 1
+        self._next = itertools.count()
+        self._local = threading.local()
+
+    def index(self):
+        try:
+            return self._local.idx
+        except AttributeError:
+            idx = self._local.idx = next(self._next) & self._mask
+            return idx
+
+
+class ShardedCounter:
+    """64-bit counter split over `stripes` slots of one array('q')."""
+
+    def __init__(self, stripes=None):
+        stripes = stripes or _default_stripes()
+        if stripes & (stripes - 1):
+            raise ValueError("stripes must be a power of two")
+        self._counts = array("q", [0]) * stripes
+        self._locks = [threading.Lock() for _ in range(stripes)]
+        self._assign = _StripeAssigner(stripes)
+
+    def add(self, n=1):
+        i = self._assign.index()
+        with self._locks[i]:
+            self._counts[i] += n
+
+    def value(self):
+        """Sum of all stripes (no locks: may miss in-flight adds)."""
+        return sum(self._counts)
+
+    def reset(self):
+        """Zero the counter and return its exact value at that moment."""
+        for lock in self._locks:
+            lock.acquire()
+        try:
+            total = sum(self._counts)
+            for i in range(len(self._counts)):
+                self._counts[i] = 0
+            return total
+        finally:
+            for lock in self._locks:
+                lock.release()
+
+
+class ConcurrentAppendBuffer:
+    """
+    Multi-writer append buffer of `typecode` values ('q' ints, 'd' floats, ...).
+    Order is preserved per thread, not globally.
+    """
+
+    def __init__(self, typecode="q", stripes=None):
+        stripes = stripes or _default_stripes()
+        if stripes & (stripes - 1):
+            raise ValueError("stripes must be a power of two")
+        self.typecode = typecode
+        self._bufs = [array(typecode) for _ in range(stripes)]
+        self._locks = [threading.Lock() for _ in range(stripes)]
+        self._assign = _StripeAssigner(stripes)
+
+    def append(self, value):
+        i = self._assign.index()
+        with self._locks[i]:
+            self._bufs[i].append(value)
+
+    def extend(self, values):
+        i = self._assign.index()
+        with self._locks[i]:
+            self._bufs[i].extend(values)
+
+    def __len__(self):
+        return sum(len(b) for b in self._bufs)
+
+    def drain(self):
+        """Take everything appended so far; stripes are swapped one at a time."""
+        out = array(self.typecode)
+        for i, lock in enumerate(self._locks):
+            with lock:
+                buf, self._bufs[i] = self._bufs[i], array(self.typecode)
+            out.extend(buf)
+        return out
@@ -0,0 +1,327 @@
+"""
+Concurrency-primitives benchmark for hot counters.
+
+thread_safe_increment.py starts one OS thread per append, so it mostly
+measures thread creation. Here a fixed set of long-lived workers each do
+`--ops` increments, and we time only the increment loop (all workers are
+released together by a barrier). Every strategy reports:
+
+- ops/sec        total increments / wall time
+- correct        did the final count equal threads x ops?
+- contention     fraction of lock acquisitions that found the lock taken
+                 (only where the benchmark owns the locks: `locking = True`)
+
+Strategies are small classes registered in STRATEGIES, so adding one is
+just another class with setup/worker/total.
+
+Runs on regular and free-threaded (PEP 703, python3.13t) builds; the GIL
+state is printed in the header so numbers from both can be compared.
+
+    python counter_benchmark.py
+    python counter_benchmark.py --threads 1,2,4,8,16 --ops 200000 --json out.json
+"""
+
+import argparse
+import csv
+import itertools
+import json
+import multiprocessing as mp
+import sys
+import sysconfig
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from concurrent_counters import ShardedCounter
+
+
+def gil_status():
+    if not sysconfig.get_config_var("Py_GIL_DISABLED"):
+        return "GIL build"
+    enabled = getattr(sys, "_is_gil_enabled", lambda: True)()
+    return "free-threaded build, GIL " + ("re-enabled" if enabled else "disabled")
+
+
+def _acquire(lock, contended, tid):
+    # Try first so we can count how often the lock was already held
+    if not lock.acquire(blocking=False):
+        contended[tid] += 1
+        lock.acquire()
+
+
+# --------------------------
+# Strategies
+# --------------------------
+class Unsafe:
+    """`count += 1` with no synchronisation (shows lost updates)."""
+    locking = False
+
+    def setup(self, threads):
+        self.count = 0
+
+    def worker(self, tid, ops):
+        for _ in range(ops):
+            self.count += 1
+
+    def total(self):
+        return self.count
+
+
+class SingleMutex:
+    """One global threading.Lock around every increment."""
+    locking = True
+
+    def setup(self, threads):
+        self.count = 0
+        self.lock = threading.Lock()
+        self.contended = [0] * threads
+
+    def worker(self, tid, ops):
+        lock, contended = self.lock, self.contended
+        for _ in range(ops):
+            _acquire(lock, contended, tid)
+            self.count += 1
+            lock.release()
+
+    def total(self):
+        return self.count
+
+
+class StripedLocks:
+    """N independent (lock, counter) stripes; thread i uses stripe i % N."""
+    locking = True
+    STRIPES = 16
+
+    def setup(self, threads):
+        self.locks = [threading.Lock() for _ in range(self.STRIPES)]
+        self.counts = [0] * self.STRIPES
+        self.contended = [0] * threads
+
+    def worker(self, tid, ops):
+        stripe = tid % self.STRIPES
+        lock, counts, contended = self.locks[stripe], self.counts, self.contended
+        for _ in range(ops):
+            _acquire(lock, contended, tid)
+            counts[stripe] += 1
+            lock.release()
+
+    def total(self):
+        return sum(self.counts)
+
+
+class Sharded:
+    """concurrent_counters.ShardedCounter (per-thread stripe, per-stripe lock)."""
+    locking = False  # its locks are internal to add(): contention isn't measured
+
+    def setup(self, threads):
+        self.counter = ShardedCounter()
+
+    def worker(self, tid, ops):
+        add = self.counter.add
+        for _ in range(ops):
+            add()
+
+    def total(self):
+        return self.counter.value()
+
+
+class ThreadLocalMerge:
+    """Each thread counts in a local variable; merged once at the end."""
+    locking = False
+
+    def setup(self, threads):
+        self.partials = [0] * threads
+
+    def worker(self, tid, ops):
+        local = 0
+        for _ in range(ops):
+            local += 1
+        self.partials[tid] = local
+
+    def total(self):
+        return sum(self.partials)
+
+
+class AtomicCount:
+    """
+    next() on a shared itertools.count: a single C call, so it does not
+    lose updates under the GIL. The final value is read back via repr.
+    """
+    locking = False
+
+    def setup(self, threads):
+        self.counter = itertools.count()
+
+    def worker(self, tid, ops):
+        nxt = self.counter.__next__
+        for _ in range(ops):
+            nxt()
+
+    def total(self):
+        return int(repr(self.counter)[6:-1])  # "count(N)"
+
+
+class ExecutorBatching:
+    """
+    Work split into batches on a ThreadPoolExecutor; each batch counts
+    locally and publishes its subtotal under one lock acquisition.
+    """
+    locking = True
+    BATCH = 10_000
+
+    def setup(self, threads):
+        self.count = 0
+        self.threads = threads
+        self.lock = threading.Lock()
+        self.contended = None
+        self.acquisitions = 0
+        self.executor = ThreadPoolExecutor(max_workers=threads)
+
+    def _batch(self, n):
+        """Runs on whichever executor thread is free; returns 1 if the lock was taken."""
+        local = 0
+        for _ in range(n):
+            local += 1
+        contended = [0]  # this call's own tally: batches share no counter slot
+        _acquire(self.lock, contended, 0)
+        self.count += local
+        self.lock.release()
+        return contended[0]
+
+    def worker(self, tid, ops):
+        # Worker 0 drives the executor with every thread's share of the work
+        if tid != 0:
+            return
+        futures = []
+        for _ in range(self.threads):
+            for start in range(0, ops, self.BATCH):
+                futures.append(self.executor.submit(self._batch, min(self.BATCH, ops - start)))
+        # Merge the per-batch tallies once everything is done
+        self.contended = [sum(f.result() for f in futures)]
+        self.acquisitions = len(futures)
+        self.executor.shutdown()
+
+    def total(self):
+        return self.count
+
+
+def _mp_worker(value, ops, batch):
+    if batch:
+        with value.get_lock():
+            value.value += ops
+        return
+    for _ in range(ops):
+        with value.get_lock():
+            value.value += 1
+
+
+class SharedMemoryCounter:
+    """
+    multiprocessing.Value('q') in shared memory, one process per "thread".
+    Per-op locking by default; --mp-batch publishes one subtotal per process.
+    Process start-up is part of the timing, so use a large --ops.
+    """
+    locking = True
+    batch = False
+
+    def setup(self, threads):
+        self.value = mp.Value("q", 0, lock=True)
+        self.threads = threads
+        self.contended = None  # mp locks don't expose a try-acquire count cheaply
+
+    def worker(self, tid, ops):
+        if tid != 0:
+            return
+        procs = [mp.Process(target=_mp_worker, args=(self.value, ops, self.batch))
+                 for _ in range(self.threads)]
+        for p in procs:
+            p.start()
+        for p in procs:
+            p.join()
+
+    def total(self):
+        return self.value.value
+
+
+STRATEGIES = {
+    "unsafe": Unsafe,
+    "mutex": SingleMutex,
+    "striped": StripedLocks,
+    "sharded": Sharded,
+    "thread_local": ThreadLocalMerge,
+    "atomic_count": AtomicCount,
+    "executor_batch": ExecutorBatching,
+    "shared_memory": SharedMemoryCounter,
+}
+
+
+# --------------------------
+# Runner
+# --------------------------
+def run(strategy_cls, threads, ops):
+    strategy = strategy_cls()
+    strategy.setup(threads)
+    barrier = threading.Barrier(threads + 1)
+
+    def body(tid):
+        barrier.wait()
+        strategy.worker(tid, ops)
+
+    workers = [threading.Thread(target=body, args=(tid,)) for tid in range(threads)]
+    for t in workers:
+        t.start()
+    barrier.wait()
+    start = time.perf_counter()
+    for t in workers:
+        t.join()
+    elapsed = time.perf_counter() - start
+
+    expected = threads * ops
+    contended = getattr(strategy, "contended", None)
+    # One acquisition per increment unless the strategy batches them
+    acquisitions = getattr(strategy, "acquisitions", None) or expected
+    return {
+        "threads": threads,
+        "ops": expected,
+        "elapsed_s": round(elapsed, 4),
+        "ops_per_sec": round(expected / elapsed),
+        "correct": strategy.total() == expected,
+        "lost_updates": expected - strategy.total(),
+        "contention": round(sum(contended) / acquisitions, 4) if contended is not None else None,
+    }
+
+
+def main(argv=None):
+    p = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    p.add_argument("--strategies", default=",".join(STRATEGIES))
+    p.add_argument("--threads", default="1,2,4,8", type=lambda s: [int(x) for x in s.split(",")])
+    p.add_argument("--ops", type=int, default=100_000, help="increments per thread")
+    p.add_argument("--mp-batch", action="store_true",
+                   help="shared_memory: one locked add per process instead of per increment")
+    p.add_argument("--csv")
+    p.add_argument("--json")
+    args = p.parse_args(argv)
+
+    SharedMemoryCounter.batch = args.mp_batch
+    print(f"Python {sys.version.split()[0]} ({gil_status()})")
+    results = []
+    for name in args.strategies.split(","):
+        for threads in args.threads:
+            row = {"strategy": name, **run(STRATEGIES[name], threads, args.ops)}
+            results.append(row)
+            print(f"{name:>15} threads={threads:<3} {row['ops_per_sec']:>12,} ops/s  "
+                  f"correct={row['correct']!s:<5} contention={row['contention']}")
+
+    if args.csv:
+        with open(args.csv, "w", newline="") as f:
+            writer = csv.DictWriter(f, fieldnames=list(results[0]))
+            writer.writeheader()
+            writer.writerows(results)
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump({"python": sys.version, "gil": gil_status(), "results": results}, f, indent=2)
+    return results
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
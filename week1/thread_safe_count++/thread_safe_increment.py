@@ -3,6 +3,8 @@
 import threading
 import time
 
+from concurrent_counters import ConcurrentAppendBuffer
+
 NUM_VALUES = 50_000  # keep this reasonable to avoid killing your Mac
 
 # --------------------
@@ -57,6 +59,32 @@ def non_thread_safe_demo():
     print(f"Time: {end - start:.2f}s")
 
 
+# --------------------
+# Striped buffer version (no global lock)
+# --------------------
+def striped_buffer_demo():
+    print("\n=== STRIPED BUFFER VERSION ===")
+    q = ConcurrentAppendBuffer("q")
+
+    def insert_task(i):
+        q.append(i)  # per-stripe lock, writers on other stripes don't wait
+
+    start = time.time()
+    threads = []
+    for i in range(NUM_VALUES):
+        t = threading.Thread(target=insert_task, args=(i,))
+        t.start()
+        threads.append(t)
+
+    for t in threads:
+        t.join()
+    end = time.time()
+
+    print(f"Expected size: {NUM_VALUES}, Actual size: {len(q.drain())}")
+    print(f"Time: {end - start:.2f}s")
+
+
 if __name__ == "__main__":
     thread_safe_demo()
     non_thread_safe_demo()
+    striped_buffer_demo()
@@ -0,0 +1,216 @@
+"""
+Local pub/sub bus between chat worker processes (Unix domain socket).
+
+    parent:  hub = BusHub(path); await hub.start()
+    worker:  bus = BusClient(path, worker_id, on_message); await bus.connect()
+             bus.publish({"op": "msg", "room": "lobby", "msg": "...", "key": None})
+
+The hub (in the supervising process) relays every envelope a worker
+publishes to the *other* workers. It also tracks room presence, i.e. how many
+members each worker has in each room, which buys two things:
+
+- "msg" / "kick" envelopes only go to workers that have members in that
+  room, so cross-process fan-out stays O(workers in the room).
+- Workers get a presence snapshot on connect and "join" / "leave" /
+  "worker_down" updates afterwards, so each can answer "who is in this room"
+  for the whole server, not only its own sockets.
+
+Frames are a 4-byte big-endian length followed by a JSON envelope. One
+stream per worker keeps each worker's messages in order.
+
+Backpressure: the hub relays one worker's envelopes to each target in turn
+and waits for each target to drain. A worker that stops reading therefore
+stalls relaying from whoever publishes to it, and that publisher's socket
+fills up. publish() never blocks. It queues up to `max_queue` envelopes
+for a writer task that drains the socket. Past that, "msg" envelopes are
+dropped and counted. Presence and kick envelopes are always kept, because
+losing them would corrupt the room counts.
+"""
+
+import asyncio
+import json
+import logging
+import struct
+from collections import defaultdict, deque
+
+_HEADER = struct.Struct(">I")
+
+
+def encode_frame(envelope: dict) -> bytes:
+    body = json.dumps(envelope, separators=(",", ":")).encode()
+    return _HEADER.pack(len(body)) + body
+
+
+async def read_frame(reader: asyncio.StreamReader) -> dict:
+    (n,) = _HEADER.unpack(await reader.readexactly(_HEADER.size))
+    return json.loads(await reader.readexactly(n))
+
+
+class BusHub:
+    def __init__(self, path: str):
+        self.path = path
+        self.writers = {}                                   # worker id -> StreamWriter
+        self.presence = defaultdict(lambda: defaultdict(int))  # room -> worker -> members
+        self.relayed = 0
+        self._server = None
+
+    async def start(self):
+        self._server = await asyncio.start_unix_server(self._serve, path=self.path)
+        return self
+
+    async def close(self):
+        if self._server:
+            self._server.close()
+            await self._server.wait_closed()
+
+    async def _serve(self, reader, writer):
+        worker = None
+        try:
+            hello = await read_frame(reader)
+            worker = str(hello["worker"])
+            self.writers[worker] = writer
+            snapshot = {room: dict(counts) for room, counts in self.presence.items()}
+            writer.write(encode_frame({"op": "snapshot", "presence": snapshot}))
+            logging.info("bus: worker %s connected (%d on bus)", worker, len(self.writers))
+            while True:
+                envelope = await read_frame(reader)
+                envelope["worker"] = worker
+                await self._route(worker, envelope)
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            if worker is not None and self.writers.get(worker) is writer:
+                del self.writers[worker]
+                self._forget(worker)
+                await self._send(self.writers, {"op": "worker_down", "worker": worker})
+                logging.info("bus: worker %s gone (%d on bus)", worker, len(self.writers))
+            writer.close()
+
+    async def _route(self, source: str, envelope: dict):
+        op, room = envelope["op"], envelope.get("room")
+        if op in ("join", "leave"):
+            counts = self.presence[room]
+            counts[source] += 1 if op == "join" else -1
+            if counts[source] <= 0:
+                del counts[source]
+                if not counts:
+                    del self.presence[room]
+            targets = [w for w in self.writers if w != source]
+        else:
+            # Only workers that have someone in the room need the message
+            counts = self.presence.get(room, {})
+            targets = [w for w in counts if w != source and w in self.writers]
+        await self._send(targets, envelope)
+
+    async def _send(self, targets, envelope: dict):
+        if not targets:
+            return
+        frame = encode_frame(envelope)
+        writers = [self.writers[w] for w in targets if w in self.writers]
+        for writer in writers:
+            writer.write(frame)
+        self.relayed += len(writers)
+        # Stops reading from `source` until every target has taken the frame
+        # (see the module docstring for where the pressure ends up)
+        for writer in writers:
+            try:
+                await writer.drain()
+            except ConnectionError:
+                pass
+
+    def _forget(self, worker: str):
+        for room in list(self.presence):
+            counts = self.presence[room]
+            counts.pop(worker, None)
+            if not counts:
+                del self.presence[room]
+
+
+class BusClient:
+    def __init__(self, path: str, worker: str, on_message, max_queue: int = 10000):
+        self.path = path
+        self.worker = str(worker)
+        self.on_message = on_message  # called with each envelope from other workers
+        self.remote = defaultdict(dict)  # room -> {worker: members} on OTHER workers
+        self.max_queue = max_queue
+        self.dropped = 0  # "msg" envelopes shed because the hub wasn't keeping up
+        self._outbox = deque()  # encoded frames waiting for the writer task
+        self._wakeup = asyncio.Event()
+        self._writer = None
+        self._task = None
+        self._write_task = None
+
+    async def wait_closed(self):
+        """Returns once the hub connection is gone (e.g. the supervisor died)."""
+        await asyncio.shield(self._task)
+
+    async def connect(self):
+        reader, self._writer = await asyncio.open_unix_connection(self.path)
+        self._writer.write(encode_frame({"op": "hello", "worker": self.worker}))
+        self._task = asyncio.create_task(self._read(reader), name="bus-reader")
+        self._write_task = asyncio.create_task(self._write(), name="bus-writer")
+        return self
+
+    def publish(self, envelope: dict):
+        """Fire-and-forget; queued in order, "msg" envelopes dropped past max_queue."""
+        if len(self._outbox) >= self.max_queue and envelope["op"] == "msg":
+            self.dropped += 1
+            return
+        self._outbox.append(encode_frame(envelope))
+        self._wakeup.set()
+
+    def remote_members(self, room: str) -> int:
+        return sum(self.remote.get(room, {}).values())
+
+    async def close(self):
+        if self._task:
+            self._task.cancel()
+        if self._write_task:
+            self._write_task.cancel()
+        if self._writer:
+            self._writer.close()
+
+    async def _write(self):
+        try:
+            while True:
+                while not self._outbox:
+                    self._wakeup.clear()
+                    await self._wakeup.wait()
+                frames = list(self._outbox)
+                self._outbox.clear()
+                self._writer.writelines(frames)
+                await self._writer.drain()  # waits while the hub is behind
+        except ConnectionError:
+            pass  # _read notices the lost hub and ends wait_closed()
+
+    async def _read(self, reader):
+        try:
+            while True:
+                envelope = await read_frame(reader)
+                op = envelope["op"]
+                if op == "snapshot":
+                    self.remote.clear()
+                    for room, counts in envelope["presence"].items():
+                        self.remote[room] = {w: n for w, n in counts.items() if w != self.worker}
+                elif op in ("join", "leave"):
+                    self._count(envelope["room"], envelope["worker"], 1 if op == "join" else -1)
+                elif op == "worker_down":
+                    for room in list(self.remote):
+                        self.remote[room].pop(envelope["worker"], None)
+                        if not self.remote[room]:
+                            del self.remote[room]
+                try:
+                    self.on_message(envelope)
+                except Exception:
+                    # One bad envelope must not take this worker off the bus
+                    logging.exception("bus: handler failed for %s envelope", op)
+        except (asyncio.IncompleteReadError, ConnectionError):
+            logging.error("bus: lost connection to the hub")
+
+    def _count(self, room: str, worker: str, delta: int):
+        counts = self.remote[room]
+        counts[worker] = counts.get(worker, 0) + delta
+        if counts[worker] <= 0:
+            del counts[worker]
+        if not counts:
+            del self.remote[room]
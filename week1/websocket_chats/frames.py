@@ -0,0 +1,146 @@
+"""
+Encode-once fan-out for the chat server.
+
+A broadcast to N clients used to pay, per recipient: str -> UTF-8, websocket
+framing and (with permessage-deflate) a separate compression pass. Here a
+message is a `Message`: JSON bytes encoded once, plus the finished wire frame
+built once per wire variant and reused for every recipient.
+
+Wire variants (see `wire_variant`):
+
+- 0        no extension negotiated: plain text frame.
+- 9..15    permessage-deflate *without* server context takeover, i.e. every
+           message is compressed on its own, so one compressed frame is valid
+           for every client that negotiated the same window bits.
+- None     deflate with context takeover (websockets' default): each client
+           has its own compressor; we fall back to ws.send(bytes, text=True).
+
+Compression modes for `server.py` (CHAT_COMPRESSION):
+"per_client" (websockets default), "shared" (no context takeover, one
+compression per message) and "off".
+
+JSON codec (CHAT_JSON): "orjson" if installed ("auto"), or stdlib "json".
+"""
+
+import json
+import struct
+import zlib
+
+try:
+    import orjson
+except ImportError:  # optional fast codec
+    orjson = None
+
+from websockets.extensions.permessage_deflate import (
+    PerMessageDeflate,
+    ServerPerMessageDeflateFactory,
+)
+from websockets.protocol import State
+
+COMPRESSION_MODES = ("per_client", "shared", "off")
+_DEFLATE_TAIL = b"\x00\x00\xff\xff"
+
+
+# -----------------------------------------------------------------------------
+# JSON codec
+# -----------------------------------------------------------------------------
+def get_codec(name: str = "auto"):
+    """(dumps -> bytes, loads accepting bytes/str) for "auto", "orjson" or "json"."""
+    if name == "auto":
+        name = "orjson" if orjson is not None else "json"
+    if name == "orjson":
+        if orjson is None:
+            raise RuntimeError("orjson is not installed (pip install orjson)")
+        return orjson.dumps, orjson.loads
+    if name == "json":
+        return (lambda obj: json.dumps(obj, separators=(",", ":")).encode()), json.loads
+    raise ValueError(f"unknown JSON codec {name!r}")
+
+
+# -----------------------------------------------------------------------------
+# Pre-framed messages
+# -----------------------------------------------------------------------------
+def build_frame(data: bytes, wbits: int = 0) -> bytes:
+    """Server-to-client (unmasked) final text frame; deflated when wbits > 0."""
+    first = 0x81  # FIN + text
+    if wbits:
+        compressor = zlib.compressobj(wbits=-wbits)
+        data = compressor.compress(data) + compressor.flush(zlib.Z_SYNC_FLUSH)
+        if data.endswith(_DEFLATE_TAIL):
+            data = data[:-4]
+        first |= 0x40  # RSV1: compressed message
+    n = len(data)
+    if n < 126:
+        header = struct.pack("!BB", first, n)
+    elif n < 1 << 16:
+        header = struct.pack("!BBH", first, 126, n)
+    else:
+        header = struct.pack("!BBQ", first, 127, n)
+    return header + data
+
+
+class Message:
+    """One outgoing message: encoded once, framed at most once per wire variant."""
+
+    __slots__ = ("data", "_frames")
+
+    def __init__(self, data: bytes):
+        self.data = data
+        self._frames = {}
+
+    def frame(self, variant: int) -> bytes:
+        frame = self._frames.get(variant)
+        if frame is None:
+            frame = self._frames[variant] = build_frame(self.data, variant)
+        return frame
+
+
+def batch(items: list[bytes]) -> bytes:
+    """Several encoded messages in one JSON document (no re-encoding)."""
+    return b'{"type":"batch","items":[' + b",".join(items) + b"]}"
+
+
+# -----------------------------------------------------------------------------
+# Per-connection fast path
+# -----------------------------------------------------------------------------
+def wire_variant(ws):
+    """0 / window bits if `ws` can take shared pre-built frames, else None."""
+    protocol = getattr(ws, "protocol", None)
+    if protocol is None or not hasattr(ws, "transport") or not hasattr(ws, "drain"):
+        return None
+    extensions = protocol.extensions
+    if not extensions:
+        return 0
+    if (len(extensions) == 1 and isinstance(extensions[0], PerMessageDeflate)
+            and extensions[0].local_no_context_takeover):
+        return extensions[0].local_max_window_bits
+    return None
+
+
+async def send_prebuilt(ws, frame: bytes) -> None:
+    """
+    Write a finished frame straight to the transport. The server only ever
+    sends whole messages, so a complete frame can't interleave with another
+    message; pings and close frames are written whole as well.
+    """
+    if ws.protocol.state is not State.OPEN:
+        raise ConnectionError("websocket is not open")
+    ws.transport.write(frame)
+    await ws.drain()  # websockets' own flow control: waits only when paused
+
+
+def serve_options(mode: str) -> dict:
+    """websockets.serve() kwargs for a CHAT_COMPRESSION mode."""
+    if mode not in COMPRESSION_MODES:
+        raise ValueError(f"unknown compression mode {mode!r} (expected one of {COMPRESSION_MODES})")
+    if mode == "off":
+        return {"compression": None}
+    if mode == "shared":
+        return {
+            "compression": None,
+            "extensions": [ServerPerMessageDeflateFactory(
+                server_no_context_takeover=True,
+                compress_settings={"memLevel": 5},
+            )],
+        }
+    return {}  # per_client: websockets' default deflate
@@ -0,0 +1,424 @@
+"""
+Headless load generator for the chat server.
+
+Opens N simulated clients (spread over several processes, 10k+ is fine),
+joins them to rooms of --room-size, waits until every client is connected,
+then has --senders of them send --rate messages/s each for --duration
+seconds. Every message embeds its send
+timestamp, so each delivery yields one end-to-end fan-out latency sample.
+
+    python load_test.py --clients 10000 --room-size 20 --rate 0.5 --duration 30
+    python load_test.py --url ws://127.0.0.1:8765 --server-pid 1234   # running server
+    python load_test.py --json run.json                      # save results
+    python load_test.py --compare run.json --tolerance 0.2   # exit 1 on regression
+
+Without --url it starts `server.py` itself (settings via the usual CHAT_*
+environment variables, worker count via --workers) on a spare port.
+
+Reports:
+- connection setup: connects/s, connect latency p50/p99, failures
+- messages sent/s and deliveries/s (one message reaching one client), plus
+  the delivered fraction (<100%: send queues overflowed or clients dropped)
+- fan-out latency p50/p90/p99/p99.9/max (log-bucket histogram, mergeable
+  across load processes, constant memory)
+- server RSS (peak and at the end, summed over worker processes), read
+  from /proc, so Linux only
+
+Load processes share the machine with the server. Keep an eye on their CPU
+(or run them elsewhere with --url); a saturated load generator reports its
+own latency.
+"""
+
+import argparse
+import asyncio
+import json
+import math
+import multiprocessing
+import os
+import random
+import resource
+import socket
+import subprocess
+import sys
+import threading
+import time
+
+import websockets
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+
+# -----------------------------------------------------------------------------
+# Latency histogram (mergeable across processes)
+# -----------------------------------------------------------------------------
+class Histogram:
+    """Geometric buckets, ~2.5% wide, from 10us; counts only."""
+    BASE = 10e-6
+    GROWTH = 1.05
+
+    def __init__(self, counts=None):
+        self.counts = counts or {}
+
+    def add(self, seconds: float):
+        i = 0 if seconds <= self.BASE else int(math.log(seconds / self.BASE, self.GROWTH)) + 1
+        self.counts[i] = self.counts.get(i, 0) + 1
+
+    def merge(self, other: "Histogram"):
+        for i, n in other.counts.items():
+            self.counts[i] = self.counts.get(i, 0) + n
+
+    @property
+    def n(self) -> int:
+        return sum(self.counts.values())
+
+    def quantile(self, q: float) -> float:
+        """Upper edge of the bucket holding the q-th sample, in seconds."""
+        total = self.n
+        if not total:
+            return 0.0
+        target, seen = q * total, 0
+        for i in sorted(self.counts):
+            seen += self.counts[i]
+            if seen >= target:
+                return self.BASE * self.GROWTH ** i
+        return self.BASE * self.GROWTH ** max(self.counts)
+
+
+# -----------------------------------------------------------------------------
+# One load process
+# -----------------------------------------------------------------------------
+_ready = None  # shared counter of load processes whose clients are all connected
+
+
+def _init_load_proc(ready):
+    global _ready
+    _ready = ready
+    raise_fd_limit()
+
+
+async def _run_clients(url, clients, cfg):
+    """`clients` is [(index, is_sender)]; all share this process's event loop."""
+    stats = {"sent": 0, "received": 0, "connected": 0, "failed": 0, "dropped": 0,
+             "first_connect": None, "last_connect": None}
+    fanout, connect = Histogram(), Histogram()
+    gate = asyncio.Semaphore(cfg["connect_concurrency"])
+    pad = "x" * max(0, cfg["msg_size"] - 24)
+    pending = len(clients)
+    all_connected, go = asyncio.Event(), asyncio.Event()
+    if pending == 0:
+        all_connected.set()  # more load processes than clients: nothing to wait for
+    window = {}
+
+    def connect_done():
+        nonlocal pending
+        pending -= 1
+        if pending == 0:
+            all_connected.set()
+
+    async def barrier():
+        # Nobody sends until every client in every load process has joined
+        await all_connected.wait()
+        with _ready.get_lock():
+            _ready.value += 1
+        while _ready.value < cfg["procs"]:
+            await asyncio.sleep(0.05)
+        window["start"] = time.time() + 0.5
+        window["end"] = window["start"] + cfg["duration"]
+        go.set()
+
+    def on_frame(raw):
+        now = time.time()
+        d = json.loads(raw)
+        for item in d["items"] if d.get("type") == "batch" else (d,):
+            if item.get("type") == "msg" and item.get("text", "").startswith("t="):
+                stats["received"] += 1
+                fanout.add(now - float(item["text"][2:].split("|", 1)[0]))
+
+    async def join(i):
+        """Connect and join the room; (ws, reader task), or (None, None) on failure."""
+        try:
+            async with gate:
+                t0 = time.time()
+                ws = await websockets.connect(url, max_size=2**20, open_timeout=30,
+                                              compression=cfg["compression"])
+                t1 = time.time()
+        except Exception:
+            stats["failed"] += 1
+            return None, None
+        connect.add(t1 - t0)
+        stats["connected"] += 1
+        stats["first_connect"] = min(stats["first_connect"] or t0, t0)
+        stats["last_connect"] = max(stats["last_connect"] or t1, t1)
+        try:
+            await ws.send(json.dumps({"type": "join", "name": f"load{i}", "room": f"room{i // cfg['room_size']}"}))
+        except websockets.ConnectionClosed:
+            stats["dropped"] += 1
+            return None, None
+
+        async def reader():
+            async for raw in ws:
+                on_frame(raw)
+
+        return ws, asyncio.create_task(reader())
+
+    async def client(i, sender):
+        try:
+            ws, read_task = await join(i)
+        finally:
+            connect_done()  # exactly once per client, whatever happened
+        if ws is None:
+            return
+        try:
+            await go.wait()
+            end_at = window["end"]
+            await asyncio.sleep(max(0.0, window["start"] - time.time()))
+            if sender and cfg["rate"] > 0:
+                interval = 1.0 / cfg["rate"]
+                next_at = time.time() + random.random() * interval  # spread senders out
+                while next_at < end_at:
+                    await asyncio.sleep(max(0.0, next_at - time.time()))
+                    await ws.send(json.dumps({"type": "msg", "text": f"t={time.time():.6f}|{pad}"}))
+                    stats["sent"] += 1
+                    next_at += interval
+            await asyncio.sleep(max(0.0, end_at - time.time()) + cfg["drain"])
+            read_task.cancel()
+            await ws.close()
+        except websockets.ConnectionClosed:
+            stats["dropped"] += 1
+
+    coordinator = asyncio.create_task(barrier())
+    await asyncio.gather(*(client(i, s) for i, s in clients))
+    # Not cancelled: a process whose clients all failed (or that has none)
+    # must still count itself ready, or the others wait forever
+    await coordinator
+    return stats, fanout.counts, connect.counts
+
+
+def _load_proc(job):
+    url, clients, cfg = job
+    return asyncio.run(_run_clients(url, clients, cfg))
+
+
+def raise_fd_limit():
+    soft, hard = resource.getrlimit(resource.RLIMIT_NOFILE)
+    if soft < hard:
+        resource.setrlimit(resource.RLIMIT_NOFILE, (hard, hard))
+    return hard
+
+
+# -----------------------------------------------------------------------------
+# Server process helpers
+# -----------------------------------------------------------------------------
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def start_server(workers: int = 1):
+    """server.py on a spare port; returns (Popen, url) once it accepts connections."""
+    port = free_port()
+    proc = subprocess.Popen(
+        [sys.executable, "server.py", "--workers", str(workers), "--port", str(port), "--http-port", "0"],
+        cwd=HERE, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    deadline = time.time() + 20
+    while True:
+        try:
+            socket.create_connection(("127.0.0.1", port), timeout=0.5).close()
+            break
+        except OSError:
+            if time.time() > deadline or proc.poll() is not None:
+                proc.kill()
+                raise RuntimeError("server did not start")
+            time.sleep(0.1)
+    if workers > 1:
+        time.sleep(1.0)  # every worker bound, not just the first
+    return proc, f"ws://127.0.0.1:{port}"
+
+
+def stop_server(proc):
+    proc.terminate()
+    try:
+        proc.wait(10)
+    except subprocess.TimeoutExpired:
+        proc.kill()
+
+
+def rss_bytes(pid: int) -> int:
+    """Resident memory of `pid` plus its children (the worker processes)."""
+    pids, total = {pid}, 0
+    for entry in os.listdir("/proc"):
+        if entry.isdigit():
+            try:
+                with open(f"/proc/{entry}/stat") as f:
+                    if int(f.read().rsplit(")", 1)[1].split()[1]) == pid:
+                        pids.add(int(entry))
+            except (OSError, IndexError, ValueError):
+                pass
+    for p in pids:
+        try:
+            with open(f"/proc/{p}/status") as f:
+                for line in f:
+                    if line.startswith("VmRSS:"):
+                        total += int(line.split()[1]) * 1024
+        except OSError:
+            pass
+    return total
+
+
+class RssSampler(threading.Thread):
+    def __init__(self, pid, interval=0.5):
+        super().__init__(daemon=True)
+        self.pid, self.interval = pid, interval
+        self.peak = self.last = 0
+        self._done = threading.Event()
+
+    def run(self):
+        while not self._done.is_set():
+            self.last = rss_bytes(self.pid)
+            self.peak = max(self.peak, self.last)
+            self._done.wait(self.interval)
+
+    def stop(self):
+        self._done.set()
+        self.join()
+        return {"rss_peak_mb": round(self.peak / 2**20, 1), "rss_end_mb": round(self.last / 2**20, 1)}
+
+
+# -----------------------------------------------------------------------------
+# Driver
+# -----------------------------------------------------------------------------
+def run_load(url, clients=1000, room_size=10, senders=1.0, rate=1.0, duration=10.0, msg_size=64,
+             procs=None, connect_concurrency=200, drain=1.0, compression="deflate",
+             server_pid=None) -> dict:
+    procs = procs or max(1, (os.cpu_count() or 2) // 2)
+    cfg = {"room_size": room_size, "rate": rate, "duration": duration, "msg_size": msg_size,
+           "connect_concurrency": max(1, connect_concurrency // procs), "drain": drain, "procs": procs,
+           "compression": None if compression == "off" else compression}
+    n_senders = min(clients, round(clients * senders))
+    # exact sender count, spread evenly over the rooms
+    sender_ids = {k * clients // n_senders for k in range(n_senders)} if n_senders else set()
+    everyone = [(i, i in sender_ids) for i in range(clients)]
+    shards = [everyone[p::procs] for p in range(procs)]
+
+    sampler = RssSampler(server_pid) if server_pid else None
+    if sampler:
+        sampler.start()
+    ctx = multiprocessing.get_context("spawn")
+    ready = ctx.Value("i", 0)
+    with ctx.Pool(procs, initializer=_init_load_proc, initargs=(ready,)) as pool:
+        results = pool.map(_load_proc, [(url, shard, cfg) for shard in shards])
+
+    totals = {k: sum(r[0][k] for r in results) for k in ("sent", "received", "connected", "failed", "dropped")}
+    fanout, connect = Histogram(), Histogram()
+    for _, f, c in results:
+        fanout.merge(Histogram(f))
+        connect.merge(Histogram(c))
+    firsts = [r[0]["first_connect"] for r in results if r[0]["first_connect"]]
+    lasts = [r[0]["last_connect"] for r in results if r[0]["last_connect"]]
+    setup = (max(lasts) - min(firsts)) if firsts else 0.0
+
+    # Each message should reach its whole room, sender included
+    expected = sum(min(room_size, clients - (i // room_size) * room_size) for i in sender_ids)
+    expected *= totals["sent"] / max(len(sender_ids), 1)
+    ms = lambda s: round(s * 1000, 2)
+    report = {
+        "clients": clients, "room_size": room_size, "senders": len(sender_ids), "rate": rate,
+        "duration": duration, "load_procs": procs,
+        "connected": totals["connected"], "connect_failed": totals["failed"],
+        "dropped": totals["dropped"],
+        "connects_per_s": round(totals["connected"] / setup, 1) if setup else None,
+        "connect_p50_ms": ms(connect.quantile(0.5)), "connect_p99_ms": ms(connect.quantile(0.99)),
+        "sent_per_s": round(totals["sent"] / duration, 1),
+        "deliveries_per_s": round(totals["received"] / duration, 1),
+        "delivered": round(totals["received"] / expected, 4) if expected else 0.0,
+        "p50_ms": ms(fanout.quantile(0.5)), "p90_ms": ms(fanout.quantile(0.9)),
+        "p99_ms": ms(fanout.quantile(0.99)), "p999_ms": ms(fanout.quantile(0.999)),
+        "max_ms": ms(fanout.quantile(1.0)),
+    }
+    if sampler:
+        report.update(sampler.stop())
+    return report
+
+
+def print_report(r: dict):
+    print(f"clients {r['clients']} (connected {r['connected']}, failed {r['connect_failed']}, "
+          f"dropped {r['dropped']}), rooms of {r['room_size']}, {r['senders']} senders x {r['rate']}/s, "
+          f"{r['load_procs']} load processes")
+    print(f"  connect:  {r['connects_per_s']} conn/s, p50 {r['connect_p50_ms']} ms, p99 {r['connect_p99_ms']} ms")
+    print(f"  messages: {r['sent_per_s']} sent/s, {r['deliveries_per_s']} deliveries/s, "
+          f"{r['delivered']:.1%} delivered")
+    print(f"  fan-out:  p50 {r['p50_ms']} / p90 {r['p90_ms']} / p99 {r['p99_ms']} / "
+          f"p99.9 {r['p999_ms']} / max {r['max_ms']} ms")
+    if "rss_peak_mb" in r:
+        print(f"  server:   RSS peak {r['rss_peak_mb']} MB, end {r['rss_end_mb']} MB")
+
+
+SHAPE = ("clients", "room_size", "senders", "rate", "duration", "load_procs")
+
+
+def compare(current: dict, baseline: dict, tolerance: float) -> list[str]:
+    """Regressions beyond `tolerance` (0.2 = 20%) against a saved run."""
+    problems = []
+    different = [k for k in SHAPE if current.get(k) != baseline.get(k)]
+    if different:
+        print("warning: baseline used a different load shape (" + ", ".join(
+            f"{k} {baseline.get(k)} -> {current.get(k)}" for k in different) + ")")
+    for key in ("p50_ms", "p99_ms", "rss_peak_mb"):
+        if baseline.get(key) and current.get(key) is not None and current[key] > baseline[key] * (1 + tolerance):
+            problems.append(f"{key}: {current[key]} vs {baseline[key]}")
+    for key in ("deliveries_per_s", "delivered", "connects_per_s"):
+        if baseline.get(key) and current.get(key) is not None and current[key] < baseline[key] * (1 - tolerance):
+            problems.append(f"{key}: {current[key]} vs {baseline[key]}")
+    return problems
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url", help="existing server (default: start server.py)")
+    parser.add_argument("--server-pid", type=int, help="pid to sample RSS from when using --url")
+    parser.add_argument("--workers", type=int, default=1, help="server.py --workers when we start it")
+    parser.add_argument("--clients", type=int, default=1000)
+    parser.add_argument("--room-size", type=int, default=10)
+    parser.add_argument("--senders", type=float, default=1.0, help="fraction of clients that send")
+    parser.add_argument("--rate", type=float, default=1.0, help="messages/s per sender")
+    parser.add_argument("--duration", type=float, default=10.0)
+    parser.add_argument("--msg-size", type=int, default=64, help="approximate text bytes per message")
+    parser.add_argument("--procs", type=int, help="load processes (default: half the cores)")
+    parser.add_argument("--connect-concurrency", type=int, default=200, help="handshakes in flight")
+    parser.add_argument("--compression", choices=("deflate", "off"), default="deflate",
+                        help="what the simulated clients offer")
+    parser.add_argument("--json", help="write the report here")
+    parser.add_argument("--compare", help="baseline report to check against")
+    parser.add_argument("--tolerance", type=float, default=0.2)
+    args = parser.parse_args()
+
+    raise_fd_limit()  # also inherited by the server we start
+    server, url, pid = None, args.url, args.server_pid
+    if url is None:
+        server, url = start_server(args.workers)
+        pid = server.pid
+    try:
+        report = run_load(url, args.clients, args.room_size, args.senders, args.rate, args.duration,
+                          args.msg_size, args.procs, args.connect_concurrency,
+                          compression=args.compression, server_pid=pid)
+    finally:
+        if server:
+            stop_server(server)
+
+    print_report(report)
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(report, f, indent=2)
+    if args.compare:
+        with open(args.compare) as f:
+            problems = compare(report, json.load(f), args.tolerance)
+        if problems:
+            print("REGRESSION: " + "; ".join(problems))
+            sys.exit(1)
+        print(f"within {args.tolerance:.0%} of {args.compare}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,143 @@
+"""
+Per-connection outbound queue for the chat server.
+
+Each client gets an Outbox: a bounded deque plus one writer task that drains
+it into the websocket. `put()` never awaits, so a broadcast is just N
+appends, and a slow reader only backs up its own queue.
+
+When a queue is full, the overflow policy decides:
+
+- "drop_oldest": discard the oldest queued message (silent gap).
+- "coalesce":    discard the oldest too, but the client later gets ONE
+                 "N messages skipped" notice instead of a silent gap, and a
+                 queued message with the same `key` (e.g. a presence update)
+                 is replaced by the newest instead of queueing both.
+- "disconnect":  close the connection (code 4008); the client can reconnect.
+
+`stats()` reports per-client lag: queue depth / high-water mark, age of the
+oldest queued message, and enqueue-to-sent latency.
+
+Queued items are `frames.Message`s shared by every recipient; the writer
+sends their pre-built frame when the connection allows it (see frames.py).
+"""
+
+import asyncio
+import logging
+import time
+from collections import deque
+
+from frames import Message, send_prebuilt, wire_variant
+
+POLICIES = ("drop_oldest", "coalesce", "disconnect")
+SLOW_CONSUMER_CODE = 4008
+
+
+class Outbox:
+    def __init__(self, ws, name: str, max_queue: int = 256, policy: str = "drop_oldest"):
+        if policy not in POLICIES:
+            raise ValueError(f"unknown overflow policy {policy!r} (expected one of {POLICIES})")
+        self.ws = ws
+        self.name = name
+        self.max_queue = max_queue
+        self.policy = policy
+
+        self._queue = deque()  # (message, key, enqueued_at)
+        self._wake = asyncio.Event()
+        self._skipped = 0      # coalesce: drops not yet reported to the client
+        self._closing = False
+        self._variant = wire_variant(ws)  # extensions are fixed after the handshake
+        self._task = asyncio.create_task(self._writer(), name=f"writer:{name}")
+
+        # lag metrics
+        self.sent = 0
+        self.dropped = 0
+        self.coalesced = 0
+        self.high_water = 0
+        self.lag_max = 0.0
+        self._lag_total = 0.0
+
+    def put(self, msg: Message, key=None) -> bool:
+        """Queue `msg` without waiting. Returns False if it was not queued."""
+        if self._closing:
+            return False
+        if key is not None and self.policy == "coalesce":
+            for i, (_, queued_key, enqueued_at) in enumerate(self._queue):
+                if queued_key == key:
+                    # Latest wins; keep the slot (and its age) of the one it replaces
+                    self._queue[i] = (msg, key, enqueued_at)
+                    self.coalesced += 1
+                    return True
+        if len(self._queue) >= self.max_queue:
+            if self.policy == "disconnect":
+                self._disconnect()
+                return False
+            self._queue.popleft()
+            self.dropped += 1
+            if self.policy == "coalesce":
+                self._skipped += 1
+        self._queue.append((msg, key, time.monotonic()))
+        self.high_water = max(self.high_water, len(self._queue))
+        self._wake.set()
+        return True
+
+    async def close(self):
+        """Stop the writer; anything still queued is discarded."""
+        self._closing = True
+        self._task.cancel()
+        try:
+            await self._task
+        except (asyncio.CancelledError, Exception):
+            pass
+
+    def stats(self) -> dict:
+        now = time.monotonic()
+        return {
+            "name": self.name,
+            "queued": len(self._queue),
+            "high_water": self.high_water,
+            "oldest_age_ms": round((now - self._queue[0][2]) * 1000, 1) if self._queue else 0.0,
+            "sent": self.sent,
+            "dropped": self.dropped,
+            "coalesced": self.coalesced,
+            "lag_avg_ms": round(self._lag_total / self.sent * 1000, 1) if self.sent else 0.0,
+            "lag_max_ms": round(self.lag_max * 1000, 1),
+        }
+
+    # -- internals ---------------------------------------------------------
+    async def _writer(self):
+        try:
+            while True:
+                while not self._queue:
+                    self._wake.clear()
+                    await self._wake.wait()
+                if self._skipped:
+                    skipped, self._skipped = self._skipped, 0
+                    await self._send(_skipped_notice(skipped))
+                msg, _, enqueued_at = self._queue.popleft()
+                await self._send(msg)
+                lag = time.monotonic() - enqueued_at
+                self.sent += 1
+                self._lag_total += lag
+                self.lag_max = max(self.lag_max, lag)
+        except asyncio.CancelledError:
+            raise
+        except Exception:
+            # Send failed: the connection is gone; its handler cleans up
+            self._closing = True
+
+    async def _send(self, msg: Message):
+        if self._variant is None:
+            await self.ws.send(msg.data, text=True)
+        else:
+            await send_prebuilt(self.ws, msg.frame(self._variant))
+
+    def _disconnect(self):
+        self._closing = True
+        self._queue.clear()
+        logging.warning("Disconnecting slow client %s (queue full at %d)", self.name, self.max_queue)
+        self._close_task = asyncio.create_task(
+            self.ws.close(code=SLOW_CONSUMER_CODE, reason="Too slow: send queue full"))
+
+
+def _skipped_notice(n: int) -> Message:
+    return Message(f'{{"type":"system","text":"({n} messages skipped: connection too slow)"}}'.encode())
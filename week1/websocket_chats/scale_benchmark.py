@@ -0,0 +1,66 @@
+"""
+How chat throughput scales with worker processes.
+
+For each worker count it starts `server.py --workers N` on a spare port and
+drives it with the load generator from `load_test.py`:
+
+- `--conns` websocket clients, grouped into rooms of `--room-size`
+  (SO_REUSEPORT scatters a room's members over the workers, so most
+  deliveries cross the bus),
+- every client sends `--rate` messages/s for `--duration` seconds,
+- every client counts what it receives.
+
+Reported: messages sent/s, deliveries/s (one message to one client), the
+fraction delivered (below 100% means send queues overflowed) and p50/p99
+end-to-end latency.
+
+    python scale_benchmark.py --workers 1,2,4,8 --conns 2000 --room-size 20 --rate 2
+    python scale_benchmark.py --url ws://chat-host:8765 --conns 500   # existing server
+
+Server settings come from the environment as usual, e.g.
+CHAT_COMPRESSION=off CHAT_TICK_MS=20 python scale_benchmark.py ...
+
+The load generator needs cores too: give it --client-procs of its own (or
+run it on another machine with --url), otherwise you are measuring the
+clients.
+"""
+
+import argparse
+import os
+
+from load_test import raise_fd_limit, run_load, start_server, stop_server
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--workers", default="1,2,4", help="worker counts to compare")
+    parser.add_argument("--url", help="benchmark this running server instead of starting one")
+    parser.add_argument("--conns", type=int, default=500)
+    parser.add_argument("--room-size", type=int, default=10)
+    parser.add_argument("--rate", type=float, default=2.0, help="messages/s per client")
+    parser.add_argument("--duration", type=float, default=10.0)
+    parser.add_argument("--client-procs", type=int, default=max(1, (os.cpu_count() or 2) // 2))
+    args = parser.parse_args()
+
+    raise_fd_limit()
+    print(f"{args.conns} clients, rooms of {args.room_size}, {args.rate}/s each, "
+          f"{args.client_procs} load processes, {os.cpu_count()} cores")
+    print(f"{'workers':>8} {'sent/s':>10} {'deliv/s':>11} {'delivered':>10} {'p50 ms':>8} {'p99 ms':>8} {'RSS MB':>8}")
+
+    targets = [("-", args.url)] if args.url else [(int(n), None) for n in args.workers.split(",")]
+    for workers, url in targets:
+        server = None
+        if url is None:
+            server, url = start_server(workers)
+        try:
+            r = run_load(url, args.conns, args.room_size, 1.0, args.rate, args.duration,
+                         procs=args.client_procs, server_pid=server.pid if server else None)
+        finally:
+            if server:
+                stop_server(server)
+        print(f"{workers:>8} {r['sent_per_s']:>10.0f} {r['deliveries_per_s']:>11.0f} "
+              f"{r['delivered']:>10.1%} {r['p50_ms']:>8.1f} {r['p99_ms']:>8.1f} {r.get('rss_peak_mb', '-'):>8}")
+
+
+if __name__ == "__main__":
+    main()
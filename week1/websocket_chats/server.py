@@ -4,98 +4,220 @@ Minimal WebSocket chat (ephemeral).
 
 Key points:
 - Single Python process provides both:
-    * A static HTTP server for serving `index.html` (port 8000).
+    * A static HTTP server for serving `index.html` (port 8000), on the same
+      event loop: files cached in memory, ETag/304s, gzip (see `static_server.py`).
     * A WebSocket server for chat messaging (port 8765).
 - No persistence: all messages and connections exist only in memory.
 - When server stops or client disconnects, everything is lost.
+- Broadcasts never wait on sockets: each client has its own bounded send
+  queue + writer task (see `outbox.py`), so one slow reader cannot stall
+  everyone else. CHAT_SEND_QUEUE sets the queue size, CHAT_OVERFLOW the
+  policy when it fills (drop_oldest | coalesce | disconnect).
+- Rooms: a client joins one room (`"room"` in the join message, or the URL
+  path `ws://host:8765/<room>`, default `lobby`). Messages, `/kickall`,
+  `/announce` and `/stats` only touch that room, so a message costs
+  O(room size) however many clients the process holds.
+- `--workers N` forks N processes that all listen on 8765 (SO_REUSEPORT) and
+  relay room traffic over a Unix-socket bus (see `bus.py`), so fan-out,
+  JSON and framing use N cores. Rooms and admin commands span all workers.
+- Fan-out fast path (see `frames.py`): each message is JSON-encoded once
+  (CHAT_JSON=auto|orjson|json) and framed once for all recipients when
+  CHAT_COMPRESSION is "off" or "shared" (one deflate per message instead of
+  one per client; "per_client" is websockets' default). CHAT_TICK_MS > 0
+  batches a busy room's messages into one `{"type": "batch"}` frame per tick.
+- Admin command `/stats` replies with per-client lag (queue depth, drops,
+  send latency).
 """
 
+import argparse
 import asyncio
-import json
 import logging
-import threading
-from http.server import SimpleHTTPRequestHandler, HTTPServer
+import multiprocessing
+import os
+import signal
+import sys
+import tempfile
 
 import websockets
 
-logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(message)s")
-
-# -----------------------------------------------------------------------------
-# HTTP server (for serving index.html so browser clients can connect)
-# -----------------------------------------------------------------------------
-def start_http_server(directory: str = ".", host: str = "0.0.0.0", port: int = 8000):
-    """
-    Start a simple HTTP server on `host:port` that serves static files
-    from the given `directory`. In our case, it serves `index.html`.
-    """
-    class Handler(SimpleHTTPRequestHandler):
-        # Override to set default directory
-        def __init__(self, *args, **kwargs):
-            super().__init__(*args, directory=directory, **kwargs)
+from bus import BusClient, BusHub
+from frames import Message, batch, get_codec, serve_options
+from outbox import Outbox
+from static_server import StaticServer
 
-        def log_message(self, fmt, *args):
-            # Redirect HTTP logs to Python logging
-            logging.info("HTTP: " + fmt, *args)
+STATIC_DIR = os.path.dirname(os.path.abspath(__file__))
 
-    httpd = HTTPServer((host, port), Handler)
-    logging.info(f"HTTP server serving '{directory}' at http://{host}:{port}")
-    httpd.serve_forever()
+logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(message)s")
 
 # -----------------------------------------------------------------------------
 # WebSocket chat server (core chat logic)
 # -----------------------------------------------------------------------------
 class ChatServer:
-    def __init__(self):
+    DEFAULT_ROOM = "lobby"
+
+    def __init__(self, max_queue: int = 256, overflow: str = "drop_oldest", bus=None,
+                 json_codec: str = "auto", tick: float = 0.0):
         # Store user data per connection
-        # Example: ws -> {"name": str, "role": "admin"|"user"}
+        # Example: ws -> {"name": str, "role": "admin"|"user", "room": str, "outbox": Outbox}
         self.clients = {}
-        self.lock = asyncio.Lock()
+        # Membership index: room -> set of ws. A message only touches its room.
+        # No lock: everything runs on one event loop and none of these
+        # methods awaits while the dicts are half-updated.
+        self.rooms = {}
+        self.max_queue = max_queue
+        self.overflow = overflow
+        # Multi-process mode: BusClient linking this worker to the others
+        # (see bus.py). None when this process is the whole server.
+        self.bus = bus
+        self.dumps, self.loads = get_codec(json_codec)
+        # High-rate mode: messages for a room are held for `tick` seconds and
+        # sent as one {"type": "batch"} frame. 0 = send each one immediately.
+        self.tick = tick
+        self._pending = {}  # room -> [encoded message, ...] awaiting the tick
+        self._flush_handle = None
+        self._tasks = set()  # background kicks from the bus; the loop only holds tasks weakly
 
-    async def register(self, ws, name: str, role: str = "user"):
-        async with self.lock:
-            self.clients[ws] = {"name": name, "role": role}
-            logging.info("Client joined: %s (total=%d)", name, len(self.clients))
+    def register(self, ws, name: str, role: str = "user", room: str = DEFAULT_ROOM):
+        outbox = Outbox(ws, name, self.max_queue, self.overflow)
+        self.clients[ws] = {"name": name, "role": role, "room": room, "outbox": outbox}
+        members = self.rooms.setdefault(room, set())
+        members.add(ws)
+        if self.bus:
+            self.bus.publish({"op": "join", "room": room})
+        logging.info("Client joined: %s in #%s (room=%d, total=%d)", name, room, len(members), len(self.clients))
 
     async def unregister(self, ws):
-        async with self.lock:
-            data = self.clients.pop(ws, None)
-            if data:
-                logging.info("Client left: %s (total=%d)", data["name"], len(self.clients))
-            return data
-
-    async def broadcast(self, payload: dict):
-        """Send a JSON payload to all clients."""
-        if not self.clients:
-            return
-        msg = json.dumps(payload)
-        await asyncio.gather(*(self._safe_send(ws, msg) for ws in list(self.clients.keys())))
-
-    async def _safe_send(self, ws, msg: str):
-        try:
-            await ws.send(msg)
-        except Exception:
+        data = self.clients.pop(ws, None)
+        if not data:
+            return None
+        members = self.rooms.get(data["room"])
+        if members is not None:
+            members.discard(ws)
+            if not members:
+                del self.rooms[data["room"]]  # thousands of short-lived rooms must not pile up
+        if self.bus:
+            self.bus.publish({"op": "leave", "room": data["room"]})
+        logging.info("Client left: %s from #%s (total=%d)", data["name"], data["room"], len(self.clients))
+        await data["outbox"].close()
+        return data
+
+    def broadcast(self, room: str, payload: dict, key=None) -> int:
+        """
+        Queue a JSON payload for everyone in `room`; never waits on a socket.
+        `key` lets the coalesce policy replace an older queued message with the
+        same key. Returns how many local clients it was queued for; members on
+        other worker processes get it through the bus.
+        """
+        data = self.dumps(payload)  # encode once, not once per client
+        if self.bus and self.bus.remote_members(room):
+            self.bus.publish({"op": "msg", "room": room, "msg": data.decode(), "key": key})
+        return self.deliver(room, data, key)
+
+    def deliver(self, room: str, data: bytes, key=None) -> int:
+        """Queue an already-encoded message for this process's members of `room`."""
+        members = self.rooms.get(room)
+        if not members:
+            return 0
+        if self.tick:
+            # Keys don't coalesce inside a batch: the whole tick is one message
+            self._pending.setdefault(room, []).append(data)
+            if self._flush_handle is None:
+                self._flush_handle = asyncio.get_running_loop().call_later(self.tick, self._flush)
+            return len(members)
+        return self._fan_out(members, Message(data), key)
+
+    def _fan_out(self, members, msg: Message, key=None) -> int:
+        clients = self.clients
+        return sum(clients[ws]["outbox"].put(msg, key) for ws in list(members))
+
+    def _flush(self):
+        """Tick: one frame per room carrying everything queued since the last tick."""
+        self._flush_handle = None
+        pending, self._pending = self._pending, {}
+        for room, items in pending.items():
+            members = self.rooms.get(room)
+            if members:
+                self._fan_out(members, Message(items[0] if len(items) == 1 else batch(items)))
+
+    def on_bus_message(self, envelope: dict):
+        """A message or command published by another worker process."""
+        op = envelope["op"]
+        if op == "msg":
+            self.deliver(envelope["room"], envelope["msg"].encode(), envelope.get("key"))
+        elif op == "kick":
+            task = asyncio.create_task(self._kick_local(envelope["room"]))
+            self._tasks.add(task)
+            task.add_done_callback(self._task_done)
+
+    def _task_done(self, task: asyncio.Task):
+        self._tasks.discard(task)
+        if not task.cancelled() and task.exception() is not None:
+            logging.error("Background task failed", exc_info=task.exception())
+
+    def room_size(self, room: str) -> int:
+        """Members of `room` across all worker processes."""
+        local = len(self.rooms.get(room, ()))
+        return local + (self.bus.remote_members(room) if self.bus else 0)
+
+    def send_to(self, ws, payload: dict) -> bool:
+        """Queue a JSON payload for one client."""
+        data = self.clients.get(ws)
+        return data["outbox"].put(Message(self.dumps(payload))) if data else False
+
+    def stats(self, room: str | None = None) -> list[dict]:
+        """Per-client lag (one room, or everyone), slowest (most queued) first."""
+        sockets = self.rooms.get(room, ()) if room is not None else self.clients
+        rows = [self.clients[ws]["outbox"].stats() for ws in list(sockets)]
+        return sorted(rows, key=lambda r: (r["queued"], r["oldest_age_ms"]), reverse=True)
+
+    async def kick_all(self, room: str):
+        """Disconnect everyone in `room` (admin only), on every worker."""
+        if self.bus:
+            self.bus.publish({"op": "kick", "room": room})
+        await self._kick_local(room)
+
+    async def _kick_local(self, room: str):
+        members = list(self.rooms.get(room, ()))
+        await asyncio.gather(
+            *(ws.close(code=4000, reason="Admin kicked everyone") for ws in members),
+            return_exceptions=True,
+        )
+        for ws in members:
             await self.unregister(ws)
 
-    async def kick_all(self):
-        """Disconnect all users (admin only)."""
-        for ws in list(self.clients.keys()):
-            await ws.close(code=4000, reason="Admin kicked everyone")
-        self.clients.clear()
+    def announce(self, room: str, text: str):
+        """Broadcast admin announcement to `room`."""
+        self.broadcast(room, {"type": "system", "text": f"[ADMIN]: {text}"})
 
-    async def announce(self, text: str):
-        """Broadcast admin announcement."""
-        await self.broadcast({"type": "system", "text": f"[ADMIN]: {text}"})
+    def format_stats(self, room: str, top: int = 10) -> str:
+        rows = self.stats(room)
+        where = (f"; {self.room_size(room)} across workers, {self.bus.dropped} dropped on the bus"
+                 if self.bus else "")
+        lines = [
+            f"#{room}: {len(rows)} clients{where} ({len(self.clients)} in {len(self.rooms)} rooms here), "
+            f"policy={self.overflow}, queue={self.max_queue}"
+        ]
+        for r in rows[:top]:
+            lines.append(
+                f"{r['name']}: queued={r['queued']} (max {r['high_water']}) "
+                f"oldest={r['oldest_age_ms']}ms sent={r['sent']} dropped={r['dropped']} "
+                f"lag avg/max={r['lag_avg_ms']}/{r['lag_max_ms']}ms"
+            )
+        return " | ".join(lines)
 
     async def handler(self, ws):
         # Expect join first
         try:
-            raw = await ws.recv()
-            data = json.loads(raw)
+            raw = await ws.recv(decode=False)  # bytes: the codec validates UTF-8 itself
+            data = self.loads(raw)
             if not isinstance(data, dict) or data.get("type") != "join":
                 await ws.close()
                 return
 
             name = str(data["name"])[:32]
+            # Room from the join message, else the URL path (ws://host:8765/myroom)
+            path_room = ws.request.path.strip("/") if getattr(ws, "request", None) else ""
+            room = str(data.get("room") or path_room or self.DEFAULT_ROOM)[:64]
 
             # special rule: if name starts with "admin:" -> role=admin
             if name.startswith("admin:"):
@@ -104,60 +226,139 @@ class ChatServer:
             else:
                 role = "user"
 
-            await self.register(ws, name, role)
-            await self.broadcast({"type": "system", "text": f"{name} joined."})
+            self.register(ws, name, role, room)
+            self.broadcast(room, {"type": "system", "text": f"{name} joined #{room}."})
 
-            async for raw in ws:
-                d = json.loads(raw)
+            while True:
+                d = self.loads(await ws.recv(decode=False))
                 if d.get("type") == "msg":
                     text = d.get("text", "")
                     if role == "admin":
-                        # check for admin commands
+                        # check for admin commands (they only affect the admin's room)
                         if text.startswith("/kickall"):
-                            await self.kick_all()
+                            await self.kick_all(room)
                         elif text.startswith("/announce "):
-                            await self.announce(text[len("/announce "):])
+                            self.announce(room, text[len("/announce "):])
+                        elif text.startswith("/stats"):
+                            self.send_to(ws, {"type": "system", "text": self.format_stats(room)})
                         else:
-                            await self.broadcast({"type": "msg", "from": f"[ADMIN]{name}", "text": text})
+                            self.broadcast(room, {"type": "msg", "from": f"[ADMIN]{name}", "text": text})
                     else:
                         # normal user msg
-                        await self.broadcast({"type": "msg", "from": name, "text": text})
+                        self.broadcast(room, {"type": "msg", "from": name, "text": text})
+                    # Let the writer tasks run: a sender whose input is already
+                    # buffered would otherwise overflow every queue, fast or slow
+                    await asyncio.sleep(0)
 
         except Exception:
             pass
         finally:
             left = await self.unregister(ws)
             if left:
-                await self.broadcast({"type": "system", "text": f"{left['name']} left."})
+                self.broadcast(left["room"], {"type": "system", "text": f"{left['name']} left."})
 
 
 # -----------------------------------------------------------------------------
 # Entry point
 # -----------------------------------------------------------------------------
-async def main():
-    # Start HTTP server (in separate thread)
-    threading.Thread(
-        target=start_http_server,
-        kwargs={"directory": ".", "host": "0.0.0.0", "port": 8000},
-        daemon=True
-    ).start()
+def make_chat(bus=None) -> ChatServer:
+    return ChatServer(
+        max_queue=int(os.getenv("CHAT_SEND_QUEUE", "256")),
+        overflow=os.getenv("CHAT_OVERFLOW", "drop_oldest"),
+        bus=bus,
+        json_codec=os.getenv("CHAT_JSON", "auto"),
+        tick=float(os.getenv("CHAT_TICK_MS", "0")) / 1000,
+    )
 
-    chat = ChatServer()
 
+async def serve_chat(chat: ChatServer, host: str, port: int, reuse_port: bool = False):
     # Start WebSocket server
     async with websockets.serve(
         chat.handler,
-        "0.0.0.0",
-        8765,
+        host,
+        port,
         ping_interval=20,   # keepalive pings
-        max_size=2**20      # limit max message size (1 MB)
+        max_size=2**20,     # limit max message size (1 MB)
+        reuse_port=reuse_port,
+        **serve_options(os.getenv("CHAT_COMPRESSION", "per_client")),
     ):
-        logging.info("WebSocket server at ws://0.0.0.0:8765")
-        logging.info("Open the client: http://localhost:8000/ (or your host IP)")
         await asyncio.Future()  # run forever
 
+
+async def main(host: str = "0.0.0.0", port: int = 8765, http_port: int = 8000):
+    # Static client on this event loop
+    if http_port:
+        await StaticServer(STATIC_DIR).start(host, http_port)
+
+    logging.info(f"WebSocket server at ws://{host}:{port}")
+    logging.info(f"Open the client: http://localhost:{http_port}/ (or your host IP)")
+    await serve_chat(make_chat(), host, port)
+
+# -----------------------------------------------------------------------------
+# Multi-process mode: N workers share the port (SO_REUSEPORT), linked by a bus
+# -----------------------------------------------------------------------------
+def run_worker(index: int, host: str, port: int, bus_path: str):
+    """Worker process body: one event loop, its own share of the connections."""
+    async def worker():
+        chat = make_chat()
+        chat.bus = await BusClient(bus_path, f"w{index}-{os.getpid()}", chat.on_bus_message,
+                                   max_queue=int(os.getenv("CHAT_BUS_QUEUE", "10000"))).connect()
+        server = asyncio.create_task(serve_chat(chat, host, port, reuse_port=True))
+        # Without the hub we'd serve a partitioned chat: exit with the supervisor
+        await chat.bus.wait_closed()
+        server.cancel()
+
+    try:
+        asyncio.run(worker())
+    except KeyboardInterrupt:
+        pass
+
+
+async def main_workers(workers: int, host: str = "0.0.0.0", port: int = 8765, http_port: int = 8000):
+    """
+    Supervisor: runs the bus hub, keeps `workers` processes alive. The kernel
+    spreads new connections over the workers' listening sockets; the bus
+    makes rooms, announcements and /kickall span all of them.
+    """
+    # SIGTERM -> SystemExit, so multiprocessing's exit handler stops the workers
+    signal.signal(signal.SIGTERM, lambda *_: sys.exit(0))
+    bus_path = os.path.join(tempfile.mkdtemp(prefix="chatbus-"), "bus.sock")
+    await BusHub(bus_path).start()
+
+    # spawn, not fork: the parent already runs an event loop
+    ctx = multiprocessing.get_context("spawn")
+    procs = {}
+
+    def spawn(i):
+        procs[i] = ctx.Process(target=run_worker, args=(i, host, port, bus_path),
+                               name=f"chat-worker-{i}", daemon=True)
+        procs[i].start()
+
+    for i in range(workers):
+        spawn(i)
+    if http_port:
+        await StaticServer(STATIC_DIR).start(host, http_port)
+    logging.info(f"WebSocket server at ws://{host}:{port} ({workers} worker processes)")
+
+    while True:
+        await asyncio.sleep(1)
+        for i, proc in list(procs.items()):
+            if not proc.is_alive():
+                logging.warning("Worker %d exited (code %s); restarting", i, proc.exitcode)
+                spawn(i)
+
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Minimal WebSocket chat")
+    parser.add_argument("--host", default="0.0.0.0")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--http-port", type=int, default=8000, help="static client port (0 = off)")
+    parser.add_argument("--workers", type=int, default=int(os.getenv("CHAT_WORKERS", "1")),
+                        help="worker processes sharing the port (1 = single event loop)")
+    args = parser.parse_args()
     try:
-        asyncio.run(main())
+        if args.workers > 1:
+            asyncio.run(main_workers(args.workers, args.host, args.port, args.http_port))
+        else:
+            asyncio.run(main(args.host, args.port, args.http_port))
     except KeyboardInterrupt:
         pass
@@ -0,0 +1,252 @@
+"""
+Static files served from the chat server's own event loop.
+
+Replaces the threaded `HTTPServer` + `SimpleHTTPRequestHandler`, which
+handled one request at a time and re-read `index.html` on every hit. Here:
+
+- Every file in the directory is read into memory at startup (gzip and, if
+  the `brotli` package is installed, brotli variants are built then too).
+  A background rescan every `rescan` seconds picks up edits.
+- Responses carry ETag / Last-Modified / Cache-Control: no-cache, so a
+  reconnect storm mostly costs 304s; `Vary: Accept-Encoding` for variants.
+- HTTP/1.1 keep-alive (and pipelining, answered in order) on asyncio
+  streams, so thousands of concurrent requests cost one task each.
+- Only GET and HEAD; Python sources, dotfiles and __pycache__ are not served.
+
+    server = await StaticServer(".").start("0.0.0.0", 8000)
+"""
+
+import asyncio
+import gzip
+import hashlib
+import logging
+import mimetypes
+import os
+import time
+from email.utils import formatdate, parsedate_to_datetime
+from urllib.parse import unquote
+
+try:
+    import brotli
+except ImportError:  # optional: gzip only
+    brotli = None
+
+COMPRESSIBLE = ("text/", "application/javascript", "application/json", "image/svg+xml")
+MIN_COMPRESS = 256          # smaller bodies aren't worth a variant
+MAX_HEAD = 16 * 1024        # request line + headers
+MAX_BODY = 64 * 1024        # request body we are willing to read and discard
+KEEPALIVE_TIMEOUT = 15.0    # idle seconds before we close a keep-alive connection
+
+_REASONS = {200: "OK", 304: "Not Modified", 400: "Bad Request", 404: "Not Found",
+            405: "Method Not Allowed", 413: "Content Too Large",
+            431: "Request Header Fields Too Large"}
+
+
+def accepted_encodings(header: str) -> dict:
+    """'gzip;q=0.5, br, *;q=0' -> {"gzip": 0.5, "br": 1.0, "*": 0.0} (malformed q = 0)."""
+    accepted = {}
+    for item in header.split(","):
+        name, *params = [part.strip() for part in item.split(";")]
+        if not name:
+            continue
+        q = 1.0
+        for param in params:
+            key, _, value = param.partition("=")
+            if key.strip().lower() == "q":
+                try:
+                    q = min(1.0, max(0.0, float(value)))
+                except ValueError:
+                    q = 0.0
+        accepted[name.lower()] = q
+    return accepted
+
+
+class Asset:
+    __slots__ = ("body", "variants", "etag", "last_modified", "mtime", "content_type")
+
+    def __init__(self, path: str):
+        with open(path, "rb") as f:
+            self.body = f.read()
+        self.mtime = int(os.stat(path).st_mtime)
+        self.last_modified = formatdate(self.mtime, usegmt=True)
+        self.etag = '"' + hashlib.blake2b(self.body, digest_size=8).hexdigest() + '"'
+        content_type = mimetypes.guess_type(path)[0] or "application/octet-stream"
+        if content_type.startswith("text/") or content_type == "application/javascript":
+            content_type += "; charset=utf-8"
+        self.content_type = content_type
+
+        # encoding -> (body, etag); each representation needs its own strong ETag
+        self.variants = {}
+        if content_type.startswith(COMPRESSIBLE) and len(self.body) >= MIN_COMPRESS:
+            if brotli is not None:
+                self.variants["br"] = (brotli.compress(self.body), self.etag[:-1] + '-br"')
+            self.variants["gzip"] = (gzip.compress(self.body, 9, mtime=0), self.etag[:-1] + '-gz"')
+
+    def etags(self):
+        return [self.etag] + [etag for _, etag in self.variants.values()]
+
+
+class StaticServer:
+    def __init__(self, directory: str = ".", index: str = "index.html", rescan: float = 2.0):
+        self.directory = os.path.abspath(directory)
+        self.index = index
+        self.rescan = rescan
+        self.assets = {}   # "/index.html" -> Asset
+        self.requests = 0
+        self._server = None
+        self._rescan_task = None
+        self._date = (0, "")
+        self.load()
+
+    # File cache
+    def load(self):
+        """(Re)read every servable file whose size or mtime changed."""
+        seen = {}
+        for root, dirs, files in os.walk(self.directory):
+            dirs[:] = [d for d in dirs if not d.startswith(".") and d != "__pycache__"]
+            for name in files:
+                if name.startswith(".") or name.endswith((".py", ".pyc")):
+                    continue
+                path = os.path.join(root, name)
+                url = "/" + os.path.relpath(path, self.directory).replace(os.sep, "/")
+                try:
+                    st = os.stat(path)
+                    asset = self.assets.get(url)
+                    if asset is None or asset.mtime != int(st.st_mtime) or len(asset.body) != st.st_size:
+                        asset = Asset(path)
+                except OSError:
+                    continue
+                seen[url] = asset
+        self.assets = seen
+
+    async def _rescan_loop(self):
+        while True:
+            await asyncio.sleep(self.rescan)
+            await asyncio.to_thread(self.load)  # disk I/O off the event loop
+
+    # HTTP/1.1
+    async def start(self, host: str = "0.0.0.0", port: int = 8000, **kwargs):
+        self._server = await asyncio.start_server(self._serve, host, port, limit=MAX_HEAD, **kwargs)
+        if self.rescan:
+            self._rescan_task = asyncio.create_task(self._rescan_loop())
+        logging.info("HTTP server serving '%s' (%d files cached) at http://%s:%d",
+                     self.directory, len(self.assets), host, port)
+        return self
+
+    async def close(self):
+        if self._rescan_task:
+            self._rescan_task.cancel()
+        if self._server:
+            self._server.close()
+            await self._server.wait_closed()
+
+    async def _serve(self, reader, writer):
+        try:
+            while True:
+                try:
+                    head = await asyncio.wait_for(reader.readuntil(b"\r\n\r\n"), KEEPALIVE_TIMEOUT)
+                except (asyncio.IncompleteReadError, asyncio.TimeoutError, ConnectionError):
+                    return
+                except asyncio.LimitOverrunError:
+                    writer.write(self._response(431, b"", {}, close=True))
+                    return
+                keep_alive = await self._handle(head, reader, writer)
+                await writer.drain()
+                if not keep_alive:
+                    return
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+
+    async def _handle(self, head: bytes, reader, writer) -> bool:
+        """Answer one request; returns whether to keep the connection open."""
+        self.requests += 1
+        try:
+            request_line, *header_lines = head.decode("latin-1").split("\r\n")
+            method, target, version = request_line.split(" ")
+            headers = {}
+            for line in header_lines:
+                if line:
+                    name, _, value = line.partition(":")
+                    headers[name.strip().lower()] = value.strip()
+        except ValueError:
+            writer.write(self._response(400, b"Bad request\n", {}, close=True))
+            return False
+
+        connection = headers.get("connection", "").lower()
+        keep_alive = "close" not in connection if version == "HTTP/1.1" else "keep-alive" in connection
+        if headers.get("content-length"):
+            # GET/HEAD bodies are meaningless, but must be consumed to stay in sync
+            length = headers["content-length"]
+            if not (length.isascii() and length.isdigit()):
+                writer.write(self._response(400, b"Bad Content-Length\n", {}, close=True))
+                return False
+            if int(length) > MAX_BODY:
+                writer.write(self._response(413, b"Request body too large\n", {}, close=True))
+                return False
+            try:
+                await asyncio.wait_for(reader.readexactly(int(length)), KEEPALIVE_TIMEOUT)
+            except (asyncio.IncompleteReadError, asyncio.TimeoutError):
+                return False  # client went away (or stalled) mid-body: just close
+        logging.debug("HTTP: %s %s", method, target)
+
+        if method not in ("GET", "HEAD"):
+            writer.write(self._response(405, b"Method not allowed\n", {"Allow": "GET, HEAD"}, close=not keep_alive))
+            return keep_alive
+
+        path = unquote(target.split("?", 1)[0])
+        if path.endswith("/"):
+            path += self.index
+        asset = self.assets.get(path) if ".." not in path else None
+        if asset is None:
+            writer.write(self._response(404, b"Not found\n", {}, close=not keep_alive))
+            return keep_alive
+
+        common = {"Last-Modified": asset.last_modified, "Cache-Control": "no-cache"}
+        if asset.variants:
+            common["Vary"] = "Accept-Encoding"
+
+        body, etag, encoding = asset.body, asset.etag, None
+        accepted = accepted_encodings(headers.get("accept-encoding", ""))
+        best = accepted.get("identity", 0.0)  # only beats a variant if listed with a higher q
+        for name in ("br", "gzip"):  # on equal q, br wins
+            q = accepted.get(name, accepted.get("*", 0.0))
+            if name in asset.variants and q > best:
+                (body, etag), encoding, best = asset.variants[name], name, q
+        common["ETag"] = etag
+
+        if self._not_modified(headers, asset):
+            writer.write(self._response(304, b"", common, close=not keep_alive))
+            return keep_alive
+
+        extra = dict(common, **{"Content-Type": asset.content_type})
+        if encoding:
+            extra["Content-Encoding"] = encoding
+        writer.write(self._response(200, body, extra, close=not keep_alive, head_only=method == "HEAD"))
+        return keep_alive
+
+    @staticmethod
+    def _not_modified(headers: dict, asset: Asset) -> bool:
+        if "if-none-match" in headers:  # takes precedence over If-Modified-Since
+            tags = [t.strip() for t in headers["if-none-match"].split(",")]
+            return "*" in tags or any(t.removeprefix("W/") in asset.etags() for t in tags)
+        since = headers.get("if-modified-since")
+        if since:
+            try:
+                return asset.mtime <= parsedate_to_datetime(since).timestamp()
+            except (TypeError, ValueError):
+                return False
+        return False
+
+    def _response(self, status: int, body: bytes, headers: dict, close=False, head_only=False) -> bytes:
+        now = int(time.time())
+        if self._date[0] != now:
+            self._date = (now, formatdate(now, usegmt=True))
+        lines = [f"HTTP/1.1 {status} {_REASONS[status]}", f"Date: {self._date[1]}", "Server: chat-static"]
+        lines += [f"{k}: {v}" for k, v in headers.items()]
+        if status != 304:
+            lines.append(f"Content-Length: {len(body)}")
+        lines.append("Connection: close" if close else "Connection: keep-alive")
+        head = ("\r\n".join(lines) + "\r\n\r\n").encode("latin-1")
+        return head if head_only or status == 304 else head + body